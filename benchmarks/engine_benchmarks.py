@@ -0,0 +1,230 @@
+# Microbenchmarks for the hot paths of the shared game engine. Every benchmark runs a seeded workload, so the same
+# work is timed on every run, and reports the number of calls per second and the latency percentiles of a single call.
+#
+# Run from the root of the repository:
+#   python -m benchmarks.engine_benchmarks                   compare against the baseline (if there is one)
+#   python -m benchmarks.engine_benchmarks --save-baseline   save this run as the new baseline
+#   python -m benchmarks.engine_benchmarks --filter odds     only run the benchmarks with "odds" in their name
+#
+# A benchmark is flagged as a regression if its calls per second drop by more than the threshold compared to the
+# baseline, in which case the exit code is 1 so that the suite can be used as a check before merging.
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from shared.evaluation_cache import hand_strength_cache
+from shared.game_logic import FULL_DECK, Deck, Game, Hand, Player
+from shared.odds_logic import hand_equity, hand_rankings_cache, monte_carlo_hand_odds
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+SEED = 2024
+PERCENTILES = (50, 90, 99)
+
+
+# Get some random Card objects, without any repeats
+def _random_cards(random_generator, number_of_cards):
+    return random_generator.sample(FULL_DECK, number_of_cards)
+
+
+# Convert cards to the [suit, rank] pairs used by the odds functions
+def _as_names(cards):
+    return [[card.suit, card.rank] for card in cards]
+
+
+# A game with some players who have been dealt cards and a full board, ready for a showdown
+def _showdown_game(random_generator, number_of_players):
+    game = Game(player_limit=number_of_players, random_generator=random_generator)
+    for index in range(number_of_players):
+        game.add_player(Player(f"player{index}", index, 200, game.available_positions[index], "default.png"), None)
+
+    cards = _random_cards(random_generator, 2 * number_of_players + 5)
+    for index, player in enumerate(game.players):
+        player.hand.cards = cards[2 * index:2 * index + 2]
+        player.current_bet = random_generator.choice([20, 50, 80, 120, 200])
+        player.all_in = player.current_bet != 200 and random_generator.random() < 0.5
+        game.debug_add_to_pot(index, player.current_bet)
+    game.debug_set_community_cards(cards[2 * number_of_players:])
+    return game
+
+
+# Each workload function takes a seeded random.Random and returns the list of calls to time. The calls are built
+# before timing starts so that only the engine itself is measured
+
+def _evaluate_strength_workload(random_generator):
+    hands = [Hand(_random_cards(random_generator, 7)) for _ in range(20000)]
+    return [hand.evaluate_strength for hand in hands]
+
+
+def _evaluate_rankings_workload(random_generator):
+    hands = [Hand(_random_cards(random_generator, 7)) for _ in range(20000)]
+    return [hand.evaluate_rankings_for_odds_calculation for hand in hands]
+
+
+def _evaluate_player_hands_workload(random_generator):
+    calls = []
+    for _ in range(2000):
+        game = _showdown_game(random_generator, 6)
+        calls.append(lambda game=game: game.evaluate_player_hands(game.players))
+    return calls
+
+
+def _create_pots_workload(random_generator):
+    calls = []
+    for _ in range(5000):
+        game = _showdown_game(random_generator, 6)
+        calls.append(lambda game=game: game.create_pots(game.players))
+    return calls
+
+
+def _shuffle_workload(random_generator):
+    deck = Deck(random.Random(random_generator.random()))
+    return [deck.shuffle] * 20000
+
+
+def _deal_round_workload(random_generator):
+    deck = Deck(random.Random(random_generator.random()))
+
+    # Reset the deck and deal the cards for a 6 player hand: 12 hole cards, 3 burnt cards and 5 community cards
+    def deal_round():
+        deck.reset_deck()
+        for _ in range(20):
+            deck.deal_card()
+
+    return [deal_round] * 20000
+
+
+def _odds_workload(number_of_community_cards, number_of_calls):
+    def workload(random_generator):
+        calls = []
+        for index in range(number_of_calls):
+            cards = _as_names(_random_cards(random_generator, 2 + number_of_community_cards))
+            calls.append(lambda cards=cards, seed=index: monte_carlo_hand_odds(cards[:2], cards[2:],
+                                                                               time_budget_ms=float("inf"),
+                                                                               seed=seed))
+        return calls
+    return workload
+
+
+def _equity_workload(number_of_community_cards, opponents, number_of_calls):
+    def workload(random_generator):
+        calls = []
+        for index in range(number_of_calls):
+            cards = _as_names(_random_cards(random_generator, 2 + number_of_community_cards))
+            calls.append(lambda cards=cards, seed=index: hand_equity(cards[:2], cards[2:], opponents,
+                                                                     time_budget_ms=float("inf"), seed=seed))
+        return calls
+    return workload
+
+
+BENCHMARKS = {
+    "Hand.evaluate_strength": _evaluate_strength_workload,
+    "Hand.evaluate_rankings_for_odds_calculation": _evaluate_rankings_workload,
+    "Game.evaluate_player_hands (6 players)": _evaluate_player_hands_workload,
+    "Game.create_pots (6 players)": _create_pots_workload,
+    "Deck.shuffle": _shuffle_workload,
+    "Deck.reset_deck + 20 x Deck.deal_card": _deal_round_workload,
+    "monte_carlo_hand_odds (preflop)": _odds_workload(0, 200),
+    "monte_carlo_hand_odds (flop)": _odds_workload(3, 100),
+    "monte_carlo_hand_odds (turn)": _odds_workload(4, 200),
+    "hand_equity (flop, 3 opponents)": _equity_workload(3, 3, 20),
+    "hand_equity (turn, 1 opponent)": _equity_workload(4, 1, 20),
+}
+
+
+# Time every call of a benchmark one at a time. Logging is left at its default level (warnings only), which is how
+# the engine runs in production
+def run_benchmark(name, workload):
+    calls = workload(random.Random(SEED))
+    # Every benchmark starts with empty evaluation caches so that it does not depend on the benchmarks before it
+    hand_strength_cache.clear()
+    hand_rankings_cache.clear()
+
+    latencies = []
+    total_start = time.perf_counter()
+    for call in calls:
+        start = time.perf_counter_ns()
+        call()
+        latencies.append(time.perf_counter_ns() - start)
+    total_time = time.perf_counter() - total_start
+
+    latencies.sort()
+    result = {"calls": len(calls), "ops_per_sec": len(calls) / total_time}
+    for percentile in PERCENTILES:
+        index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+        result[f"p{percentile}_us"] = latencies[index] / 1000
+    return result
+
+
+def load_baseline(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    baseline = {"python": platform.python_version(), "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=4)
+
+
+# Compare a result to its baseline. Returns the change in calls per second as a fraction (e.g. -0.25 for 25% slower),
+# or None if there is no baseline for the benchmark
+def compare_to_baseline(result, baseline_result):
+    if not baseline_result:
+        return None
+    return result["ops_per_sec"] / baseline_result["ops_per_sec"] - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the shared game engine")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="path of the baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="flag benchmarks that are slower than the baseline by more than this fraction")
+    arguments = parser.parse_args()
+
+    baseline = load_baseline(arguments.baseline)
+    baseline_results = baseline["results"] if baseline else {}
+    results = {}
+    regressions = []
+
+    print(f"{'benchmark':<46}{'calls/s':>12}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'vs baseline':>14}")
+    for name, workload in BENCHMARKS.items():
+        if arguments.filter.lower() not in name.lower():
+            continue
+        result = run_benchmark(name, workload)
+        results[name] = result
+
+        change = compare_to_baseline(result, baseline_results.get(name))
+        change_text = "" if change is None else f"{change:+.1%}"
+        if change is not None and change < -arguments.threshold:
+            regressions.append(name)
+            change_text += " SLOWER"
+        print(f"{name:<46}{result['ops_per_sec']:>12.1f}{result['p50_us']:>10.1f}{result['p90_us']:>10.1f}"
+              f"{result['p99_us']:>10.1f}{change_text:>14}")
+
+    if arguments.save_baseline:
+        # Benchmarks that were not run this time keep their old baseline
+        save_baseline(arguments.baseline, {**baseline_results, **results})
+        print(f"Saved baseline to {arguments.baseline}")
+    elif baseline is None:
+        print("No baseline to compare against yet, run with --save-baseline to create one")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) are more than {arguments.threshold:.0%} slower than the baseline: "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# Replays recorded hand histories (see shared/hand_history.py) through Game.start_round() and
+# Game.process_player_action() as fast as possible, without any networking, and checks that every showdown, pot and
+# final stack comes out the same as in the recording. The cards are dealt exactly as recorded, so a replay is a
+# realistic benchmark of the engine and a check that a change to shared/game_logic.py has not changed its behaviour:
+# record some games with the old engine, then replay them with the new one.
+#
+# Run from the root of the repository:
+#   python -m benchmarks.replay --record 200                     record 200 self-play games and replay them
+#   python -m benchmarks.replay benchmarks/recordings/*.jsonl    replay recorded games (e.g. from the server)
+#   python -m benchmarks.replay --repeat 5 --no-verify           replay the recordings 5 times for a steadier timing
+#
+# A file has to hold a whole game from its "table" record. Games that were restored from a snapshot part of the way
+# through cannot be replayed.
+import argparse
+import functools
+import glob
+import os
+import sys
+import time
+
+from benchmarks.self_play import POLICIES, play_game
+from shared.game_logic import Game, Player
+from shared.hand_evaluator import NUMBER_OF_CARDS
+from shared.hand_history import HandHistoryWriter, get_hand_history_path, read_records
+
+RECORDINGS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+# The records that hold the outcome of the game, which a replay has to reproduce exactly
+RESULT_RECORD_TYPES = ("rejected", "showdown", "uncontested", "game_completed")
+
+
+# A stand-in for the deck's random number generator which deals a recorded sequence of cards. Deck.deal_card() calls
+# randrange(n) to choose which of its first n cards to deal and then swaps that card into position n - 1. This keeps a
+# copy of the order of the deck and makes the same swaps, so it always knows where the next card to deal is.
+# When the game ends, start_round() deals cards that nobody ever sees and that are not recorded, so once the recorded
+# cards run out it just deals the last undealt card
+class ReplayDealer:
+    def __init__(self, card_codes):
+        self.__card_codes = iter(card_codes)
+        # A new deck holds the cards in the order of their codes
+        self.__order = list(range(NUMBER_OF_CARDS))
+        self.__positions = list(range(NUMBER_OF_CARDS))
+
+    def randrange(self, n):
+        code = next(self.__card_codes, None)
+        if code is None:
+            return n - 1
+        index = self.__positions[code]
+        last_code = self.__order[n - 1]
+        self.__order[index], self.__order[n - 1] = last_code, code
+        self.__positions[last_code], self.__positions[code] = index, n - 1
+        return index
+
+
+# Every card dealt in a recorded game in the order it was dealt: each player's hole cards in seat order, then the burnt
+# card and the new board cards of every street
+def _dealt_cards(records):
+    for record in records:
+        if record["type"] == "deal":
+            for hole_cards in record["hole_cards"]:
+                yield from hole_cards
+        elif record["type"] == "board":
+            yield record["burn"]
+            yield from record["cards"]
+
+
+def _without_time(record):
+    return {key: value for key, value in record.items() if key != "time"}
+
+
+# Replay one recorded game. Returns the number of hands and actions replayed and a description of the first result
+# that is different from the recording (or None if they all match)
+def replay_game(records, verify=True):
+    table = records[0]
+    if table["type"] != "table":
+        raise ValueError("A replay has to start from the table record of a game")
+
+    game = Game(table["starting_chips"], table["player_limit"], random_generator=ReplayDealer(_dealt_cards(records)))
+    for player in table["players"]:
+        game.add_player(Player(player["name"], player["user_id"], player["chips"], player["position"],
+                               "default.png"), None)
+
+    results = []
+    if verify:
+        def record_result(record):
+            if record["type"] in RESULT_RECORD_TYPES:
+                results.append(record)
+        game.history_recorder = record_result
+
+    hands = actions = 0
+    # The server starts the first hand and every hand after a showdown that ended the betting early, so a replay
+    # starts those hands when it reaches their deal. Every other hand is started by the engine itself
+    is_waiting_for_deal = True
+    for record in records:
+        record_type = record["type"]
+        if record_type == "deal":
+            hands += 1
+            if is_waiting_for_deal:
+                game.start_round()
+                game.game_started = True
+                is_waiting_for_deal = False
+        elif record_type == "game_completed" and is_waiting_for_deal:
+            game.start_round()
+            is_waiting_for_deal = False
+        elif record_type == "action" and record["seat"] is not None:
+            response = game.process_player_action(game.players[record["seat"]], record["action"], record["amount"])
+            actions += 1
+            if response.get("showdown"):
+                is_waiting_for_deal = True
+        elif record_type == "leave":
+            game.remove_player(game.players[record["seat"]].user_id, False)
+        elif record_type == "reconnect":
+            game.reconnect_player(game.players[record["seat"]].user_id, None)
+
+    mismatch = None
+    if verify:
+        expected_results = [_without_time(record) for record in records if record["type"] in RESULT_RECORD_TYPES]
+        for index, (expected, result) in enumerate(zip(expected_results, results)):
+            if expected != result:
+                mismatch = f"result {index + 1} is different: recorded {expected}, replayed {result}"
+                break
+        else:
+            if len(expected_results) != len(results):
+                mismatch = f"{len(expected_results)} results were recorded but the replay had {len(results)}"
+    return hands, actions, mismatch
+
+
+# Record some self-play games, one file per game, returning the paths of the files
+def record_games(directory, games, number_of_players, starting_chips, policy_names, seed):
+    writer = HandHistoryWriter(directory)
+    paths = []
+    for game_seed in range(seed, seed + games):
+        path = get_hand_history_path(directory, game_seed)
+        # Hand histories are appended to, so an old recording of the same game is removed first
+        if os.path.exists(path):
+            os.remove(path)
+        play_game(game_seed, number_of_players, starting_chips, policy_names,
+                  functools.partial(writer.append, game_seed))
+        paths.append(path)
+    writer.stop()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded hand histories through the Game engine")
+    parser.add_argument("paths", nargs="*", help="hand history files to replay (default: every recording)")
+    parser.add_argument("--record", type=int, default=0, help="record this many self-play games first")
+    parser.add_argument("--directory", default=RECORDINGS_DIRECTORY, help="where recorded games are saved")
+    parser.add_argument("--players", type=int, default=6, choices=range(2, 7))
+    parser.add_argument("--starting-chips", type=int, default=200)
+    parser.add_argument("--policy", default="random", choices=list(POLICIES) + ["mixed"])
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first recorded game")
+    parser.add_argument("--repeat", type=int, default=1, help="replay every game this many times")
+    parser.add_argument("--no-verify", action="store_true", help="do not check the results against the recording")
+    arguments = parser.parse_args()
+
+    paths = arguments.paths
+    if arguments.record:
+        policy_names = list(POLICIES) if arguments.policy == "mixed" else [arguments.policy]
+        recorded_paths = record_games(arguments.directory, arguments.record, arguments.players,
+                                      arguments.starting_chips, policy_names, arguments.seed)
+        print(f"Recorded {len(recorded_paths)} games to {arguments.directory}")
+        paths = paths or recorded_paths
+    if not paths:
+        paths = sorted(glob.glob(get_hand_history_path(arguments.directory, "*")))
+    if not paths:
+        print("No recordings to replay, use --record to make some")
+        return 1
+
+    # Every file is read before timing starts, so that only the engine is measured
+    games = [(path, list(read_records(path))) for path in paths]
+
+    hands = actions = 0
+    mismatches = []
+    start_time = time.perf_counter()
+    for _ in range(arguments.repeat):
+        for path, records in games:
+            try:
+                game_hands, game_actions, mismatch = replay_game(records, not arguments.no_verify)
+            except (ValueError, IndexError, KeyError) as e:
+                game_hands, game_actions, mismatch = 0, 0, f"could not be replayed: {e!r}"
+            hands += game_hands
+            actions += game_actions
+            if mismatch and len(mismatches) < len(games):
+                mismatches.append((path, mismatch))
+    elapsed_time = time.perf_counter() - start_time
+
+    print(f"Replayed {len(games) * arguments.repeat} games ({hands} hands, {actions} actions) in {elapsed_time:.2f}s")
+    print(f"{hands / elapsed_time:.1f} hands/sec, {actions / elapsed_time:.1f} actions/sec")
+    if not arguments.no_verify:
+        print(f"{len(mismatches)} game(s) did not match their recording")
+        for path, mismatch in mismatches[:10]:
+            print(f"  {path}: {mismatch}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
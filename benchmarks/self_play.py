@@ -0,0 +1,231 @@
+# A headless self-play simulator for the Game engine. Bots play whole games against each other by calling
+# start_round() and process_player_action() directly (the same way the server does, but without any sockets or GUIs),
+# and the engine's invariants are checked after every single action. Games are spread across a process pool, so it
+# can be used both as a load generator when optimising the engine and as a soak test for long games.
+#
+# Run from the root of the repository:
+#   python -m benchmarks.self_play --games 2000 --players 6 --policy random
+#   python -m benchmarks.self_play --games 200 --starting-chips 5000 --policy mixed    (long games)
+#   python -m benchmarks.self_play --games 500 --event-sourced    (play through a GameEventLog and check its rebuilds)
+#
+# Every game has its own seed (the base seed plus the game number), so any game that breaks an invariant can be
+# replayed on its own with --games 1 --seed <its seed>.
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from shared.game_events import GameEventLog, apply_event
+from shared.game_logic import Game
+from shared.log import configure_logging
+
+# A game that has not finished after this many actions is reported as stuck
+MAX_ACTIONS_PER_GAME = 200000
+# Only the first few violations of each game are kept, so that a badly broken engine does not flood the report
+MAX_VIOLATIONS_PER_GAME = 5
+
+
+# Bot policies take the game, the player whose turn it is and a random.Random, and return (action, raise amount)
+
+
+# A raise that the engine will accept: more than the amount needed to call, up to every chip the player has
+def _random_raise(game, player, random_generator, largest_fraction):
+    amount_to_call = game.get_amount_to_call(player)
+    if player.chips <= amount_to_call + 1:
+        return "call", 0
+    largest_raise = max(amount_to_call + 1, int(player.chips * largest_fraction))
+    return "raise", random_generator.randint(amount_to_call + 1, largest_raise)
+
+
+def random_policy(game, player, random_generator):
+    choice = random_generator.random()
+    if choice < 0.15 and game.get_amount_to_call(player) > 0:
+        return "fold", 0
+    if choice < 0.8:
+        return "call", 0
+    return _random_raise(game, player, random_generator, 0.5)
+
+
+def calling_station_policy(game, player, random_generator):
+    return "call", 0
+
+
+def aggressive_policy(game, player, random_generator):
+    if random_generator.random() < 0.6:
+        return _random_raise(game, player, random_generator, 1.0)
+    return "call", 0
+
+
+POLICIES = {
+    "random": random_policy,
+    "calling_station": calling_station_policy,
+    "aggressive": aggressive_policy,
+}
+
+
+def chips_in_play(game):
+    return sum(player.chips for player in game.players) + game.get_pot_chips()
+
+
+# Check the invariants of a game after an action, returning a list of descriptions of any that are broken
+def check_invariants(game, total_chips):
+    violations = []
+    if chips_in_play(game) != total_chips:
+        violations.append(f"chips not conserved: {chips_in_play(game)} in play instead of {total_chips}")
+    for player in game.players:
+        if player.chips < 0:
+            violations.append(f"{player.name} has {player.chips} chips")
+
+    # No card can be in two places at once
+    cards = [card for player in game.players for card in player.hand.cards] + game.board.get_board()
+    if len(set(cards)) != len(cards):
+        violations.append("the same card has been dealt twice")
+    return violations
+
+
+# Check that the state of a game played through an event log can be rebuilt from the log, both from scratch and by
+# catching up from a past version with the events since then
+def check_event_log(event_log, random_generator):
+    violations = []
+    snapshot = event_log.game.to_snapshot()
+    if event_log.rebuild(event_log.version).to_snapshot() != snapshot:
+        violations.append("the game rebuilt from the event log is different")
+
+    past_version = random_generator.randrange(event_log.version + 1)
+    game = event_log.rebuild(past_version)
+    for event in event_log.get_events_since(past_version):
+        apply_event(game, event)
+    if game.to_snapshot() != snapshot:
+        violations.append(f"the game caught up from version {past_version} of the event log is different")
+    return violations
+
+
+# Play one whole game between bots, returning the statistics of the game. A history_recorder can be given to record
+# the game's hand history (see shared/hand_history.py). If event_sourced is set, every change to the game goes
+# through a GameEventLog (see shared/game_events.py), which is checked at the end of the game
+def play_game(seed, number_of_players, starting_chips, policy_names, history_recorder=None, event_sourced=False):
+    random_generator = random.Random(seed)
+    game = Game(starting_chips=starting_chips, player_limit=number_of_players,
+                random_generator=random.Random(random_generator.random()))
+    game.history_recorder = history_recorder
+    event_log = None
+    if event_sourced:
+        # The event log takes over the game's history recorder and hands the records on to its listeners instead
+        event_log = GameEventLog(game)
+        if history_recorder is not None:
+            def record_history(event, records):
+                for record in records:
+                    history_recorder(record)
+            event_log.add_listener(record_history)
+
+    def apply(event_type, *arguments):
+        if event_log is None:
+            return apply_event(game, (event_type, arguments, ()))
+        return event_log.apply(event_type, *arguments)
+
+    policies = []
+    for index in range(number_of_players):
+        apply("add_player", f"bot{index}", index, starting_chips, "default.png")
+        policies.append(POLICIES[policy_names[index % len(policy_names)]])
+
+    # The same steps as the server takes when a lobby fills up
+    apply("start_round")
+    apply("start_game")
+
+    total_chips = starting_chips * number_of_players
+    actions = 0
+    rejected_actions = 0
+    violations = []
+    while not game.game_completed:
+        if actions >= MAX_ACTIONS_PER_GAME:
+            violations.append(f"game did not finish after {actions} actions")
+            break
+
+        turn = game.get_current_player_turn()
+        player = game.players[turn]
+        action, raise_amount = policies[turn](game, player, random_generator)
+        response = apply("action", turn, action, raise_amount)
+        actions += 1
+
+        if not response["success"]:
+            rejected_actions += 1
+            # The policies only choose legal actions, so the engine rejecting one means it is in a bad state
+            if len(violations) < MAX_VIOLATIONS_PER_GAME:
+                violations.append(f"{action} by {player.name} rejected: {response['error']}")
+            if rejected_actions > 100:
+                violations.append("too many rejected actions, stopping the game")
+                break
+        elif response.get("showdown"):
+            # After a showdown the clients ask the server to start the next round
+            apply("start_round")
+
+        new_violations = check_invariants(game, total_chips)
+        if new_violations:
+            violations += [f"hand {game.hands_played}, action {actions}: {violation}" for violation in new_violations]
+            # Only new leaks are reported from now on, instead of the same one after every action
+            total_chips = chips_in_play(game)
+
+    if event_log is not None:
+        violations += check_event_log(event_log, random_generator)
+    return {"seed": seed, "hands": game.hands_played, "actions": actions, "rejected_actions": rejected_actions,
+            "violations": violations[:MAX_VIOLATIONS_PER_GAME]}
+
+
+# Play a batch of games in one worker process. The engine's debug logging is only turned on if verbose is set
+def play_games(seeds, number_of_players, starting_chips, policy_names, verbose=False, event_sourced=False):
+    if verbose:
+        configure_logging(default_level="DEBUG")
+    return [play_game(seed, number_of_players, starting_chips, policy_names, event_sourced=event_sourced)
+            for seed in seeds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless self-play simulator for the Game engine")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=6, choices=range(2, 7))
+    parser.add_argument("--starting-chips", type=int, default=200)
+    parser.add_argument("--policy", default="random", choices=list(POLICIES) + ["mixed"],
+                        help="the bot policy every player uses, or mixed to give each seat a different policy")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=20, help="the number of games sent to a worker at once")
+    parser.add_argument("--verbose", action="store_true", help="show the engine's debug logging")
+    parser.add_argument("--event-sourced", action="store_true", help="play every game through a GameEventLog")
+    arguments = parser.parse_args()
+
+    policy_names = list(POLICIES) if arguments.policy == "mixed" else [arguments.policy]
+    seeds = list(range(arguments.seed, arguments.seed + arguments.games))
+    batches = [seeds[start:start + arguments.batch_size] for start in range(0, len(seeds), arguments.batch_size)]
+
+    start_time = time.perf_counter()
+    if arguments.workers > 1:
+        with ProcessPoolExecutor(max_workers=arguments.workers) as pool:
+            batch_results = list(pool.map(play_games, batches, *(itertools.repeat(argument) for argument in
+                                                                 (arguments.players, arguments.starting_chips,
+                                                                  policy_names, arguments.verbose,
+                                                                  arguments.event_sourced))))
+    else:
+        batch_results = [play_games(batch, arguments.players, arguments.starting_chips, policy_names,
+                                    arguments.verbose, arguments.event_sourced) for batch in batches]
+    elapsed_time = time.perf_counter() - start_time
+
+    results = [result for batch in batch_results for result in batch]
+    hands = sum(result["hands"] for result in results)
+    actions = sum(result["actions"] for result in results)
+    broken_games = [result for result in results if result["violations"]]
+
+    print(f"Played {len(results)} games ({hands} hands, {actions} actions) in {elapsed_time:.2f}s "
+          f"with {arguments.workers} worker(s)")
+    print(f"{hands / elapsed_time:.1f} hands/sec, {actions / elapsed_time:.1f} actions/sec, "
+          f"{len(results) / elapsed_time:.1f} games/sec")
+    print(f"{len(broken_games)} game(s) broke an invariant")
+    for result in broken_games[:10]:
+        print(f"  seed {result['seed']}: {'; '.join(result['violations'])}")
+    return 1 if broken_games else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
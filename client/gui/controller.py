@@ -10,6 +10,9 @@ from gui.settings_menu import SettingsMenu
 from gui.responsible_gambling_menu import ResponsibleGamblingMenu
 from gui.how_to_play import HowToPlay
 from gui.user_profile import UserProfile
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 # The names of the methods explain what they do pretty well without other comments
 class Controller:
@@ -73,7 +76,7 @@ class Controller:
 
     def join_lobby(self, user_id, lobby_id, show_odds):
         response_data = self.network_manager.join_lobby(user_id, lobby_id)
-        print(f"(controller): RESPONSE FROM JOINING LOBBY: {response_data}")
+        logger.debug("(controller): RESPONSE FROM JOINING LOBBY: %s", response_data)
         if response_data and response_data.get("success", True):
             if self.__current_menu:
                 self.__current_menu.destroy()
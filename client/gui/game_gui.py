@@ -1,12 +1,17 @@
 import base64
 import json
+import threading
 import time
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 
 from PIL import Image, ImageDraw, ImageTk
-from helpers.odds_logic import monte_carlo_hand_odds
+from shared.odds_logic import DEFAULT_PRECISION, DEFAULT_TIME_BUDGET_MS, submit_odds_and_equity
+from shared.state_patches import apply_state_patch
 from gui.user_profile import ProfilePictureManager
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 class GameGUI(tk.Tk):
     def __init__(self, controller, user_id, lobby_id, initial_state, player_starts_game, reconnecting, allow_odds):
@@ -30,7 +35,27 @@ class GameGUI(tk.Tk):
         self.player_starts_game = player_starts_game
         self.community_card_items = []
         self.reconnecting = reconnecting
-        self.odds_iterations = 2000
+        # Sampled odds are simulated until every probability is within odds_precision of the true value (with 95%
+        # confidence) or until the time budget runs out
+        self.odds_precision = DEFAULT_PRECISION
+        self.odds_time_budget_ms = DEFAULT_TIME_BUDGET_MS
+        # The odds can be worked out by the server instead, which is faster on slow machines as results are shared
+        self.use_server_odds = False
+        # The odds panel is refreshed whenever the cards or the number of opponents still in the hand change
+        self.is_odds_shown = False
+        self.odds_label = None
+        self.odds_future = None
+        # Set to stop the odds that are being worked out, once they are no longer needed
+        self.odds_cancel_event = None
+        self.odds_situation = None
+        # Each request for the server's odds is numbered, so that odds sent back for an older situation are ignored
+        self.odds_request_id = 0
+        # The server sends patches to the last game state it sent, so the client keeps that state and its version.
+        # If a patch is for a different version, the whole state is asked for again and patches are ignored until
+        # it arrives
+        self.game_state = None
+        self.game_state_version = None
+        self.is_waiting_for_full_game_state = False
 
         # Title the window
         self.title("Poker Game")
@@ -128,20 +153,20 @@ class GameGUI(tk.Tk):
 
         self.controller.network_manager.client_socket.setblocking(0)
         self.network_loop()
-        print(self.controller.network_manager.client_socket)
+        logger.debug("%s", self.controller.network_manager.client_socket)
 
-        print(f"Processing initial state with data: {initial_state}")
+        logger.debug("Processing initial state with data: %s", initial_state)
         self.process_initial_state(initial_state)
 
     def network_loop(self):
         if self.should_be_destroyed:
-            print(f"Stopping network_loop on {self} as it should be destroyed.")
+            logger.debug("Stopping network_loop on %s as it should be destroyed.", self)
             return
         s = self.controller.network_manager.client_socket
         try:
             # Try to receive data from the server
             data = s.recv(16384)
-            print(f"received data: {data}")
+            logger.debug("received data: %s", data)
 
             # If data is received, process it
             if data:
@@ -155,15 +180,16 @@ class GameGUI(tk.Tk):
         self.scheduled_tasks.append(task_id)
 
     def destroy(self) -> None:
-        print(f"Destroying {self}")
+        logger.debug("Destroying %s", self)
         self.should_be_destroyed = True
+        self.cancel_odds()
         for task_id in self.scheduled_tasks:
-            print(f"Cancelling task {task_id}")
+            logger.debug("Cancelling task %s", task_id)
             self.after_cancel(task_id)
         super().destroy()
 
     def place_players(self, game_state):
-        print(f"Placing players from {game_state}")
+        logger.debug("Placing players from %s", game_state)
         for player_info in game_state['players']:
             x, y = self.get_coordinates_for_position(player_info['position'])
             task_id = self.after(0, self.place_player, x, y, player_info['name'], player_info['position'],
@@ -172,36 +198,36 @@ class GameGUI(tk.Tk):
 
     def process_initial_state(self, initial_state):
         game_state = initial_state['game_state']
-        print("(game_gui): processing initial state")
+        logger.debug("(game_gui): processing initial state")
         self.place_players(game_state)
         if len(game_state['players']) == game_state['player_limit']:
-            print("(game_gui): START GAME!!")
+            logger.debug("(game_gui): START GAME!!")
             # self.send_acknowledgment()
             if self.player_starts_game:
-                print("updating game state")
+                logger.debug("updating game state")
                 # The following call to self.after() is necessary so that the players are placed first before the
                 # game attempts to update game components which don't exist yet
                 self.after(10, self.start_game_update)
         if self.reconnecting:
-            print("(game_gui): attempting to reconnect...")
+            logger.debug("(game_gui): attempting to reconnect...")
             self.after(10, self.update_game_state, initial_state)
 
     def start_game_update(self):
-        print("starting game update")
+        logger.debug("starting game update")
         self.update_game_state(self.controller.network_manager.send_start_game_message(self.lobby_id))
         self.player_starts_game = False
 
     def process_player_left_game_state(self, player_left_state):
-        print("game_gui.py: PROCESSING PLAYER LEFT STATE")
+        logger.debug("game_gui.py: PROCESSING PLAYER LEFT STATE")
         # Delete old items from the canvas
         for item_id in self.canvas_items:
             self.game_canvas.delete(item_id)
         self.canvas_items.clear()  # Clear the list of stored IDs
-        print("game_gui.py: CANVAS CLEARED")
+        logger.debug("game_gui.py: CANVAS CLEARED")
 
         # Now place the new players
         self.place_players(player_left_state)
-        print("game_gui.py: PLAYERS PLACED AGAIN")
+        logger.debug("game_gui.py: PLAYERS PLACED AGAIN")
 
     def get_coordinates_for_position(self, position):
         positions = {
@@ -218,21 +244,36 @@ class GameGUI(tk.Tk):
         # Create a new top-level window for settings
         settings_window = tk.Toplevel(self)
         settings_window.title("Settings")
-        settings_window.geometry("500x300")
+        settings_window.geometry("500x350")
         settings_window.configure(bg="#333333")
 
-        # Label for iterations input
-        iterations_label = tk.Label(settings_window, text="Set Odds Iterations (10 - 100000):", bg="#333333",
+        # Label and entry for the precision of the odds
+        precision_label = tk.Label(settings_window, text="Set Odds Precision in % (0.1 - 5):", bg="#333333",
+                                   fg="#FFFFFF")
+        precision_label.pack(pady=5)
+        self.precision_entry = tk.Entry(settings_window)
+        self.precision_entry.insert(0, str(self.odds_precision * 100))
+        self.precision_entry.pack()
+
+        # Label and entry for the time budget of the odds
+        time_budget_label = tk.Label(settings_window, text="Set Odds Time Budget in ms (100 - 30000):", bg="#333333",
+                                     fg="#FFFFFF")
+        time_budget_label.pack(pady=5)
+        self.time_budget_entry = tk.Entry(settings_window)
+        self.time_budget_entry.insert(0, str(self.odds_time_budget_ms))
+        self.time_budget_entry.pack()
+
+        # Checkbox for working out the odds on the server
+        self.server_odds_variable = tk.BooleanVar(value=self.use_server_odds)
+        server_odds_checkbox = tk.Checkbutton(settings_window, text="Work out the odds on the server",
+                                              variable=self.server_odds_variable, bg="#333333", fg="#FFFFFF",
+                                              selectcolor="#555555", activebackground="#333333")
+        server_odds_checkbox.pack(pady=5)
+
+        extra_info_label = tk.Label(settings_window, text="Odds are simulated until every probability is within the "
+                                                          "precision you choose,\nor until the time budget runs out. "
+                                                          "Most odds after the flop are exact!", bg="#333333",
                                     fg="#FFFFFF")
-        iterations_label.pack(pady=10)
-
-        # Entry for iterations input
-        self.iterations_entry = tk.Entry(settings_window)
-        self.iterations_entry.pack()
-
-        extra_info_label = tk.Label(settings_window, text="The higher the number you choose the longer it will take to "
-                                                          "simulate the odds.\nNumbers that end in 0 will often be "
-                                                          "more resource efficient!", bg="#333333", fg="#FFFFFF")
         extra_info_label.pack(pady=10)
 
         # Button to apply settings
@@ -240,14 +281,19 @@ class GameGUI(tk.Tk):
         apply_button.pack(pady=10)
 
     def apply_settings(self):
-        # Get the value from the entry and validate it
+        # Get the values from the entries and validate them
         try:
-            new_iterations = int(self.iterations_entry.get())
-            if 10 <= new_iterations <= 100000:
-                self.odds_iterations = new_iterations
-                print(f"New iterations set to: {self.odds_iterations}")
-            else:
-                raise ValueError("The number of iterations must be between 10 and 100000.")
+            new_precision = float(self.precision_entry.get())
+            new_time_budget_ms = int(self.time_budget_entry.get())
+            if not 0.1 <= new_precision <= 5:
+                raise ValueError("The precision must be between 0.1% and 5%.")
+            if not 100 <= new_time_budget_ms <= 30000:
+                raise ValueError("The time budget must be between 100 and 30000 ms.")
+            self.odds_precision = new_precision / 100
+            self.odds_time_budget_ms = new_time_budget_ms
+            self.use_server_odds = self.server_odds_variable.get()
+            logger.debug("New precision set to: %s, new time budget set to: %s", self.odds_precision,
+                         self.odds_time_budget_ms)
         except ValueError as e:
             tk.messagebox.showerror("Invalid Input, enter a valid number!", str(e))
         except TypeError as e:
@@ -256,9 +302,9 @@ class GameGUI(tk.Tk):
             tk.messagebox.showerror("Invalid Input, unknown exception:", str(e))
 
     def process_server_message(self, data):
-        print(f"process_server_message called on {self}")
+        logger.debug("process_server_message called on %s", self)
         if self.should_be_destroyed:
-            print(f"process_server_message called on a destroyed instance {self}")
+            logger.debug("process_server_message called on a destroyed instance %s", self)
             return
 
         data_str = data.decode('utf-8')
@@ -267,38 +313,41 @@ class GameGUI(tk.Tk):
         for message_str in messages:
             try:
                 message = json.loads(message_str)
-                print(f"server_message: {message}")
+                logger.debug("server_message: %s", message)
                 if isinstance(message, dict):
                     message_type = message.get('type')
                     if message_type == 'receive_message':
-                        print(f"Received message: {message}")
+                        logger.debug("Received message: %s", message)
                         self.receive_message(message.get('chat_message'))
                     elif message_type == 'initial_state':
-                        print(f"(game gui): Initial state message TYPE: {message}")
+                        logger.debug("(game gui): Initial state message TYPE: %s", message)
                         task_id = self.after(0, self.process_initial_state, message)
                         self.scheduled_tasks.append(task_id)
                     elif message_type in ['update_game_state', 'game_starting']:
-                        print(f"(game_gui): UPDATING GAME STATE or GAME STARTING")
+                        logger.debug("(game_gui): UPDATING GAME STATE or GAME STARTING")
                         task_id = self.after(0, self.update_game_state, message)
                         self.scheduled_tasks.append(task_id)
+                    elif message_type == 'odds':
+                        task_id = self.after(0, self.receive_server_odds, message)
+                        self.scheduled_tasks.append(task_id)
                     elif message_type == "player_left_game_state":
                         task_id = self.after(0, self.process_player_left_game_state, message['game_state'])
                         self.scheduled_tasks.append(task_id)
                     elif message_type == 'update_showdown_state':
-                        print("message type == update showdown state")
+                        logger.debug("message type == update showdown state")
                         task_id = self.after(0, self.update_showdown_state, message)
                         self.scheduled_tasks.append(task_id)
                     elif message_type == 'update_completed_state':
-                        print("updating completed state...")
+                        logger.debug("updating completed state...")
                         task_id = self.after(0, self.update_completed_state, message)
                         self.scheduled_tasks.append(task_id)
                 elif isinstance(message, list):
                     self.controller.process_received_message('lobby_list', message)
             except json.JSONDecodeError as e:
-                print(f"JSON Decode Error: {e}")
-                print(f"Data causing the error: {message_str}")
-            except Exception as e:
-                print(f"Unknown exception: {e}")
+                logger.warning("JSON Decode Error: %s", e)
+                logger.warning("Data causing the error: %s", message_str)
+            except Exception:
+                logger.exception("Unknown exception")
 
     def process_lobby_list(self):
         pass
@@ -329,32 +378,58 @@ class GameGUI(tk.Tk):
         self.game_messages_label.config(text=text_to_update_with)
 
     def update_completed_state(self, game_state):
-        print("updating showdown state")
-        print(f"(game_gui.py): updating game state for user")
+        logger.debug("updating showdown state")
+        logger.debug("(game_gui.py): updating game state for user")
 
-        print(f"(game_gui.py): old game_state: {game_state}")
+        logger.debug("(game_gui.py): old game_state: %s", game_state)
         game_state = game_state["game_state"]
-        print(f"(game_gui): new game_state: {game_state}")
+        logger.debug("(game_gui): new game_state: %s", game_state)
 
         self.indicate_active_players(game_state)
         self.indicate_folded_and_busted_and_disconnected_players(game_state)
         winning_player = [player for player in game_state["players"] if player["won_game"]][0]
-        print(f"all winning players: {[player for player in game_state['players'] if player['won_game']]}")
-        print(f"winning player: {winning_player}")
+        logger.debug("all winning players: %s", [player for player in game_state['players'] if player['won_game']])
+        logger.debug("winning player: %s", winning_player)
         self.indicate_game_winner(winning_player)
 
         self.update_game_messages_label(f"{winning_player['name']} wins the Poker game!")
 
+    # Turn a game state update from the server into a message with the whole game state in it, by applying its patch
+    # to the last public state received and adding the player's private state. Returns None if the patch cannot be
+    # applied yet
+    def resolve_game_state_update(self, message):
+        if "patch" in message:
+            if self.game_state is None or message["base_version"] != self.game_state_version:
+                logger.warning("Got a patch for game state version %s but have version %s",
+                               message["base_version"], self.game_state_version)
+                if not self.is_waiting_for_full_game_state:
+                    self.is_waiting_for_full_game_state = True
+                    self.controller.network_manager.send_signal({"type": "request_full_game_state",
+                                                                 "lobby_id": self.lobby_id, "user_id": self.user_id})
+                return None
+            game_state = apply_state_patch(self.game_state, message["patch"])
+        else:
+            game_state = message["game_state"]
+            self.is_waiting_for_full_game_state = False
+
+        self.game_state = game_state
+        self.game_state_version = message.get("version")
+        # The player's own cards are sent separately from the state that everyone is sent
+        return {**message, "game_state": {**game_state, **message.get("private", {})}}
+
     def update_game_state(self, game_state):
+        game_state = self.resolve_game_state_update(game_state)
+        if game_state is None:
+            return
         self.hide_everyones_cards(game_state)
-        print("updating game state")
-        print(f"Trying to get user_id in game_state: {game_state}")
+        logger.debug("updating game state")
+        logger.debug("Trying to get user_id in game_state: %s", game_state)
         user_id = game_state['user_id']
-        print(f"(game_gui.py): updating game state for {user_id}")
+        logger.debug("(game_gui.py): updating game state for %s", user_id)
 
-        print(f"old game_state: {game_state}")
+        logger.debug("old game_state: %s", game_state)
         game_state = game_state["game_state"]
-        print(f"(game_gui): new game_state: {game_state}")
+        logger.debug("(game_gui): new game_state: %s", game_state)
 
         if game_state.get("message"):
             self.update_game_messages_label(game_state.get("message"))
@@ -368,21 +443,29 @@ class GameGUI(tk.Tk):
 
         # Update card images if they are in the game_state
         # ONLY UPDATE THIS ONCE IN A GAME, WHEN ALL THE PLAYERS HAVE JOINED IF THIS IS THE "START GAME STATE"
-        print(f"hand: {game_state.get('hand')}")
+        logger.debug("hand: %s", game_state.get('hand'))
         self.show_local_cards(game_state, user_id)
 
-        print(f"BOARD: {game_state['board']}")
+        logger.debug("BOARD: %s", game_state['board'])
         self.clear_community_cards()
         if len(game_state["board"]) > 0:
             self.place_community_cards(game_state["board"])
 
+        if self.is_odds_shown:
+            # Card strings are in the form "10 Hearts", but the odds are worked out from [suit, rank] pairs
+            hand_cards = [card_str.split(" ")[::-1] for card_str in game_state.get("hand", [])]
+            community_cards = [card_str.split(" ")[::-1] for card_str in game_state["board"]]
+            opponents_in_hand = len([player for player in game_state["players"] if player["user_id"] != self.user_id
+                                     and not (player["folded"] or player["busted"] or player["disconnected"])])
+            self.calculate_odds(hand_cards, community_cards, opponents_in_hand)
+
     def update_showdown_state(self, game_state):
-        print("updating showdown state")
-        print(f"(game_gui.py): updating game state for user")
+        logger.debug("updating showdown state")
+        logger.debug("(game_gui.py): updating game state for user")
 
-        print(f"(game_gui.py): old game_state: {game_state}")
+        logger.debug("(game_gui.py): old game_state: %s", game_state)
         game_state = game_state["game_state"]
-        print(f"(game_gui): new game_state: {game_state}")
+        logger.debug("(game_gui): new game_state: %s", game_state)
 
         # Disable the users action buttons, so they can't act during the showdown (which could lead to bugs)
         for button in self.buttons:
@@ -400,16 +483,16 @@ class GameGUI(tk.Tk):
 
         self.show_everyones_cards(game_state)
 
-        print(f"BOARD: {game_state['board']}")
+        logger.debug("BOARD: %s", game_state['board'])
         self.clear_community_cards()
         if len(game_state["board"]) > 0:
             self.place_community_cards(game_state["board"])
 
     def update_pot(self, game_state):
         pot_amount = game_state.get('pot', 0)
-        print(f"Pot amount: {pot_amount}")
+        logger.debug("Pot amount: %s", pot_amount)
         self.pot_label.config(text=f"Pot: {pot_amount}")
-        print(f"pot_label: {self.process_lobby_list()}")
+        logger.debug("pot_label: %s", self.process_lobby_list())
 
     def update_roles(self, game_state):
         # Get the components for each player, and update accordingly
@@ -443,34 +526,34 @@ class GameGUI(tk.Tk):
                 time.sleep(0.05)
                 components['name_label'].config(text=f"{player_data['name']}: {player_data['chips']} chips")
                 components['role_label'].config(text=role_text)
-                print(f"Updated role label {components['role_label']} with text: {role_text}")
+                logger.debug("Updated role label %s with text: %s", components['role_label'], role_text)
             else:
-                print(f"No player data found..")
+                logger.debug("No player data found..")
 
         pot_amount = game_state.get('pot', 0)
-        print(f"Pot amount: {pot_amount}")
+        logger.debug("Pot amount: %s", pot_amount)
         self.pot_label.config(text=f"Pot: {pot_amount}")
-        print(f"pot_label: {self.process_lobby_list()}")
+        logger.debug("pot_label: %s", self.process_lobby_list())
 
     # This method only shows the local player's cards
     def show_local_cards(self, game_state, user_id):
         components = self.player_components.get(user_id)
         if not components:
-            print(f"No components found for user_id {user_id}")
-            print(f"components: {components}")
+            logger.debug("No components found for user_id %s", user_id)
+            logger.debug("components: %s", components)
             return
         for idx, card_str in enumerate(game_state.get('hand', [])):
-            print(f"(game_gui): DEBUG idx: {idx} card_str: {card_str}")
+            logger.debug("(game_gui): DEBUG idx: %s card_str: %s", idx, card_str)
             card_image_path = self.get_card_image_path(card_str)
-            print(f"(game_gui): card_image_path: {card_image_path}")
+            logger.debug("(game_gui): card_image_path: %s", card_image_path)
             card_photo = Image.open(card_image_path)
             card_photo = card_photo.resize((60, 90))
             card_photo = ImageTk.PhotoImage(card_photo)
             card_label = components[f'card{idx + 1}_label']
-            print(f"(game_gui): card_label before change: {card_label}")
+            logger.debug("(game_gui): card_label before change: %s", card_label)
             card_label.config(image=card_photo)
             card_label.photo = card_photo  # keep a reference to avoid garbage collection
-            print(f"(game_gui): card_label after change: {card_label}")
+            logger.debug("(game_gui): card_label after change: %s", card_label)
 
     # This method shows everyone's cards and is useful in the showdown
     def show_everyones_cards(self, game_state):
@@ -478,11 +561,11 @@ class GameGUI(tk.Tk):
             user_id = player.get('user_id')
             components = self.player_components.get(user_id)
             if not components:
-                print(f"No components found for user_id {user_id}")
-                print(f"components: {components}")
+                logger.debug("No components found for user_id %s", user_id)
+                logger.debug("components: %s", components)
                 return
             for idx, card_str in enumerate(player.get('hand', [])):
-                print(f"(game_gui): DEBUG idx: {idx} card_str: {card_str}")
+                logger.debug("(game_gui): DEBUG idx: %s card_str: %s", idx, card_str)
                 card_image_path = self.get_card_image_path(card_str)
                 card_photo = Image.open(card_image_path)
                 card_photo = card_photo.resize((60, 90))
@@ -493,13 +576,13 @@ class GameGUI(tk.Tk):
 
     def hide_everyones_cards(self, game_state):
         game_state = game_state['game_state']
-        print("HIDING EVERYONES CARDS!")
+        logger.debug("HIDING EVERYONES CARDS!")
         for player in game_state['players']:
             user_id = player.get('user_id')
             components = self.player_components.get(user_id)
             if not components:
-                print(f"No components found for user_id {user_id}")
-                print(f"components: {components}")
+                logger.debug("No components found for user_id %s", user_id)
+                logger.debug("components: %s", components)
                 return
 
             card_photo = Image.open("gui/Images/Cards/back.png")
@@ -513,10 +596,10 @@ class GameGUI(tk.Tk):
             card_label2.photo = card_photo
 
     def show_current_player(self, game_state):
-        print("Showing current player")
+        logger.debug("Showing current player")
         current_turn_player_id = game_state["players"][game_state['current_player_turn']]['user_id']
-        print(f"Finding current player {[game_state['current_player_turn']]} from {game_state['players']}")
-        print(f"Current player ID turn: {current_turn_player_id}")
+        logger.debug("Finding current player %s from %s", [game_state['current_player_turn']], game_state['players'])
+        logger.debug("Current player ID turn: %s", current_turn_player_id)
 
         # Unhighlight the last player's frame
         if self.last_highlighted_player_id:
@@ -525,7 +608,8 @@ class GameGUI(tk.Tk):
                 last_player_frame = last_player_components[
                     'profile_label'].master
                 last_player_frame.config(bg="#302525")  # Resetting to original background colour.
-                print(f"Last highlighted player id {self.last_highlighted_player_id} frame changed to grey colour")
+                logger.debug("Last highlighted player id %s frame changed to grey colour",
+                             self.last_highlighted_player_id)
 
         # Highlight the current player's frame
         current_player_components = self.player_components.get(current_turn_player_id)
@@ -533,16 +617,16 @@ class GameGUI(tk.Tk):
             current_player_frame = current_player_components['profile_label'].master
             current_player_frame.config(bg="#FFD700")  # Highlighting with a gold colour.
             self.last_highlighted_player_id = current_turn_player_id
-            print(f"Current highlighted player id {current_turn_player_id} frame changed to gold colour")
+            logger.debug("Current highlighted player id %s frame changed to gold colour", current_turn_player_id)
 
         # Enable/Disable action buttons based on whose turn it is
         if current_turn_player_id == self.user_id:
-            print(f"YES Current turn id == user id : {current_turn_player_id} = {self.user_id}")
+            logger.debug("YES Current turn id == user id : %s = %s", current_turn_player_id, self.user_id)
             # Enable the buttons
             for button in self.buttons:
                 button.config(state=tk.NORMAL)
         else:
-            print(f"NO Current turn id != user id : {current_turn_player_id} != {self.user_id}")
+            logger.debug("NO Current turn id != user id : %s != %s", current_turn_player_id, self.user_id)
             # Disable the buttons
             for button in self.buttons:
                 button.config(state=tk.DISABLED)
@@ -594,28 +678,28 @@ class GameGUI(tk.Tk):
             message = {"type": "bet", "action": action, "user_id": self.user_id, "lobby_id": self.lobby_id}
 
         action_response = self.controller.network_manager.send_message(message)
-        print(f"action_response: {action_response}")
+        logger.debug("action_response: %s", action_response)
 
         if action_response.get("success"):
             if action_response.get("game_completed"):
-                print("about to send broadcast_completed_game_state signal")
+                logger.debug("about to send broadcast_completed_game_state signal")
                 signal_message = {"type": "broadcast_completed_game_state", "lobby_id": self.lobby_id}
                 self.controller.network_manager.send_signal(signal_message)
             elif action_response.get("showdown"):
                 # send signal to broadcast showdown state
                 signal_message = {"type": "broadcast_showdown", "lobby_id": self.lobby_id}
-                print("about to send broadcast_showdown signal")
+                logger.debug("about to send broadcast_showdown signal")
                 task_id = self.after(0, self.controller.network_manager.send_signal, signal_message)
                 self.scheduled_tasks.append(task_id)
                 # then wait 9 seconds and send signal to broadcast update game state
 
                 signal_message = {"type": "start_next_round", "lobby_id": self.lobby_id}
-                print("about to send start_next_round signal")
+                logger.debug("about to send start_next_round signal")
                 task_id = self.after(9000, self.controller.network_manager.send_signal, signal_message)
                 self.scheduled_tasks.append(task_id)
             else:
                 # send signal to broadcast update game state
-                print("about to send broadcast_new_game_state signal")
+                logger.debug("about to send broadcast_new_game_state signal")
                 signal_message = {"type": "broadcast_new_game_state", "lobby_id": self.lobby_id}
                 self.controller.network_manager.send_signal(signal_message)
         else:
@@ -650,6 +734,8 @@ class GameGUI(tk.Tk):
             widget.destroy()
 
         self.is_chatbox_shown = True
+        self.is_odds_shown = False
+        self.cancel_odds()
 
         chat_frame = tk.Frame(self.display_frame, bg="#444444")
         chat_frame.pack(fill="both", expand=True)
@@ -715,15 +801,17 @@ class GameGUI(tk.Tk):
             self.chatbox.config(state="disabled")
             self.chatbox.yview_moveto(1.0)
 
-    # The code for showing the odds of different hand rankings instead of showing the chatbox
+    # The code for showing the odds of different hand rankings and of winning instead of showing the chatbox
     def show_odds(self):
         self.is_chatbox_shown = False
+        self.is_odds_shown = True
+        self.odds_situation = None
 
         for widget in self.display_frame.winfo_children():
             widget.destroy()
-        odds_label = tk.Label(self.display_frame, text="Odds will be displayed here.", bg="#444444", fg="#FFFFFF",
-                              font=("Cambria", 12))
-        odds_label.pack(fill="both", expand=True)
+        self.odds_label = tk.Label(self.display_frame, text="Odds will be displayed here.", bg="#444444",
+                                   fg="#FFFFFF", font=("Cambria", 12))
+        self.odds_label.pack(fill="both", expand=True)
 
         # Request the data required to generate the odds from the server
         game_data = self.controller.network_manager.send_message({
@@ -732,19 +820,98 @@ class GameGUI(tk.Tk):
             'lobby_id': self.lobby_id
         })
 
-        print(f"GAME DATA: {game_data}")
-        odds = monte_carlo_hand_odds(game_data[0], game_data[1], self.odds_iterations)
+        logger.debug("GAME DATA: %s", game_data)
+        # The server also sends the number of opponents still in the hand, as this client may not have been sent a
+        # game state yet
+        self.calculate_odds(game_data[0], game_data[1], game_data[2])
+
+    # Start working out the odds for some cards against a number of opponents still in the hand, unless they have
+    # already been worked out for the same situation
+    def calculate_odds(self, hand_cards, community_cards, opponents_in_hand):
+        situation = (hand_cards, community_cards, opponents_in_hand)
+        if situation == self.odds_situation:
+            return
+        self.odds_situation = situation
+
+        self.odds_label.config(text="Calculating odds...")
+        self.cancel_odds()
+        if self.use_server_odds:
+            self.request_server_odds()
+            return
+
+        # The odds are worked out in the background so that the GUI does not freeze while they are simulated
+        self.odds_cancel_event = threading.Event()
+        self.odds_future = submit_odds_and_equity(hand_cards, community_cards, opponents_in_hand,
+                                                  self.odds_precision, self.odds_time_budget_ms,
+                                                  cancel_event=self.odds_cancel_event)
+        self.poll_odds(self.odds_future, opponents_in_hand, self.odds_label)
+
+    # Stop working out the odds for an old situation. The odds are worked out one situation at a time, so the odds
+    # for the new situation would otherwise have to wait for them
+    def cancel_odds(self):
+        if self.odds_future is not None:
+            self.odds_future.cancel()
+            self.odds_cancel_event.set()
+            self.odds_future = None
+
+    # Check if the odds have finished being calculated, and display them if they have
+    def poll_odds(self, odds_future, opponents_in_hand, odds_label):
+        # Odds for an older situation are ignored once newer odds have been requested
+        if self.should_be_destroyed or odds_future is not self.odds_future or not odds_label.winfo_exists():
+            return
+        if not odds_future.done():
+            task_id = self.after(50, self.poll_odds, odds_future, opponents_in_hand, odds_label)
+            self.scheduled_tasks.append(task_id)
+            return
+
+        self.display_odds(odds_future.result(), opponents_in_hand, odds_label)
+
+    # Ask the server for the odds. The server sends them back in an "odds" message once it has worked them out
+    def request_server_odds(self):
+        self.odds_request_id += 1
+        self.controller.network_manager.send_signal({
+            'type': 'get_odds',
+            'user_id': self.user_id,
+            'lobby_id': self.lobby_id,
+            'request_id': self.odds_request_id
+        })
+
+    # Display the odds the server has sent back, unless newer odds have been requested since
+    def receive_server_odds(self, message):
+        if (self.should_be_destroyed or not self.is_odds_shown or not self.use_server_odds
+                or message.get('request_id') != self.odds_request_id or not self.odds_label.winfo_exists()):
+            return
+        if not message.get("success"):
+            self.odds_label.config(text=f"Could not get the odds from the server.\n{message.get('error', '')}")
+        else:
+            self.display_odds((message["hand_odds"], message["equity"]), message.get("opponents"), self.odds_label)
+
+    # Display the hand odds and equity, along with their margins of error
+    def display_odds(self, odds_and_equity, opponents_in_hand, odds_label):
+        hand_odds, equity = odds_and_equity
 
         # Handle what happens if the cards have not been dealt yet (game has not started) or data has not been received
-        if not odds:
+        if not hand_odds:
             odds_text = "No odds yet.\nWait for your cards to be dealt!"
         else:
-            odds_text = "Odds of each hand ranking:\n"
+            odds, odds_margins = hand_odds
+            equity, equity_margins = equity
+            odds_text = f"Against {opponents_in_hand} opponent(s):\n"
+            for result in ("win", "tie", "lose", "equity"):
+                formatted_probability = self.format_probability(equity[result], equity_margins[result])
+                odds_text += f"{result.capitalize()}: {formatted_probability}\n"
+            odds_text += "\nOdds of each hand ranking:\n"
             for hand_type, probability in odds.items():
-                odds_text += f"{hand_type}: {probability:.2%}\n"
+                odds_text += f"{hand_type}: {self.format_probability(probability, odds_margins[hand_type])}\n"
 
         odds_label.config(text=odds_text)
 
+    # Format a probability with its margin of error, leaving the margin out if the probability is exact
+    def format_probability(self, probability, margin):
+        if margin == 0:
+            return f"{probability:.2%}"
+        return f"{probability:.2%} \u00b1 {margin:.2%}"
+
     def leave_game(self):
         player_left = self.controller.network_manager.send_message({
             'type': 'leave_lobby',
@@ -752,7 +919,7 @@ class GameGUI(tk.Tk):
             'lobby_id': self.lobby_id
         })
         self.is_leaving_game = True
-        print(f"(leave game from game_gui): {player_left}")
+        logger.debug("(leave game from game_gui): %s", player_left)
         self.controller.open_main_menu(self.user_id)
 
     def fetch_and_store_profile_picture(self, user_id, profile_picture_filename):
@@ -842,5 +1009,5 @@ class GameGUI(tk.Tk):
 
             item_id = self.game_canvas.create_window(x, y, window=player_frame, anchor=anchor_point)
             self.canvas_items.append(item_id)
-        except Exception as e:
-            print(f"PLACING PLAYER EXCEPTION: {e}")
+        except Exception:
+            logger.exception("PLACING PLAYER EXCEPTION")
@@ -2,6 +2,9 @@ import tkinter as tk
 from tkinter import font as tkfont
 from PIL import Image, ImageDraw, ImageTk
 from client.gui.user_profile import ProfilePictureManager
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 class HallOfFame(tk.Tk):
     def __init__(self, controller, user_id):
@@ -130,7 +133,7 @@ class HallOfFame(tk.Tk):
             })
 
             if players is None:
-                print("No players found from hall of fame")
+                logger.debug("No players found from hall of fame")
                 return
 
         # Clear current player banners
@@ -140,7 +143,7 @@ class HallOfFame(tk.Tk):
         # Add new player banners
         for player in players:
             user_id, username, profile_pic, attribute_value = player
-            print(f"username: {username}, user_id: {user_id}")
+            logger.debug("username: %s, user_id: %s", username, user_id)
             profile_pic_path = self.profile_picture_manager.check_and_fetch_profile_picture(user_id)
             if profile_pic_path:
                 self.add_player_banner(username, profile_pic_path, f"{selected_attribute}: {attribute_value}", user_id)
@@ -3,6 +3,9 @@ from tkinter import font as tkfont
 from tkinter import messagebox
 import json
 from tkinter import ttk
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class LobbyBrowser(tk.Tk):
@@ -11,7 +14,7 @@ class LobbyBrowser(tk.Tk):
         self.controller = controller
         self.user_id = user_id
         self.games_played_today = games_played_today
-        print(f"USING LOBBY BROWSER WITH USER_ID: {self.user_id}")
+        logger.debug("USING LOBBY BROWSER WITH USER_ID: %s", self.user_id)
         self.username = self.controller.network_manager.send_message({"type": "get_username", "user_id": self.user_id})
         self.user_chips = self.controller.network_manager.send_message({"type": "request_user_chips", "user_id":
             self.user_id})
@@ -20,7 +23,7 @@ class LobbyBrowser(tk.Tk):
             messagebox.showinfo("Error", "Invalid user error")
             return
 
-        print(f"USER CHIPS: {self.user_chips}")
+        logger.debug("USER CHIPS: %s", self.user_chips)
         self.daily_game_limit = self.controller.network_manager.send_message({"type": "get_daily_game_limit", "user_id": self.user_id})
 
         # For the checkboxes to filter lobbies based on game options
@@ -136,7 +139,7 @@ class LobbyBrowser(tk.Tk):
             # Receiving data and appending it to the buffer
             data = self.controller.network_manager.client_socket.recv(16384)
             if not data:
-                print("No response from server")
+                logger.debug("No response from server")
                 return
             buffer += data.decode('utf-8')
 
@@ -144,21 +147,21 @@ class LobbyBrowser(tk.Tk):
             if '\n' in buffer:
                 message, buffer = buffer.split('\n', 1)
                 lobbies = json.loads(message)
-                print(lobbies)
+                logger.debug("%s", lobbies)
             else:
-                print("Incomplete message received")
+                logger.debug("Incomplete message received")
                 return
 
-        except Exception as e:
-            print(f"Error while populating lobby list: {e}")
-            print(f"Data received: {data}")
-            print(f"Lobbies received: {lobbies}")
+        except Exception:
+            logger.exception("Error while populating lobby list")
+            logger.debug("Data received: %s", data)
+            logger.debug("Lobbies received: %s", lobbies)
             return
 
-        print(f"Received lobbies: {lobbies}")
+        logger.debug("Received lobbies: %s", lobbies)
         self.populate_lobby_list(lobbies)
     def populate_lobby_list(self, lobbies):
-        print(f"Populating lobby list with {lobbies}")
+        logger.debug("Populating lobby list with %s", lobbies)
 
         row = 0
         col = 0
@@ -331,8 +334,8 @@ class CreateLobbyWindow(tk.Toplevel):
         except ValueError:
             messagebox.showerror("Error", "The buy in amount should be an integer")
             return
-        except Exception as e:
-            print(f"Exception: {e}")
+        except Exception:
+            logger.exception("Exception")
 
         if buy_in < 100:
             messagebox.showerror("Error", "The buy in amount should be at least 100 chips.")
@@ -368,6 +371,6 @@ class CreateLobbyWindow(tk.Toplevel):
 
             self.controller.join_lobby(self.user_id, lobby_id, show_odds)
 
-        except Exception as e:
-            print(f"Error while creating lobby: {e}")
+        except Exception:
+            logger.exception("Error while creating lobby")
             messagebox.showinfo("Error", "An error occurred while creating the lobby")
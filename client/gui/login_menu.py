@@ -1,5 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 class LoginMenu(tk.Tk):
     def __init__(self, controller):
@@ -67,7 +70,7 @@ class LoginMenu(tk.Tk):
 
         if result["success"]:
             self.user_id = result["user_id"]
-            print(self.user_id)
+            logger.debug("%s", self.user_id)
             self.controller.open_main_menu(self.user_id)
         else:
             messagebox.showerror("Error", f"{result['message']}")
@@ -2,6 +2,9 @@ import tkinter as tk
 from tkinter import font as tkfont
 from PIL import Image, ImageDraw, ImageTk
 from client.gui.user_profile import ProfilePictureManager
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 
@@ -11,7 +14,7 @@ class MainMenu(tk.Tk):
         self.controller = controller
         self.user_id = user_id
         # The print statement below is useful for debugging
-        print(f"USING MAIN MENU WITH USER_ID: {self.user_id}")
+        logger.debug("USING MAIN MENU WITH USER_ID: %s", self.user_id)
         # Reset the client's connection with the server
         self.controller.network_manager.reset_connection()
         self.profile_picture_manager = ProfilePictureManager(self.controller)
@@ -3,6 +3,9 @@ from tkinter import font as tkfont
 from tkinter import messagebox
 import json
 from tkinter import ttk
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class SettingsMenu(tk.Tk):
@@ -10,7 +13,7 @@ class SettingsMenu(tk.Tk):
         super().__init__(*args, **kwargs)
         self.controller = controller
         self.user_id = user_id
-        print(f"USING LOBBY BROWSER WITH USER_ID: {self.user_id}")
+        logger.debug("USING LOBBY BROWSER WITH USER_ID: %s", self.user_id)
         # Get any required data from the server
         self.username = self.controller.network_manager.send_message({"type": "get_username", "user_id": self.user_id})
         self.user_chips = self.controller.network_manager.send_message({"type": "request_user_chips", "user_id":
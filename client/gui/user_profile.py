@@ -9,6 +9,9 @@ from PIL import Image, ImageTk, ImageDraw
 from tkinter import messagebox, filedialog
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class UserProfile(tk.Frame):
@@ -406,7 +409,7 @@ class SelectProfilePic(tk.Toplevel):
         # Search for and delete previous profile pictures
         for old_file in glob.glob(f"gui/Images/Pfps/{self.profile_user_id}_*.png"):
             os.remove(old_file)
-            print(f"Removed old profile picture: {old_file}")
+            logger.debug("Removed old profile picture: %s", old_file)
 
     def resize_and_upload(self, file_path):
         # Resize the image
@@ -462,17 +465,17 @@ class ProfilePictureManager:
             "type": "get_user_profile_picture",
             "user_id": user_id
         })
-        print(f"filename_response: {filename_response}")
+        logger.debug("filename_response: %s", filename_response)
         if filename_response:
             filename = filename_response if filename_response else "default.png"
             local_file_path = os.path.join(self.profile_pictures_path, filename)
-            print(f"local_file_path: {local_file_path}")
+            logger.debug("local_file_path: %s", local_file_path)
 
             if not os.path.exists(local_file_path):
                 # Delete old profile pictures
                 for old_file in glob.glob(f"{self.profile_pictures_path}/{user_id}_*.png"):
                     os.remove(old_file)
-                    print(f"removed {old_file}")
+                    logger.debug("removed %s", old_file)
 
                 image_data_response = self.controller.network_manager.send_message({
                     "type": "get_profile_picture",
@@ -480,7 +483,7 @@ class ProfilePictureManager:
                 })
                 if image_data_response:
                     # Save the profile picture locally
-                    print(f"Image data response received")
+                    logger.debug("Image data response received")
                     if image_data_response.get("success"):
                         self.save_profile_picture(local_file_path, image_data_response['image_data'])
                     else:
@@ -494,4 +497,4 @@ class ProfilePictureManager:
         image_data = base64.b64decode(image_data_base64)
         with open(file_path, 'wb') as file:
             file.write(image_data)
-        print(f"Saved profile picture to {file_path}")
+        logger.debug("Saved profile picture to %s", file_path)
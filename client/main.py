@@ -1,5 +1,7 @@
 from gui.controller import Controller
+from shared.log import configure_logging
 
 if __name__ == "__main__":
+    configure_logging()
     controller = Controller()
     controller.run()
@@ -3,6 +3,9 @@ import hashlib
 import secrets
 import mysql.connector
 import re
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class UserAuth(DatabaseBase):
@@ -29,12 +32,12 @@ class UserAuth(DatabaseBase):
 
             # Compare the computed hash with the stored hash
             if hashed_password == stored_hashed_password:
-                print("User authenticated successfully!")
+                logger.debug("User authenticated successfully!")
                 cursor.execute("SELECT user_id FROM users WHERE username = %s", (username,))
                 user_id = cursor.fetchone()[0]
                 return {"success": True, "user_id": user_id, "message": "User authenticated successfully!"}
             else:
-                print("Invalid password")
+                logger.debug("Invalid password")
                 return {"success": False, "message": "Invalid username or password"}
 
     def register_user(self, username: str, password: str, email: str):
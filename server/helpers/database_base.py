@@ -1,5 +1,8 @@
 import mysql.connector
 from contextlib import contextmanager
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class DatabaseBase:
@@ -18,8 +21,8 @@ class DatabaseBase:
         try:
             yield cursor
             connection.commit()
-        except mysql.connector.Error as e:
-            print(f"Database error: {e}")
+        except mysql.connector.Error:
+            logger.exception("Database error")
             connection.rollback()
             raise
         finally:
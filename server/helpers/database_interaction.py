@@ -3,6 +3,9 @@ import math
 from helpers.database_base import DatabaseBase
 from datetime import datetime, date
 import mysql.connector
+from shared.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class DatabaseInteraction(DatabaseBase):
@@ -123,7 +126,7 @@ class DatabaseInteraction(DatabaseBase):
                 cursor.execute(command)
 
     def set_user_profile_picture(self, user_id, profile_picture_filename):
-        print("setting user profile picture in db_interaction")
+        logger.debug("setting user profile picture in db_interaction")
         try:
             with self._db_cursor() as cursor:
                 query = """UPDATE users
@@ -133,7 +136,7 @@ class DatabaseInteraction(DatabaseBase):
                 cursor.execute(query, (profile_picture_filename, user_id))
                 return {"success": True}
         except Exception as e:
-            print(f"Exception in set_user_profile_picture: {e}")
+            logger.exception("Exception in set_user_profile_picture")
             return {"success": False, "error": str(e)}
 
     def get_user_profile_picture(self, user_id):
@@ -147,8 +150,8 @@ class DatabaseInteraction(DatabaseBase):
                 cursor.execute(query, (user_id,))
                 result = cursor.fetchone()
                 return result[0] if result else "default.png"
-        except Exception as e:
-            print(f"Exception in get_user_profile_picture: {e}")
+        except Exception:
+            logger.exception("Exception in get_user_profile_picture")
             return "default.png"
 
     def add_to_attribute_for_user(self, user_id, attribute, amount):
@@ -318,6 +321,60 @@ class DatabaseInteraction(DatabaseBase):
             """
             cursor.execute(query, (game_id, user_id, pos, winnings, aggressiveness_score, conservativeness_score))
 
+    # Record the results of a completed game for all of its players at once, in a single transaction instead of a
+    # connection for every statistic of every player. player_results is a list of (user_id, finishing_position,
+    # winnings, won_game, aggressiveness_score, conservativeness_score) for each player
+    def record_game_results(self, game_id, game_duration, player_results):
+        with self._db_cursor() as cursor:
+            cursor.executemany("""
+                UPDATE user_statistics
+                SET games_played = games_played + 1,
+                    games_won = games_won + %s,
+                    total_play_time = total_play_time + %s
+                WHERE user_id = %s;
+            """, [(int(won_game), game_duration, user_id)
+                  for user_id, position, winnings, won_game, aggressiveness, conservativeness in player_results])
+
+            cursor.executemany("""
+                UPDATE user_game_limits
+                SET games_played_today = games_played_today + 1
+                WHERE user_id = %s;
+            """, [(player_result[0],) for player_result in player_results])
+
+            cursor.executemany("""
+                INSERT INTO game_results (game_id, user_id, pos, winnings, aggressiveness_score, conservativeness_score)
+                VALUES (%s, %s, %s, %s, %s, %s);
+            """, [(game_id, user_id, position, winnings, aggressiveness, conservativeness)
+                  for user_id, position, winnings, won_game, aggressiveness, conservativeness in player_results])
+
+            # The average scores include this game, so they are worked out after games_played has been updated
+            user_ids = [player_result[0] for player_result in player_results]
+            cursor.execute(f"""
+                SELECT user_id, games_played, average_aggressiveness_score, average_conservativeness_score
+                FROM user_statistics
+                WHERE user_id IN ({", ".join(["%s"] * len(user_ids))});
+            """, user_ids)
+            current_averages = {user_id: (games_played, average_aggressiveness, average_conservativeness)
+                                for user_id, games_played, average_aggressiveness, average_conservativeness
+                                in cursor.fetchall()}
+
+            new_averages = []
+            for user_id, position, winnings, won_game, aggressiveness, conservativeness in player_results:
+                if user_id not in current_averages:
+                    continue
+                games_played, average_aggressiveness, average_conservativeness = current_averages[user_id]
+                new_averages.append((round((average_aggressiveness * (games_played - 1) + aggressiveness) /
+                                           games_played, 2),
+                                     round((average_conservativeness * (games_played - 1) + conservativeness) /
+                                           games_played, 2),
+                                     user_id))
+            cursor.executemany("""
+                UPDATE user_statistics
+                SET average_aggressiveness_score = %s,
+                    average_conservativeness_score = %s
+                WHERE user_id = %s;
+            """, new_averages)
+
     def get_game_duration(self, game_id):
         with self._db_cursor() as cursor:
             # Get the duration of the game in seconds
@@ -372,13 +429,13 @@ class DatabaseInteraction(DatabaseBase):
 
             daily_game_limit, games_played_today, last_logged_in = limit_data or (10, 0, None)
             # Print statement to see that the RGScore is being updated for a user
-            print(f"UPDATING RGSCORE FOR USER {user_id}. Current_rgscore: {current_rgscore}, current_streak:"
-                  f" {current_streak}, daily_game_limit: {daily_game_limit}, games_played_today: "
-                  f"{games_played_today}, last_logged_in: {last_logged_in}")
+            logger.debug("UPDATING RGSCORE FOR USER %s. Current_rgscore: %s, current_streak: %s, daily_game_limit: "
+                         "%s, games_played_today: %s, last_logged_in: %s", user_id, current_rgscore, current_streak,
+                         daily_game_limit, games_played_today, last_logged_in)
 
             if last_logged_in is not None:
                 last_logged_in_date = last_logged_in.date()
-                print(f"LAST_LOGGED_IN_DATE: {last_logged_in_date}")
+                logger.debug("LAST_LOGGED_IN_DATE: %s", last_logged_in_date)
             else:
                 last_logged_in_date = None
 
@@ -389,14 +446,14 @@ class DatabaseInteraction(DatabaseBase):
                 games_played_above_limit = games_played_today - daily_game_limit
                 if games_played_above_limit < 0:
                     games_played_above_limit = 0
-                print(f"updated games_played_above_limit to: {games_played_above_limit}")
+                logger.debug("updated games_played_above_limit to: %s", games_played_above_limit)
 
                 # Check if the user stayed within their limit the last day that they played
                 if games_played_today <= daily_game_limit:
                     current_streak += 1
                 else:
                     current_streak = 0
-                print(f"current_streak: {current_streak}")
+                logger.debug("current_streak: %s", current_streak)
 
                 # Calculate the new RGScore making sure it doesn't go below 0
                 influence = 0.5  # This value could be adjusted over time if another value works better
@@ -404,7 +461,7 @@ class DatabaseInteraction(DatabaseBase):
                 new_rgscore = round(current_rgscore + rgscore_adjustment, 2)
                 if new_rgscore < 0:
                     new_rgscore = 0
-                print(f"rgscore_adjustment: {rgscore_adjustment}, new_rgscore: {new_rgscore}")
+                logger.debug("rgscore_adjustment: %s, new_rgscore: %s", rgscore_adjustment, new_rgscore)
 
                 # Update the user_statistics with the new RGScore and streak
                 cursor.execute("""
@@ -469,7 +526,7 @@ class DatabaseInteraction(DatabaseBase):
             query = "SELECT daily_game_limit FROM user_game_limits WHERE user_id = %s;"
             cursor.execute(query, (user_id,))
             result = cursor.fetchone()
-            print(f"Result from get_daily_game_limit: {result}")
+            logger.debug("Result from get_daily_game_limit: %s", result)
             return result[0] if result else None
 
     def get_top_players_by_attribute(self, attribute, limit=50):
@@ -588,8 +645,8 @@ class DatabaseInteraction(DatabaseBase):
                 sorted_lobbies = self.sort_lobbies_using_merge(lobbies_list)
 
                 return sorted_lobbies
-        except Exception as e:
-            print(f"Error: {e}")
+        except Exception:
+            logger.exception("Error")
             return []
 
     def merge_sorted_lobbies(self, left_lobbies, right_lobbies):
@@ -674,11 +731,11 @@ class DatabaseInteraction(DatabaseBase):
                 response["success"] = False
                 response["error"] = f"Error: {e}"
 
-        print(f"set lobby status to {lobby_status}")
+        logger.debug("set lobby status to %s", lobby_status)
         return response
 
     def join_lobby(self, user_id, lobby_id):
-        print("(database interaction): joining lobby")
+        logger.debug("(database interaction): joining lobby")
         response = {"success": True, "error": None}
 
         try:
@@ -705,8 +762,8 @@ class DatabaseInteraction(DatabaseBase):
             cursor.execute(query, (user_id, lobby_id))
             connection.commit()
 
-        except Exception as e:
-            print(f"Error removing player from lobby database: {e}")
+        except Exception:
+            logger.exception("Error removing player from lobby database")
         finally:
             if connection.is_connected():
                 cursor.close()
@@ -717,5 +774,5 @@ class DatabaseInteraction(DatabaseBase):
             query = "SELECT game_id FROM games WHERE lobby_id = %s;"
             cursor.execute(query, (lobby_id,))
             result = cursor.fetchone()
-            print(f"Result from get_game_id_from_lobby_id: {result}")
+            logger.debug("Result from get_game_id_from_lobby_id: %s", result)
             return result[0] if result else None
@@ -0,0 +1,180 @@
+import atexit
+import functools
+import glob
+import json
+import os
+import threading
+
+from shared.game_events import apply_event
+from shared.game_logic import Game
+from shared.log import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots")
+# How often the snapshots and events of lobbies that have changed are written to disk
+SNAPSHOT_INTERVAL_SECONDS = 1.0
+
+
+# Saves every lobby's Game to disk, so that a restarted server can carry on every game in progress. The games are
+# saved from their GameEventLog (see shared/game_events.py) instead of from the games themselves: each lobby has a
+# snapshot file, holding the newest snapshot the log has kept, and a journal of every event applied since then, one
+# JSON line per event. A lobby is restored by applying the events in its journal to its snapshot.
+#
+# Following an event log only queues its events and snapshots, so the request threads never wait for the disk. They
+# are written on a background thread every SNAPSHOT_INTERVAL_SECONDS. The snapshot file is replaced atomically: the
+# snapshot is written to a temporary file, flushed to disk and then renamed over the old file, so a crash at any point
+# leaves either the old or the new snapshot. Every line of the journal has the version of the log after its event, so
+# events that are already part of the snapshot (because of a crash before the journal was started again) are skipped.
+class GameSnapshots:
+    def __init__(self, directory=SNAPSHOT_DIRECTORY, interval_seconds=SNAPSHOT_INTERVAL_SECONDS):
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        os.makedirs(self.directory, exist_ok=True)
+        # lobby_id -> the snapshots and events that have not been written yet, in order. A snapshot is
+        # ("snapshot", version, snapshot), an event is ("event", version, event) and None means the lobby's files
+        # should be deleted
+        self.__pending = {}
+        # The lobbies whose event logs are being followed
+        self.__followed_lobbies = set()
+        self.__lock = threading.Lock()
+        # Held while writing, so that an older snapshot of a lobby can never be written after a newer one
+        self.__write_lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__writer_thread = threading.Thread(target=self.__write_periodically, daemon=True)
+        self.__writer_thread.start()
+        atexit.register(self.stop)
+
+    # Save a lobby from now on by following its event log, starting with the newest snapshot the log has kept and the
+    # events since then. The log must not be undone while it is followed
+    def follow(self, lobby_id, event_log):
+        snapshot_version, snapshot = event_log.get_latest_snapshot()
+        with self.__lock:
+            self.__followed_lobbies.add(lobby_id)
+            self.__pending[lobby_id] = [("snapshot", snapshot_version, snapshot)] + \
+                [("event", version, event) for version, event in
+                 enumerate(event_log.get_events_since(snapshot_version), snapshot_version + 1)]
+        event_log.add_listener(functools.partial(self.__add_event, lobby_id, event_log))
+
+    # Stop saving a lobby that no longer exists and delete its files
+    def discard(self, lobby_id):
+        with self.__lock:
+            self.__followed_lobbies.discard(lobby_id)
+            self.__pending[lobby_id] = [None]
+
+    # Restore every lobby that has been saved. Returns a dictionary of lobby_id to Game. Nobody is connected to a
+    # restored game, so every player is marked as disconnected and can come back through reconnect_player()
+    def load_all(self):
+        lobbies = {}
+        for path in glob.glob(self.__get_snapshot_path("*")):
+            try:
+                with open(path) as file:
+                    saved = json.load(file)
+                lobbies[saved["lobby_id"]] = self.__restore(saved)
+            except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+                logger.error("Could not restore the lobby snapshot %s: %s", path, e)
+        return lobbies
+
+    # Write everything pending now
+    def flush(self):
+        with self.__write_lock:
+            with self.__lock:
+                pending, self.__pending = self.__pending, {}
+            for lobby_id, items in pending.items():
+                try:
+                    self.__write_lobby(lobby_id, items)
+                except (OSError, TypeError, ValueError) as e:
+                    logger.error("Could not save lobby %s: %s", lobby_id, e)
+
+    # Stop the background thread, writing anything that is still pending
+    def stop(self):
+        self.__stop_event.set()
+        self.flush()
+
+    # The listener of a followed event log
+    def __add_event(self, lobby_id, event_log, event, records):
+        snapshot_version, snapshot = event_log.get_latest_snapshot()
+        with self.__lock:
+            if lobby_id not in self.__followed_lobbies:
+                return
+            items = self.__pending.setdefault(lobby_id, [])
+            if snapshot_version == event_log.version:
+                # The log has just taken a snapshot, so nothing before it has to be written any more
+                items[:] = [("snapshot", snapshot_version, snapshot)]
+            else:
+                items.append(("event", event_log.version, event))
+
+    def __write_periodically(self):
+        while not self.__stop_event.wait(self.interval_seconds):
+            self.flush()
+
+    def __get_snapshot_path(self, lobby_id):
+        return os.path.join(self.directory, f"lobby_{lobby_id}.json")
+
+    def __get_journal_path(self, lobby_id):
+        return os.path.join(self.directory, f"lobby_{lobby_id}.events.jsonl")
+
+    def __restore(self, saved):
+        # The events were applied to players who were connected, so they are applied before anyone is disconnected
+        game = Game.from_snapshot(saved["game"], disconnect_players=False)
+        version = saved["version"]
+        journal_path = self.__get_journal_path(saved["lobby_id"])
+        if os.path.exists(journal_path):
+            with open(journal_path) as file:
+                for line in file:
+                    # A last line that was only partly written (e.g. because the server crashed) is skipped
+                    if not line.endswith("\n"):
+                        break
+                    event_version, event_type, arguments, draws = json.loads(line)
+                    if event_version <= version:
+                        continue
+                    if event_version != version + 1:
+                        logger.error("The journal of lobby %s is missing events after version %s", saved["lobby_id"],
+                                     version)
+                        break
+                    apply_event(game, (event_type, tuple(arguments), tuple(draws)))
+                    version = event_version
+        return Game.from_snapshot(game.to_snapshot())
+
+    # Write the pending items of a lobby. Only the newest snapshot (or deletion) matters, along with the events after it
+    def __write_lobby(self, lobby_id, items):
+        start = 0
+        for index, item in enumerate(items):
+            if item is None or item[0] == "snapshot":
+                start = index
+        if items[start] is None:
+            self.__delete_files(lobby_id)
+            return
+        if items[start][0] == "snapshot":
+            _, version, snapshot = items[start]
+            self.__write_snapshot(lobby_id, version, snapshot)
+            # Every event in the old journal is part of the new snapshot
+            self.__delete_file(self.__get_journal_path(lobby_id))
+            start += 1
+
+        if start < len(items):
+            with open(self.__get_journal_path(lobby_id), "a") as file:
+                for _, version, (event_type, arguments, draws) in items[start:]:
+                    file.write(json.dumps([version, event_type, arguments, draws], separators=(",", ":")) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def __write_snapshot(self, lobby_id, version, snapshot):
+        path = self.__get_snapshot_path(lobby_id)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"lobby_id": lobby_id, "version": version, "game": snapshot}, file, separators=(",", ":"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+    def __delete_files(self, lobby_id):
+        self.__delete_file(self.__get_snapshot_path(lobby_id))
+        self.__delete_file(self.__get_journal_path(lobby_id))
+
+    @staticmethod
+    def __delete_file(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,102 @@
+import json
+import threading
+
+from shared.state_patches import diff_state
+
+
+# Keeps track of the game state that was last sent to every player, so that each update only carries what has changed
+# since then. Every broadcast in a lobby gets the next version number of that lobby, and an update is either:
+#   {"type": "update_game_state", "version": v, "game_state": <the public state>, "user_id": ..., "private": ...}
+# for a player who has not been sent a state yet (or has asked for the whole state again), or
+#   {"type": "update_game_state", "version": v, "base_version": b, "patch": <patch>, "user_id": ..., "private": ...}
+# where the patch (see diff_state()) turns the public state of version b into the public state of version v. The
+# private part is the small part of the state that only that player can see (their hand) and is always sent whole.
+#
+# Messages to a client arrive in order over its TCP connection, so the last version sent is the one the client has.
+# If a client ever has a different version (e.g. it dropped a message it could not decode), it ignores the patch and
+# asks for the whole state again.
+#
+# The public part of an update is the same for every player with the same base version (which is normally everyone),
+# so it is encoded to JSON once and the players' own fields are spliced in around it.
+class GameStateVersions:
+    def __init__(self):
+        self.__versions = {}
+        # lobby_id -> {version: public state} for the versions that a player was last sent
+        self.__public_states = {}
+        # lobby_id -> {user_id: the version of the last state sent to that player}
+        self.__sent_versions = {}
+        self.__lock = threading.Lock()
+
+    # Build the encoded update messages for a new version of the public state of a lobby. private_states maps the
+    # user id of each player to send the update to onto their private state. Returns a dictionary of user id to the
+    # bytes to send them, ending with a newline
+    def build_updates(self, lobby_id, public_state, private_states):
+        with self.__lock:
+            version = self.__next_version(lobby_id)
+            public_states = self.__public_states.setdefault(lobby_id, {})
+            sent_versions = self.__sent_versions.setdefault(lobby_id, {})
+
+            encoded_public_parts = {}
+            updates = {}
+            for user_id, private_state in private_states.items():
+                base_version = sent_versions.get(user_id)
+                if base_version not in encoded_public_parts:
+                    encoded_public_parts[base_version] = self.__encode_public_part(version, public_state,
+                                                                                   base_version, public_states)
+                updates[user_id] = self.__encode_update(encoded_public_parts[base_version], user_id, private_state)
+                sent_versions[user_id] = version
+
+            self.__store_public_state(lobby_id, version, public_state)
+            return updates
+
+    # Build the encoded update message with the whole current state for one player, e.g. when a client asks for the
+    # whole state again. It gets a version of its own, as the state may have changed since the last broadcast
+    def build_full_update(self, lobby_id, user_id, public_state, private_state):
+        with self.__lock:
+            version = self.__next_version(lobby_id)
+            self.__sent_versions.setdefault(lobby_id, {})[user_id] = version
+            self.__store_public_state(lobby_id, version, public_state)
+            return self.__encode_update(self.__encode_public_part(version, public_state), user_id, private_state)
+
+    def __next_version(self, lobby_id):
+        self.__versions[lobby_id] = self.__versions.get(lobby_id, 0) + 1
+        return self.__versions[lobby_id]
+
+    # Store a public state so that patches can be made from it. Only the versions that some player was last sent can
+    # be the base of a patch, so the rest are dropped
+    def __store_public_state(self, lobby_id, version, public_state):
+        public_states = self.__public_states.setdefault(lobby_id, {})
+        public_states[version] = public_state
+        versions_in_use = set(self.__sent_versions.get(lobby_id, {}).values())
+        for unused_version in [stored_version for stored_version in public_states
+                               if stored_version not in versions_in_use]:
+            del public_states[unused_version]
+
+    # Encode the part of an update shared by every player with the same base version. Without a base version (or if
+    # the base version is unknown) it holds the whole public state
+    @staticmethod
+    def __encode_public_part(version, public_state, base_version=None, public_states=None):
+        if base_version is None or base_version not in public_states:
+            fields = {"type": "update_game_state", "version": version, "game_state": public_state}
+        else:
+            fields = {"type": "update_game_state", "version": version, "base_version": base_version,
+                      "patch": diff_state(public_states[base_version], public_state)}
+        # Leave off the closing brace so that the player's own fields can be added on the end
+        return json.dumps(fields)[:-1].encode('utf-8')
+
+    @staticmethod
+    def __encode_update(encoded_public_part, user_id, private_state):
+        return encoded_public_part + (', "user_id": ' + json.dumps(user_id) + ', "private": ' +
+                                      json.dumps(private_state) + '}\n').encode('utf-8')
+
+    # Forget the last state sent to a player, so that their next update is the whole state. This is used when they
+    # reconnect and when they are not sent a state that everyone else is sent
+    def forget_player(self, lobby_id, user_id):
+        with self.__lock:
+            self.__sent_versions.get(lobby_id, {}).pop(user_id, None)
+
+    def forget_lobby(self, lobby_id):
+        with self.__lock:
+            self.__versions.pop(lobby_id, None)
+            self.__public_states.pop(lobby_id, None)
+            self.__sent_versions.pop(lobby_id, None)
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import permutations
+
+from shared.evaluation_cache import EvaluationCache
+from shared.hand_evaluator import RANKS, SUITS
+from shared.odds_logic import DEFAULT_PRECISION, DEFAULT_TIME_BUDGET_MS, hand_equity, monte_carlo_hand_odds
+
+# Every way of relabelling the four suits. Swapping suits around never changes the odds of a hand, so all 24
+# relabellings of a situation share one cache entry
+_SUIT_PERMUTATIONS = list(permutations(range(len(SUITS))))
+
+
+# Get the canonical form of some hole cards and community cards given as card codes: out of every way of relabelling
+# the suits, the one which gives the smallest sorted codes. Any two situations that only differ by their suits (e.g.
+# Ace and King of Hearts against Ace and King of Spades preflop) have the same canonical form
+def canonical_situation(hole_codes, board_codes):
+    return min((tuple(sorted(suit_permutation[code // 13] * 13 + code % 13 for code in hole_codes)),
+                tuple(sorted(suit_permutation[code // 13] * 13 + code % 13 for code in board_codes)))
+               for suit_permutation in _SUIT_PERMUTATIONS)
+
+
+# Works out odds for every lobby on the server. Calculations run in a small pool of worker threads (which spread
+# any sampling across every CPU core), and results are cached by their canonical situation and number of opponents,
+# so repeated and isomorphic queries from any lobby are answered from memory. The cache holds Futures, so a query
+# for a situation that is still being worked out waits for the same calculation instead of starting another one.
+class OddsService:
+    def __init__(self, workers=2, max_size=20000, precision=DEFAULT_PRECISION, time_budget_ms=DEFAULT_TIME_BUDGET_MS):
+        self.precision = precision
+        self.time_budget_ms = time_budget_ms
+        self.__workers = ThreadPoolExecutor(max_workers=workers)
+        # Two threads that miss the cache at exactly the same time may both start a calculation, which only wastes
+        # a little work as both give valid odds
+        self.__cache = EvaluationCache(self.__start_calculation, max_size)
+
+    # Start working out (or find the cached) odds for some hole cards and community cards given as card codes against
+    # a number of opponents. Returns a Future whose result is ((hand odds, margins), (equity, margins))
+    def submit(self, hole_codes, board_codes, opponents):
+        key = (canonical_situation(hole_codes, board_codes), opponents)
+        future = self.__cache.lookup(key)
+        # Calculations that failed are not kept, so that they are tried again next time
+        if future.done() and future.exception() is not None:
+            self.__cache.discard(key)
+        return future
+
+    def __start_calculation(self, key):
+        return self.__workers.submit(self.__calculate, key)
+
+    def __calculate(self, key):
+        (hole_codes, board_codes), opponents = key
+        hand_cards = [[SUITS[code // 13], RANKS[code % 13]] for code in hole_codes]
+        community_cards = [[SUITS[code // 13], RANKS[code % 13]] for code in board_codes]
+        return (monte_carlo_hand_odds(hand_cards, community_cards, self.precision, self.time_budget_ms / 2,
+                                      use_process_pool=True),
+                hand_equity(hand_cards, community_cards, opponents, self.precision, self.time_budget_ms / 2,
+                            use_process_pool=True))
+
+    def get_stats(self):
+        return self.__cache.get_stats()
@@ -0,0 +1,96 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.log import get_logger
+
+logger = get_logger(__name__)
+
+TICK_SECONDS = 0.1
+# With 0.1 second ticks, one turn of the wheel is 51.2 seconds
+NUMBER_OF_SLOTS = 512
+CALLBACK_WORKERS = 4
+
+
+# A hashed timing wheel, which runs every timer in the server (such as the turn clock of every lobby) on one thread with
+# one tick, however many timers there are. The wheel is a ring of slots, each holding the timers that expire in it,
+# and every tick moves on to the next slot and fires the timers in it that are due. A timer further away than one turn
+# of the wheel waits in its slot for that many whole turns first. Scheduling or cancelling a timer is O(1), and a tick
+# only has to look at the timers in one slot.
+#
+# Every timer has a key, and scheduling a timer replaces any timer that already has the same key. The callbacks run on
+# a small pool of threads, so a slow callback (e.g. one sending to a slow client) can never hold up the wheel.
+class TimingWheel:
+    def __init__(self, tick_seconds=TICK_SECONDS, number_of_slots=NUMBER_OF_SLOTS):
+        self.tick_seconds = tick_seconds
+        self.number_of_slots = number_of_slots
+        # Each slot maps the key of every timer in it to (the number of whole turns it still has to wait, callback)
+        self.__slots = [{} for _ in range(number_of_slots)]
+        # key -> the slot that the timer with that key is in
+        self.__timer_slots = {}
+        self.__current_slot = 0
+        self.__lock = threading.Lock()
+        self.__callback_pool = ThreadPoolExecutor(max_workers=CALLBACK_WORKERS, thread_name_prefix="timing_wheel")
+        self.__stop_event = threading.Event()
+        self.__wheel_thread = threading.Thread(target=self.__run, daemon=True)
+        self.__wheel_thread.start()
+
+    # Call callback after delay_seconds, rounded up to a whole number of ticks. Any timer with the same key is cancelled
+    def schedule(self, key, delay_seconds, callback):
+        ticks = max(1, math.ceil(delay_seconds / self.tick_seconds))
+        with self.__lock:
+            self.__remove(key)
+            slot = (self.__current_slot + ticks) % self.number_of_slots
+            self.__slots[slot][key] = ((ticks - 1) // self.number_of_slots, callback)
+            self.__timer_slots[key] = slot
+
+    def cancel(self, key):
+        with self.__lock:
+            self.__remove(key)
+
+    # The number of timers waiting to fire
+    def __len__(self):
+        return len(self.__timer_slots)
+
+    def stop(self):
+        self.__stop_event.set()
+        self.__wheel_thread.join()
+        self.__callback_pool.shutdown(wait=False)
+
+    def __remove(self, key):
+        slot = self.__timer_slots.pop(key, None)
+        if slot is not None:
+            del self.__slots[slot][key]
+
+    def __run(self):
+        # Ticks are timed from when the wheel started instead of from the end of the last tick, so they do not drift.
+        # If ticks are missed (e.g. because the machine was busy), they are all caught up on at once
+        next_tick_time = time.monotonic() + self.tick_seconds
+        while not self.__stop_event.wait(max(0.0, next_tick_time - time.monotonic())):
+            while next_tick_time <= time.monotonic():
+                self.__tick()
+                next_tick_time += self.tick_seconds
+
+    def __tick(self):
+        expired_callbacks = []
+        with self.__lock:
+            self.__current_slot = (self.__current_slot + 1) % self.number_of_slots
+            slot = self.__slots[self.__current_slot]
+            for key, (turns, callback) in list(slot.items()):
+                if turns == 0:
+                    del slot[key]
+                    del self.__timer_slots[key]
+                    expired_callbacks.append(callback)
+                else:
+                    slot[key] = (turns - 1, callback)
+
+        for callback in expired_callbacks:
+            self.__callback_pool.submit(self.__run_callback, callback)
+
+    @staticmethod
+    def __run_callback(callback):
+        try:
+            callback()
+        except Exception:
+            logger.exception("A timer's callback failed")
@@ -1,17 +1,37 @@
 import base64
+import functools
 import glob
 import os
 import socket
 import threading
+import logging
 import json
 from helpers.database_interaction import DatabaseInteraction
-from shared.game_logic import Game, Player
+from helpers.game_snapshots import GameSnapshots
+from helpers.game_state_versions import GameStateVersions
+from helpers.odds_service import OddsService
+from helpers.timing_wheel import TimingWheel
+from shared.game_events import GameEventLog
+from shared.game_logic import ACTION_COUNTERS, Game
+from shared.hand_history import HandHistoryWriter
 from helpers.auth import UserAuth
 from typing import Dict
+from shared.log import configure_logging, get_logger
+
+logger = get_logger("server")
+
+HAND_HISTORY_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hand_histories")
+
+# How long a player has to act before the server checks for them, or folds for them if they cannot check
+TURN_TIMEOUT_SECONDS = 30
+# How long the clients show a showdown for before the next round is started (the same as the clients' own delay)
+SHOWDOWN_DISPLAY_SECONDS = 9
+# How long a game restored after a restart waits for any of its players to reconnect before it is abandoned
+RESTORED_LOBBY_REJOIN_SECONDS = 300
 
 
 class LobbyServer:
-    def __init__(self, host='127.0.0.1', port=12345):
+    def __init__(self, host='127.0.0.1', port=12345, turn_timeout_seconds=TURN_TIMEOUT_SECONDS):
         # Set up the server socket which listens for incoming connections
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.bind((host, port))
@@ -20,9 +40,54 @@ class LobbyServer:
         self.database_interaction = DatabaseInteraction()
         self.user_auth = UserAuth()
         self.lobbies: Dict[str, Game] = {}  # Type hinting explicitly used for easier development
+        # The odds service is shared by every lobby, so the same odds are never worked out twice
+        self.odds_service = OddsService()
+        # Game state updates only carry what has changed since the last state each player was sent
+        self.game_state_versions = GameStateVersions()
+        # Every change to a lobby's game goes through the lobby's event log (see shared/game_events.py), which the
+        # snapshots and the hand history are both written from
+        self.event_logs: Dict[str, GameEventLog] = {}
+        # Every lobby has a turn clock, so that an idle player cannot stall the table. The clocks of all the lobbies
+        # are timers on one timing wheel, instead of a thread or timer for each lobby
+        self.turn_timeout_seconds = turn_timeout_seconds
+        self.timing_wheel = TimingWheel()
+        # lobby_id -> the number of the turn whose clock is running, so that a timer for an earlier turn does nothing
+        self.turn_numbers = {}
+        # lobby_id -> a lock held while an action in that lobby is processed, so that a player acting just as their
+        # time runs out cannot act twice. Each lobby has its own lock, so the lobbies never wait for each other
+        self.lobby_locks = {}
+        # Every lobby is saved to disk in the background, and the lobbies saved before the server last stopped are
+        # restored, so games in progress survive a restart. Their players can rejoin as reconnecting players
+        self.game_snapshots = GameSnapshots()
+        # Every hand of every lobby is recorded to a hand history file
+        self.hand_history = HandHistoryWriter(HAND_HISTORY_DIRECTORY)
+        self.__restore_lobbies()
+
+    # Carry on every lobby that was saved before the server last stopped
+    def __restore_lobbies(self):
+        for lobby_id, game in self.game_snapshots.load_all().items():
+            self.__add_lobby(lobby_id, game)
+            if not game.game_started:
+                # Players can only reconnect to a game that has started, so anyone waiting in a lobby that had not
+                # started has to join it again. Otherwise they would be given a second seat when they join and
+                # the seat they left behind would count towards the player limit
+                for user_id in [player.user_id for player in game.players]:
+                    self.__apply_event(lobby_id, "remove_player", user_id, True)
+                    self.database_interaction.remove_player_from_lobby(user_id, lobby_id)
+            # The clocks of the lobbies restored from snapshots are started straight away, so a restored table
+            # cannot stall if the player whose turn it is never comes back. Until someone reconnects to a game that
+            # has started, nobody's clock runs, and if nobody comes back the lobby is abandoned, as nobody is left to
+            # leave it
+            with self.__get_lobby_lock(lobby_id):
+                self.__restart_turn_clock(lobby_id)
+            if game.game_started:
+                self.timing_wheel.schedule(("abandon", lobby_id), RESTORED_LOBBY_REJOIN_SECONDS,
+                                           functools.partial(self.__abandon_restored_lobby, lobby_id))
+        if self.lobbies:
+            logger.info("Restored %s lobbies from snapshots", len(self.lobbies))
 
     def start(self):
-        print("Server started successfully...")
+        logger.info("Server started successfully...")
         while True:
             client_socket, addr = self.server_socket.accept()
             client_handler = threading.Thread(target=self.__handle_client, args=(client_socket,))
@@ -35,15 +100,15 @@ class LobbyServer:
                 # Receive data from the client and handle any potential errors
                 data = client_socket.recv(16384)
                 if not data:
-                    print("No data from client socket, searching for disconnected player")
+                    logger.debug("No data from client socket, searching for disconnected player")
                     user_id, lobby_id = self.__find_disconnected_player(client_socket)
-                    print(f"User_id: {user_id}, Lobby_id: {lobby_id})")
+                    logger.debug("User_id: %s, Lobby_id: %s)", user_id, lobby_id)
                     if user_id and lobby_id:
                         if not self.__find_player_from_user_id(user_id, self.lobbies[lobby_id]).disconnected:
                             self.__leave_lobby(user_id, lobby_id, client_socket)
                     break
             except ConnectionResetError:
-                print("Connection was reset by client.")
+                logger.info("Connection was reset by client.")
                 user_id, lobby_id = self.__find_disconnected_player(client_socket)
                 if user_id and lobby_id:
                     self.__leave_lobby(user_id, lobby_id, client_socket)
@@ -58,21 +123,21 @@ class LobbyServer:
                 try:
                     # Parsing the message instead of the whole data
                     request = json.loads(message)
-                    print(f"Request: {request}")
-                    print(f"Client socket: {client_socket}")
+                    logger.debug("Request: %s", request)
+                    logger.debug("Client socket: %s", client_socket)
 
                     response = None
                     if request['type'] == 'get_all_lobbies':
-                        print("getting lobbies")
+                        logger.debug("getting lobbies")
                         response = self.__get_all_lobbies(request)
                     elif request['type'] == 'create_lobby':
-                        print("creating lobby")
+                        logger.debug("creating lobby")
                         response = self.__create_lobby(request)
                     elif request['type'] == 'join_lobby':
-                        print("joining lobby")
+                        logger.debug("joining lobby")
                         response = self.join_lobby(request, client_socket)
                     elif request['type'] == 'leave_lobby':
-                        print(f"PLAYER LEAVING LOBBY: {client_socket}")
+                        logger.debug("PLAYER LEAVING LOBBY: %s", client_socket)
                         response = self.__leave_lobby(request['user_id'], request['lobby_id'], client_socket)
                     elif request["type"] == "start_game":
                         self.__handle_start_game(request["lobby_id"])
@@ -93,10 +158,15 @@ class LobbyServer:
                         self.__broadcast_showdown_game_state(request["lobby_id"])
                     elif request["type"] == "broadcast_new_game_state":
                         self.__broadcast_game_state(request["lobby_id"], None, True)
+                    elif request["type"] == "request_full_game_state":
+                        self.__send_full_game_state(request["lobby_id"], request["user_id"], client_socket)
                     elif request["type"] == 'broadcast_completed_game_state':
                         self.__broadcast_completed_game_state(request['lobby_id'])
                     elif request["type"] == 'get_data_for_odds':
                         response = self.__get_data_for_odds(request['user_id'], request['lobby_id'])
+                    elif request["type"] == 'get_odds':
+                        self.__send_odds(request['user_id'], request['lobby_id'], request['request_id'],
+                                         client_socket)
                     elif request["type"] == 'request_user_chips':
                         response = self.database_interaction.get_chip_balance_for_user(request['user_id'])
                     elif request["type"] == 'add_to_chip_balance_for_user':
@@ -160,70 +230,52 @@ class LobbyServer:
 
                     if response is not None:
                         client_socket.sendall((json.dumps(response) + '\n').encode('utf-8'))
-                        print(f"(handle client): Response: {response}")
-                        print(f"Sent response to {client_socket}")
+                        logger.debug("(handle client): Response: %s", response)
+                        logger.debug("Sent response to %s", client_socket)
 
                 except json.JSONDecodeError as e:
-                    print(f"JSON Decode Error: {e}")
-                    print(f"Data causing the error: {message}")
+                    logger.warning("JSON Decode Error: %s", e)
+                    logger.warning("Data causing the error: %s", message)
                     buffer = ""  # Clear the buffer to avoid parsing the same invalid data again
 
         client_socket.close()
 
     def __start_next_round(self, request):
-        print("STARTING NEXT ROUND!!")
+        logger.debug("STARTING NEXT ROUND!!")
         lobby_id = request.get("lobby_id")
-        print("got lobby")
+        logger.debug("got lobby")
         game = self.lobbies[lobby_id]
-        print("got game")
-        start_round_response = game.start_round()
-        print(f"start_round_response: {start_round_response}")
+        logger.debug("got game")
+        with self.__get_lobby_lock(lobby_id):
+            start_round_response = self.__apply_event(lobby_id, "start_round")
+            self.__restart_turn_clock(lobby_id)
+        logger.debug("start_round_response: %s", start_round_response)
         # If the poker game is detected to be finished, make the necessary changes in the database
         if start_round_response == "game_completed":
-            print("(server.py): game completed")
+            logger.debug("(server.py): game completed")
             # Add the chips that the player has won to their balance
-            print(f"winning_player: {[player for player in game.players if player.won_game]}")
+            logger.debug("winning_player: %s", [player for player in game.players if player.won_game])
             winning_player = [player for player in game.players if player.won_game][0]
-            print(f"Adding {game.total_pot} chips to {winning_player.name}")
+            logger.debug("Adding %s chips to %s", game.total_pot, winning_player.name)
             self.database_interaction.add_to_chip_balance_for_user(winning_player.user_id, game.total_pot)
-            self.database_interaction.add_to_attribute_for_user(winning_player.user_id, "games_won", 1)
             game_id = self.database_interaction.get_game_id_from_lobby_id(lobby_id)
             self.database_interaction.end_game(game_id)
             game_duration = self.database_interaction.get_game_duration(game_id)
 
-            for player in game.players:
-                # Handle the relevant statistics for each player
-                if player.number_of_times_acted != 0:
-                    # Avoid division by zero error in case the player left before acting
-                    player.aggressiveness_score = round((player.number_of_times_raised / player.number_of_times_acted) *
-                                                        100, 2)
-                    player.conservativeness_score = round(((player.number_of_times_folded +
-                                                            player.number_of_times_checked)
-                                                           / player.number_of_times_acted) * 100, 2)
-
-                self.database_interaction.add_to_attribute_for_user(player.user_id, "games_played", 1)
-                self.database_interaction.update_game_limit_after_completion(player.user_id)
-                self.database_interaction.add_to_attribute_for_user(player.user_id, "total_play_time", game_duration)
-
-                # Modify player data for the winner and for every other player appropriately
-                if player.won_game:
-                    self.database_interaction.insert_game_results(game_id, player.user_id, player.finishing_position,
-                                                                  game.total_pot, player.aggressiveness_score,
-                                                                  player.conservativeness_score)
-                    self.database_interaction.add_to_attribute_for_user(player.user_id, "games_won", 1)
-                else:
-                    self.database_interaction.insert_game_results(game_id, player.user_id, player.finishing_position,
-                                                                  -game.starting_chips, player.aggressiveness_score,
-                                                                  player.conservativeness_score)
-
-                self.database_interaction.update_average_scores(player.user_id, player.aggressiveness_score,
-                                                                player.conservativeness_score)
+            # Handle the relevant statistics for every player at once. The winner wins the whole pot and everyone
+            # else loses their buy-in
+            game.calculate_player_scores()
+            player_results = [(player.user_id, player.finishing_position,
+                               game.total_pot if player.won_game else -game.starting_chips, player.won_game,
+                               player.aggressiveness_score, player.conservativeness_score)
+                              for player in game.players]
+            self.database_interaction.record_game_results(game_id, game_duration, player_results)
 
             # BROADCAST COMPLETED GAME STATE
             self.__broadcast_completed_game_state(lobby_id)
         else:
             self.__broadcast_game_state(lobby_id, None, False)
-        print("started new round")
+        logger.debug("started new round")
 
     # This method is used to find te player id who disconnected along with the lobby id
     def __find_disconnected_player(self, disconnected_socket):
@@ -242,11 +294,56 @@ class LobbyServer:
         game = self.lobbies[lobby_id]
         player_cards = [[card.suit, card.rank] for card in [player for player in game.players if
                                                             player.user_id == user_id][0].hand.cards]
-        print(f"player_cards: {player_cards}")
+        logger.debug("player_cards: %s", player_cards)
         community_cards = [[card.suit, card.rank] for card in game.board.get_board()]
-        print(f"community_cards: {community_cards}")
+        logger.debug("community_cards: %s", community_cards)
+
+        return player_cards, community_cards, self.__count_opponents_in_hand(game, user_id)
+
+    # The number of players apart from this one who are still in the hand, who the odds are worked out against
+    def __count_opponents_in_hand(self, game, user_id):
+        return len([p for p in game.players if p.user_id != user_id and not (p.folded or p.busted or p.disconnected)])
+
+    # Work out the odds for a player on the server instead of on their own machine. The odds are worked out against
+    # every other player who is still in the hand, and are sent to the client as an "odds" message once they are
+    # ready, so the client never waits for them. The request_id is sent back so the client can ignore odds for an
+    # older situation
+    def __send_odds(self, user_id, lobby_id, request_id, client_socket):
+        game = self.lobbies.get(lobby_id)
+        if game is None:
+            self.__send_odds_message(client_socket, {"success": False, "error": "Lobby not found"}, request_id)
+            return
+        player = self.__find_player_from_user_id(user_id, game)
+        if player is None or len(player.hand.cards) != 2:
+            self.__send_odds_message(client_socket, {"success": True, "hand_odds": False, "equity": False},
+                                     request_id)
+            return
+
+        hole_codes = [card.code for card in player.hand.cards]
+        board_codes = [card.code for card in game.board.get_board()]
+        opponents = self.__count_opponents_in_hand(game, user_id)
+
+        odds_future = self.odds_service.submit(hole_codes, board_codes, opponents)
+        odds_future.add_done_callback(functools.partial(self.__send_finished_odds, client_socket, request_id,
+                                                        opponents))
 
-        return player_cards, community_cards
+    # Called when the odds requested by a client have been worked out (straight away if they were cached)
+    def __send_finished_odds(self, client_socket, request_id, opponents, odds_future):
+        try:
+            hand_odds, equity = odds_future.result()
+        except Exception as e:
+            self.__send_odds_message(client_socket, {"success": False, "error": str(e)}, request_id)
+            return
+        self.__send_odds_message(client_socket, {"success": True, "hand_odds": hand_odds, "equity": equity,
+                                                 "opponents": opponents}, request_id)
+
+    def __send_odds_message(self, client_socket, message, request_id):
+        message.update({"type": "odds", "request_id": request_id})
+        try:
+            client_socket.sendall((json.dumps(message) + '\n').encode('utf-8'))
+        except OSError as e:
+            # The client may have disconnected while the odds were being worked out
+            logger.warning("Could not send the odds to %s: %s", client_socket, e)
 
     # This method processes a player's action such as calling, raising, folding, checking
     def __process_player_action(self, request):
@@ -257,15 +354,22 @@ class LobbyServer:
         player = self.__find_player_from_user_id(user_id, game)
         raise_amount = request.get('amount', 0)
 
-        action_response = game.process_player_action(player, action, raise_amount)
+        if player is None:
+            return {"success": False, "error": "It's not your turn!"}
 
-        print(f"action_resonse: {action_response}")
+        with self.__get_lobby_lock(lobby_id):
+            action_response = self.__apply_event(lobby_id, "action", game.players.index(player), action,
+                                                 raise_amount)
+            if action_response.get("success"):
+                self.__restart_turn_clock(lobby_id, action_response.get("showdown"))
+
+        logger.debug("action_resonse: %s", action_response)
 
         return action_response
 
     # This method handles what happens when a player leaves a lobby
     def __leave_lobby(self, user_id, lobby_id, client_socket):
-        print("player leaving")
+        logger.debug("player leaving")
         if lobby_id not in self.lobbies:
             return {"success": False, "error": "Could not find lobby to remove player from"}
 
@@ -276,77 +380,61 @@ class LobbyServer:
 
         # If there is only one player left, the game will be marked as abandoned (handle last player leaving)
         if len(self.__get_connected_players(game)) == 1:
-            print("only one player left")
+            logger.debug("only one player left")
             self._handle_last_player_leaving(lobby_id)
             return {'success': True}
 
         # If the game has not yet started, completely remove the player from the list of players
+        # The players after the leaving player move along a position, see Game.remove_player()
         if not game.game_started:
-            game.remove_player(user_id, completely_remove=True)
-            print(f"New player list: {game.players}")
+            self.__apply_event(lobby_id, "remove_player", user_id, True)
+            logger.debug("New player list: %s", game.players)
 
-            self._update_lobby_after_player_left(game, player, lobby_id, client_socket)
-            print("broadcasted player left game state")
+            self.__broadcast_player_left_game_state(lobby_id, client_socket)
+            logger.debug("broadcasted player left game state")
         # If the game has started, don't completely remove the player from the players list so that they can rejoin
         else:
-            game.remove_player(user_id, completely_remove=False)
+            with self.__get_lobby_lock(lobby_id):
+                self.__apply_event(lobby_id, "remove_player", user_id, False)
+                self.__restart_turn_clock(lobby_id)
             self.__broadcast_game_state(lobby_id, client_socket, False)
 
         return {'success': True}
 
-    # This handles what happens when a player leaves in a poker lobby, updating the position indexes as required
-    def _update_lobby_after_player_left(self, game, player, lobby_id, client_socket):
-        all_positions = ["top_left", "top_middle", "top_right", "bottom_right", "bottom_middle", "bottom_left"]
-
-        leaving_player_position_index = all_positions.index(player.position)
-
-        # Loop through the players after the leaving player and update their position as necessary
-        print("========================================")
-        print(f"Old positions: {game.available_positions}")
-        for player in game.players:
-            player_position_index = all_positions.index(player.position)
-            print(f"Old position for {player.name}: {player.position}")
-            if player_position_index > leaving_player_position_index:
-                # Shift position one step to the left
-                player.position = all_positions[player_position_index - 1]
-                print(f"New position for {player.name}: {player.position}")
-        # Modify the list of positions to include the last position again
-        game.available_positions.insert(0, all_positions[game.last_position_index])
-        game.last_position_index -= 1
-        print(f"New positions: {game.available_positions}")
-        print(f"All positions: {all_positions}")
-        print(f"Leaving player position index: {leaving_player_position_index}")
-        self.__broadcast_player_left_game_state(lobby_id, client_socket)
-
     def _handle_last_player_leaving(self, lobby_id):
-        print(f"Handling last player leaving lobby: {lobby_id}")
+        logger.debug("Handling last player leaving lobby: %s", lobby_id)
         # If the game has not yet started (not enough players connected), it is an abandoned lobby
         if self.lobbies[lobby_id].game_completed:
             self.database_interaction.set_lobby_status(lobby_id, "completed")
             for player in self.lobbies[lobby_id].players:
-                print("-----------")
-                print(f"Player {player.name}:")
-                print(f"Number of times acted: {player.number_of_times_acted}")
-                print(f"Number of times called: {player.number_of_times_called}")
-                print(f"Number of times checked: {player.number_of_times_checked}")
-                print(f"Number of times folded: {player.number_of_times_folded}")
-                print(f"Number of times raised: {player.number_of_times_raised}")
-                print(f"Number of times gone all in: {player.number_of_times_all_in}")
-                print("-----------")
+                logger.debug("-----------")
+                logger.debug("Player %s:", player.name)
+                for action, count in zip(ACTION_COUNTERS, player.action_counts):
+                    logger.debug("Number of times %s: %s", action, count)
+                logger.debug("-----------")
 
         else:
             self.database_interaction.set_lobby_status(lobby_id, "abandoned")
         del self.lobbies[lobby_id]
+        del self.event_logs[lobby_id]
+        self.timing_wheel.cancel(("turn", lobby_id))
+        self.timing_wheel.cancel(("next_round", lobby_id))
+        self.timing_wheel.cancel(("abandon", lobby_id))
+        self.turn_numbers.pop(lobby_id, None)
+        self.lobby_locks.pop(lobby_id, None)
+        self.game_state_versions.forget_lobby(lobby_id)
+        self.game_snapshots.discard(lobby_id)
+        self.hand_history.close_lobby(lobby_id)
 
     def join_lobby(self, request, client_socket):
-        print(f"JOINING LOBBY REQUEST: {request}")
+        logger.debug("JOINING LOBBY REQUEST: %s", request)
         user_id = request['user_id']
         lobby_id = request['lobby_id']
         user_name = self.database_interaction.get_username(user_id)
         profile_picture = self.database_interaction.get_user_profile_picture(user_id)
 
         if lobby_id not in self.lobbies:
-            print("could not return data. error: Lobby not found")
+            logger.warning("could not return data. error: Lobby not found")
             return {"success": False, "error": "Lobby not found"}
 
         game = self.lobbies[lobby_id]
@@ -360,7 +448,14 @@ class LobbyServer:
                 error_message = "Reconnecting player is not in player list"
             else:
                 if player_to_reconnect.disconnected:
-                    game.reconnect_player(user_id, client_socket)
+                    with self.__get_lobby_lock(lobby_id):
+                        self.__apply_event(lobby_id, "reconnect_player", user_id)
+                        # Sockets are never part of an event, so the player's new socket is given to them afterwards
+                        player_to_reconnect.client_socket = client_socket
+                        self.timing_wheel.cancel(("abandon", lobby_id))
+                        self.__restart_turn_clock(lobby_id)
+                    # The reconnecting client has no state to apply patches to, so it is sent the whole state
+                    self.game_state_versions.forget_player(lobby_id, user_id)
                     self.database_interaction.join_lobby(user_id, lobby_id)
 
                     reconnecting_state = self.__get_state_for_reconnecting_player(lobby_id, player_to_reconnect)
@@ -374,27 +469,28 @@ class LobbyServer:
             return {"success": False, "error": "The lobby is already full!"}
 
         if not game.game_started:
-            player = Player(user_name, user_id, chips=game.starting_chips, position=game.available_positions.pop(0),
-                            profile_picture=profile_picture)
-            game.last_position_index += 1
-            game.add_player(player, client_socket)
+            with self.__get_lobby_lock(lobby_id):
+                # The player is given the next free position by the game
+                self.__apply_event(lobby_id, "add_player", user_name, user_id, game.starting_chips, profile_picture)
+                game.players[-1].client_socket = client_socket
 
             self.database_interaction.join_lobby(user_id, lobby_id)
 
             initial_state = self.__get_initial_state(lobby_id)
-            print(f"INITIAL STATE: {initial_state}")
+            logger.debug("INITIAL STATE: %s", initial_state)
             self.__broadcast_initial_game_state(lobby_id, client_socket)
-            print(f"(server.py): broadcasted initial game state to everyone apart from {client_socket}")
+            logger.debug("(server.py): broadcasted initial game state to everyone apart from %s", client_socket)
             data_type = "initial_state"
             if len(game.players) == game.player_limit:
-                game.start_round()
+                with self.__get_lobby_lock(lobby_id):
+                    self.__apply_event(lobby_id, "start_round")
+                    self.__apply_event(lobby_id, "start_game")
                 data_type = "game_starting"
-                game.game_started = True
                 self.database_interaction.set_lobby_status(lobby_id, "in_progress")
-                print("(server.py): set game._game_started to True so that the round can start")
+                logger.debug("(server.py): set game._game_started to True so that the round can start")
 
             data_to_return = {"success": True, "type": data_type, "game_state": initial_state}
-            print(data_to_return)
+            logger.debug("%s", data_to_return)
             return data_to_return
 
         return {"success": False, "error": error_message}
@@ -402,41 +498,54 @@ class LobbyServer:
     def __get_connected_players(self, game):
         return [player for player in game.players if not player.disconnected]
     
-    # Broadcast the state of the game
+    # Broadcast the state of the game. The public part of the state is the same for every player, so it is built and
+    # encoded once, and each player's own cards are added to the encoded message. Each player is sent a patch from
+    # the last state they were sent (or the whole state if they have not been sent one yet), see GameStateVersions
     def __broadcast_game_state(self, lobby_id, current_client, broadcast_to_everyone):
         data_to_return_to_client = None
         if lobby_id in self.lobbies:
             game = self.lobbies[lobby_id]
-            game_states = game.send_game_state()
+            public_state = game.get_public_game_state()
             if broadcast_to_everyone:
-                print("BROADCASTING GAME STATE TO EVERYONE")
-                for player in self.__get_connected_players(game):
-                    user_id = player.user_id
-                    player.client_socket.sendall((json.dumps({"type": "update_game_state", "user_id": user_id,
-                                                              "game_state": game_states[user_id]}) + '\n').encode(
-                        'utf-8'))
-                    print(f"sent game states {game_states[user_id]} to user {user_id}")
+                logger.debug("BROADCASTING GAME STATE TO EVERYONE")
+                players_to_send_to = self.__get_connected_players(game)
             else:
-                print(f"broadcasting game state to connected players: {self.__get_connected_players(game)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("broadcasting game state to connected players: %s", self.__get_connected_players(game))
+                players_to_send_to = [player for player in self.__get_connected_players(game)
+                                      if player.client_socket != current_client]
                 for player in self.__get_connected_players(game):
-                    print(f"Connected player: {player}: {player.disconnected}")
-                    user_id = player.user_id
-                    if current_client != player.client_socket:
-                        player.client_socket.sendall((json.dumps({"type": "update_game_state", "user_id": user_id,
-                                                                  "game_state": game_states[user_id]}) + '\n').encode(
-                            'utf-8'))
-                        print(f"sent game states {game_states[user_id]} to user {user_id}")
-                    else:
-                        data_to_return_to_client = {"type": "update_game_state", "user_id": user_id,
-                                                    "game_state": game_states[user_id]}
-
-            print("sent game state..")
-            print(f"(broadcast_game_state) returning {data_to_return_to_client}")
+                    if player.client_socket == current_client:
+                        # This client is not sent the state, so their next update has to be the whole state
+                        self.game_state_versions.forget_player(lobby_id, player.user_id)
+                        data_to_return_to_client = {"type": "update_game_state", "user_id": player.user_id,
+                                                    "game_state": public_state,
+                                                    "private": game.get_private_game_state(player)}
+
+            updates = self.game_state_versions.build_updates(
+                lobby_id, public_state, {player.user_id: game.get_private_game_state(player)
+                                         for player in players_to_send_to})
+            for player in players_to_send_to:
+                player.client_socket.sendall(updates[player.user_id])
+                logger.debug("sent game state update %s to user %s", updates[player.user_id], player.user_id)
+
+            logger.debug("sent game state..")
+            logger.debug("(broadcast_game_state) returning %s", data_to_return_to_client)
             return data_to_return_to_client
 
+    # Send the whole state of the game to a client that has asked for it because it could not apply a patch
+    def __send_full_game_state(self, lobby_id, user_id, client_socket):
+        if lobby_id in self.lobbies:
+            game = self.lobbies[lobby_id]
+            player = self.__find_player_from_user_id(user_id, game)
+            update = self.game_state_versions.build_full_update(lobby_id, user_id, game.get_public_game_state(),
+                                                                game.get_private_game_state(player))
+            client_socket.sendall(update)
+            logger.debug("sent full game state %s to user %s", update, user_id)
+
     # When a player sends a message in a lobby, it needs to be received by every other player
     def __broadcast_send_message(self, lobby_id, message, current_client):
-        print("BROADCASTING chat message TO EVERYONE")
+        logger.debug("BROADCASTING chat message TO EVERYONE")
         if lobby_id in self.lobbies:
             game = self.lobbies[lobby_id]
             for player in self.__get_connected_players(game):
@@ -446,12 +555,12 @@ class LobbyServer:
                     player.client_socket.sendall(
                         (json.dumps({"type": "receive_message", "chat_message": message}) + '\n').encode(
                             'utf-8'))
-                    print(f"sent message {message} to user {user_id}")
+                    logger.debug("sent message %s to user %s", message, user_id)
 
     # Each player needs to receive the "showdown state" including every players' cards
     # That is the main difference between the showdown state and the game state
     def __broadcast_showdown_game_state(self, lobby_id):
-        print("BROADCASTING showdown GAME STATE TO EVERYONE")
+        logger.debug("BROADCASTING showdown GAME STATE TO EVERYONE")
         if lobby_id in self.lobbies:
             game = self.lobbies[lobby_id]
             game_state = game.get_game_state_for_showdown()
@@ -460,9 +569,9 @@ class LobbyServer:
                 player.client_socket.sendall(
                     (json.dumps({"type": "update_showdown_state", "game_state": game_state}) + '\n').encode(
                         'utf-8'))
-                print(f"sent game states {game_state} to user {user_id}")
+                logger.debug("sent game states %s to user %s", game_state, user_id)
 
-            print("sent game state..")
+            logger.debug("sent game state..")
 
     # Broadcast the completed game state to everyone (when someone has won the game)
     def __broadcast_completed_game_state(self, lobby_id):
@@ -473,31 +582,31 @@ class LobbyServer:
                 user_id = player.user_id
                 player.client_socket.sendall((json.dumps({"type": "update_completed_state", "game_state":
                     game_state}) + '\n').encode('utf-8'))
-                print(f"sent completed game states {game_state} to user {user_id}")
+                logger.debug("sent completed game states %s to user %s", game_state, user_id)
 
-            print("sent game state..")
+            logger.debug("sent game state..")
 
     # Broadcast the initial game state (which does not contain player's cards yet)
     def __broadcast_initial_game_state(self, lobby_id, current_client):
-        print("BROADCASTING INITIAL GAME STATE NOT TO EVERYONE")
+        logger.debug("BROADCASTING INITIAL GAME STATE NOT TO EVERYONE")
         game_state = self.__get_initial_state(lobby_id)
-        print(f"Initial game state to broadcast: {game_state}")
+        logger.debug("Initial game state to broadcast: %s", game_state)
         for client_socket in self.__get_clients_in_lobby(lobby_id):
             if client_socket != current_client:
                 client_socket.sendall(
                     (json.dumps({"type": "initial_state", "game_state": game_state}) + '\n').encode('utf-8'))
-                print(f"sent initial game state data to f{client_socket}")
+                logger.debug("sent initial game state data to f%s", client_socket)
 
     # Broadcast the state of the game after a player has left to update the GUI for every player
     def __broadcast_player_left_game_state(self, lobby_id, current_client):
-        print("BROADCASTING PLAYER LEFT GAME STATE NOT TO EVERYONE")
+        logger.debug("BROADCASTING PLAYER LEFT GAME STATE NOT TO EVERYONE")
         game_state = self.__get_player_left_state(lobby_id)
-        print(f"Initial game state to broadcast: {game_state}")
+        logger.debug("Initial game state to broadcast: %s", game_state)
         for client_socket in self.__get_clients_in_lobby(lobby_id):
             if client_socket != current_client:
                 client_socket.sendall(
                     (json.dumps({"type": "player_left_game_state", "game_state": game_state}) + '\n').encode('utf-8'))
-                print(f"sent initial game state data to f{client_socket}")
+                logger.debug("sent initial game state data to f%s", client_socket)
 
     def __get_state_for_reconnecting_player(self, lobby_id, player):
         return self.lobbies[lobby_id].get_game_state_for_reconnecting_player(player)
@@ -509,11 +618,97 @@ class LobbyServer:
         return self.lobbies[lobby_id].get_initial_state()
 
     def __handle_start_game(self, lobby_id):
-        print("running handle_start_game")
+        logger.debug("running handle_start_game")
         game = self.lobbies[lobby_id]
         if game.game_started:  # Check if the game is ready to start
             self.database_interaction.insert_game(lobby_id)  # Add the game to the games table
             self.__broadcast_game_state(lobby_id, None, False)
+            with self.__get_lobby_lock(lobby_id):
+                self.__restart_turn_clock(lobby_id)
+
+    # Start running a new or restored lobby: its game is run through an event log, which the snapshots and the hand
+    # history are written from
+    def __add_lobby(self, lobby_id, game):
+        event_log = GameEventLog(game)
+        event_log.add_listener(functools.partial(self.__record_hand_history, lobby_id))
+        self.game_snapshots.follow(lobby_id, event_log)
+        self.event_logs[lobby_id] = event_log
+        self.lobbies[lobby_id] = game
+
+    def __record_hand_history(self, lobby_id, event, records):
+        for record in records:
+            self.hand_history.append(lobby_id, record)
+
+    # Make a change to a lobby's game through its event log, returning whatever the game returned. The lobby's lock is
+    # held so that two events in a lobby are never applied at once
+    def __apply_event(self, lobby_id, event_type, *arguments):
+        with self.__get_lobby_lock(lobby_id):
+            return self.event_logs[lobby_id].apply(event_type, *arguments)
+
+    # The lock of a lobby (see self.lobby_locks), which is made the first time it is needed
+    def __get_lobby_lock(self, lobby_id):
+        lock = self.lobby_locks.get(lobby_id)
+        if lock is None:
+            # setdefault() is atomic, so two threads can never make different locks for the same lobby. The lock is
+            # reentrant because events are applied while the lock is already held, e.g. with the turn clock
+            lock = self.lobby_locks.setdefault(lobby_id, threading.RLock())
+        return lock
+
+    # Called by the timing wheel when nobody has reconnected to a restored game in time
+    def __abandon_restored_lobby(self, lobby_id):
+        with self.__get_lobby_lock(lobby_id):
+            game = self.lobbies.get(lobby_id)
+            if game is None or self.__get_connected_players(game):
+                return
+            logger.info("Nobody reconnected to the restored lobby %s, so it is being abandoned", lobby_id)
+            for player in game.players:
+                self.database_interaction.remove_player_from_lobby(player.user_id, lobby_id)
+            self._handle_last_player_leaving(lobby_id)
+
+    # Start the clock of whoever's turn it is now in a lobby, in place of the clock of the last turn. This is called
+    # after anything that can change whose turn it is. Nobody's clock runs while a showdown is being shown, until the
+    # next round starts, or while everyone still in the hand is disconnected, as the server would then only be playing
+    # against itself
+    def __restart_turn_clock(self, lobby_id, is_showdown=False):
+        game = self.lobbies.get(lobby_id)
+        turn_number = self.turn_numbers.get(lobby_id, 0) + 1
+        self.turn_numbers[lobby_id] = turn_number
+        if game is None or is_showdown or game.get_current_player() is None or \
+                not game.has_connected_player_in_hand():
+            self.timing_wheel.cancel(("turn", lobby_id))
+        else:
+            self.timing_wheel.schedule(("turn", lobby_id), self.turn_timeout_seconds,
+                                       functools.partial(self.__handle_turn_timeout, lobby_id, turn_number))
+
+    # Called by the timing wheel when a player runs out of time. The server acts for them and then does what the
+    # player's own client does after an action
+    def __handle_turn_timeout(self, lobby_id, turn_number):
+        # The lobby may have been removed since the timer was scheduled, in which case it should not get a lock again
+        if lobby_id not in self.lobbies:
+            return
+        with self.__get_lobby_lock(lobby_id):
+            game = self.lobbies.get(lobby_id)
+            # The player may have acted (or left) just before their time ran out
+            if game is None or self.turn_numbers.get(lobby_id) != turn_number or game.get_current_player() is None or \
+                    not game.has_connected_player_in_hand():
+                return
+            player, action = game.get_timeout_action()
+            logger.info("%s ran out of time in lobby %s, so they %s", player.name, lobby_id,
+                        "check" if action == "call" else "fold")
+            action_response = self.__apply_event(lobby_id, "action", game.get_current_player_turn(), action, 0)
+            if not action_response.get("success"):
+                logger.error("The timeout action of %s was not allowed: %s", player.name, action_response)
+                return
+            self.__restart_turn_clock(lobby_id, action_response.get("showdown"))
+
+        if action_response.get("game_completed"):
+            self.__broadcast_completed_game_state(lobby_id)
+        elif action_response.get("showdown"):
+            self.__broadcast_showdown_game_state(lobby_id)
+            self.timing_wheel.schedule(("next_round", lobby_id), SHOWDOWN_DISPLAY_SECONDS,
+                                       functools.partial(self.__start_next_round, {"lobby_id": lobby_id}))
+        else:
+            self.__broadcast_game_state(lobby_id, None, True)
 
     def __get_all_lobbies(self, request):
         status_filter = request["status"]
@@ -545,7 +740,7 @@ class LobbyServer:
         response = self.database_interaction.create_lobby(request)
         if response["success"]:
             lobby_id = response["lobby_id"]
-            self.lobbies[lobby_id] = Game(starting_chips=request["buy_in"], player_limit=request['player_limit'])
+            self.__add_lobby(lobby_id, Game(starting_chips=request["buy_in"], player_limit=request['player_limit']))
         return response
 
     def __get_clients_in_lobby(self, lobby_id):
@@ -556,7 +751,7 @@ class LobbyServer:
         return client_sockets
 
     def __handle_profile_picture_change(self, request, client_socket):
-        print("handling pfp change")
+        logger.debug("handling pfp change")
         user_id = request['user_id']
 
         if request['type'] == 'upload_profile_picture':
@@ -570,26 +765,26 @@ class LobbyServer:
             directory = "pfps"
             if not os.path.exists(directory):
                 os.makedirs(directory)
-                print(f"Created directory: {directory}")
+                logger.debug("Created directory: %s", directory)
 
             file_path = os.path.join(directory, filename)
-            print(f"using filepath: {file_path}")
+            logger.debug("using filepath: %s", file_path)
 
             # Delete old profile pictures
             for old_file in glob.glob(f"{directory}/{user_id}_*.png"):
                 if old_file != file_path:  # Avoid deleting the current file being saved
                     os.remove(old_file)
-                    print(f"removing {old_file}")
+                    logger.debug("removing %s", old_file)
 
             # Save new profile picture
             with open(file_path, "wb") as file:
                 file.write(image_data)
-                print(f"wrote image data to {file_path}")
+                logger.debug("wrote image data to %s", file_path)
 
         else:
             # Handle setting a default profile picture
             filename = request['new_profile_picture']
-            print(f"setting default filename {filename}")
+            logger.debug("setting default filename %s", filename)
 
         # Update the database with the filename
         return self.database_interaction.set_user_profile_picture(user_id, filename)
@@ -609,5 +804,6 @@ class LobbyServer:
 
 
 if __name__ == "__main__":
+    configure_logging()
     server = LobbyServer()
     server.start()
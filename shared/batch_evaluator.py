@@ -0,0 +1,161 @@
+# A vectorised version of the evaluator in hand_evaluator.py which scores many hands at once with NumPy.
+# Each row of the input is one hand of 7 integer card codes (see hand_evaluator.py for the encoding), and the
+# scores returned are exactly the same integers that evaluate_codes() returns for that row, so the two can be mixed.
+# Rank and suit histograms are built for every row with array operations and then the same lookup tables are used.
+# There are also helpers for sampling random cards and simulating whole showdowns in batches for the odds engines.
+import numpy as np
+
+from shared.hand_evaluator import CATEGORY_SHIFT, FLUSH, FOUR_OF_A_KIND, FULL_HOUSE, HIGH_CARD, HIGH_RANK, PAIR, \
+    POPCOUNT, ROYAL_FLUSH, STRAIGHT, STRAIGHT_FLUSH, STRAIGHT_HIGH, THREE_OF_A_KIND, TOP_FIVE, TWO_PAIR
+
+_POPCOUNT = np.array(POPCOUNT, dtype=np.int64)
+_HIGH_RANK = np.array(HIGH_RANK, dtype=np.int64)
+_TOP_FIVE = np.array(TOP_FIVE, dtype=np.int64)
+_STRAIGHT_HIGH = np.array(STRAIGHT_HIGH, dtype=np.int64)
+# The bit of each rank value (2 to 14) in a rank mask. Index 0 is used for "no rank" and maps to no bit
+_RANK_BITS = np.array([0, 0] + [1 << rank_index for rank_index in range(13)], dtype=np.int64)
+_MASK_WEIGHTS = 1 << np.arange(13, dtype=np.int64)
+
+# The hand rankings reported by batch_hand_rankings(), from the best to the worst
+HAND_TYPES = ("Royal Flush", "Straight Flush", "Four of a Kind", "Full House", "Flush", "Straight", "Three of a Kind",
+              "Two Pair", "Pair")
+
+
+# Build the rank counts (N, 13) and the rank mask of every suit (N, 4) for an (N, cards) array of card codes
+def _histograms(codes):
+    number_of_hands = codes.shape[0]
+    ranks = codes % 13
+    suits = codes // 13
+    rows = np.arange(number_of_hands)[:, None]
+
+    rank_counts = np.bincount((rows * 13 + ranks).ravel(), minlength=number_of_hands * 13)
+    rank_counts = rank_counts.reshape(number_of_hands, 13)
+
+    # Every card is unique, so adding up the rank bits of a suit is the same as OR-ing them together
+    suit_masks = np.bincount((rows * 4 + suits).ravel(), weights=(1 << ranks).ravel(),
+                             minlength=number_of_hands * 4)
+    suit_masks = suit_masks.astype(np.int64).reshape(number_of_hands, 4)
+
+    return rank_counts, suit_masks
+
+
+def _as_code_array(codes):
+    codes = np.asarray(codes, dtype=np.int64)
+    if codes.ndim != 2:
+        raise ValueError("Expected a 2D array of card codes with one hand per row")
+    return codes
+
+
+# Score every row of an (N, 7) array of card codes. Returns two arrays of length N: the hand categories
+# (indexes into HAND_RANKINGS) and the comparable strengths
+def evaluate_batch(codes):
+    codes = _as_code_array(codes)
+    rank_counts, suit_masks = _histograms(codes)
+
+    # Rank masks of the ranks that appear at least once, twice, three times and four times in each hand
+    seen_once = (rank_counts >= 1) @ _MASK_WEIGHTS
+    seen_twice = (rank_counts >= 2) @ _MASK_WEIGHTS
+    seen_three_times = (rank_counts >= 3) @ _MASK_WEIGHTS
+    seen_four_times = (rank_counts >= 4) @ _MASK_WEIGHTS
+
+    # With 7 cards at most one suit can have 5 or more cards, so the largest qualifying mask is the flush suit
+    flush_mask = np.where(_POPCOUNT[suit_masks] >= 5, suit_masks, 0).max(axis=1)
+    straight_flush_high = _STRAIGHT_HIGH[flush_mask]
+    straight_high = _STRAIGHT_HIGH[seen_once]
+
+    quads = _HIGH_RANK[seen_four_times]
+    trips = _HIGH_RANK[seen_three_times]
+    full_house_pair_mask = seen_twice & ~_RANK_BITS[trips]
+    high_pair = _HIGH_RANK[seen_twice]
+    remaining_pairs = seen_twice & ~_RANK_BITS[high_pair]
+    low_pair = _HIGH_RANK[remaining_pairs]
+
+    conditions = [
+        straight_flush_high == 14,
+        straight_flush_high > 0,
+        flush_mask > 0,
+        seen_four_times > 0,
+        (seen_three_times > 0) & (full_house_pair_mask > 0),
+        straight_high > 0,
+        seen_three_times > 0,
+        remaining_pairs > 0,
+        seen_twice > 0,
+    ]
+    scores = [
+        (ROYAL_FLUSH << CATEGORY_SHIFT) | (straight_flush_high << 16),
+        (STRAIGHT_FLUSH << CATEGORY_SHIFT) | (straight_flush_high << 16),
+        (FLUSH << CATEGORY_SHIFT) | _TOP_FIVE[flush_mask],
+        (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (quads << 16) | (_HIGH_RANK[seen_once & ~_RANK_BITS[quads]] << 12),
+        (FULL_HOUSE << CATEGORY_SHIFT) | (trips << 16) | (_HIGH_RANK[full_house_pair_mask] << 12),
+        (STRAIGHT << CATEGORY_SHIFT) | (straight_high << 16),
+        (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips << 16) |
+        ((_TOP_FIVE[seen_once & ~_RANK_BITS[trips]] >> 12) << 8),
+        (TWO_PAIR << CATEGORY_SHIFT) | (high_pair << 16) | (low_pair << 12) |
+        (_HIGH_RANK[seen_once & ~_RANK_BITS[high_pair] & ~_RANK_BITS[low_pair]] << 8),
+        (PAIR << CATEGORY_SHIFT) | (high_pair << 16) | ((_TOP_FIVE[seen_once & ~_RANK_BITS[high_pair]] >> 8) << 4),
+    ]
+    strengths = np.select(conditions, scores, default=(HIGH_CARD << CATEGORY_SHIFT) | _TOP_FIVE[seen_once])
+
+    return strengths >> CATEGORY_SHIFT, strengths
+
+
+# The vectorised equivalent of Hand.evaluate_rankings_for_odds_calculation(): for every row, which hand rankings
+# can be made from the cards (not just the best one). Returns a dictionary of boolean arrays of length N
+def batch_hand_rankings(codes):
+    codes = _as_code_array(codes)
+    rank_counts, suit_masks = _histograms(codes)
+
+    seen_once = (rank_counts >= 1) @ _MASK_WEIGHTS
+    flush_mask = np.where(_POPCOUNT[suit_masks] >= 5, suit_masks, 0).max(axis=1)
+    straight_flush_high = _STRAIGHT_HIGH[flush_mask]
+
+    is_four_of_a_kind = (rank_counts == 4).any(axis=1)
+    is_three_of_a_kind = is_four_of_a_kind | (rank_counts == 3).any(axis=1)
+    pair_counts = (rank_counts == 2).sum(axis=1)
+
+    return {
+        "Royal Flush": straight_flush_high == 14,
+        "Straight Flush": straight_flush_high > 0,
+        "Four of a Kind": is_four_of_a_kind,
+        "Full House": is_three_of_a_kind & (pair_counts > 0),
+        "Flush": flush_mask > 0,
+        "Straight": _STRAIGHT_HIGH[seen_once] > 0,
+        "Three of a Kind": is_three_of_a_kind,
+        "Two Pair": (pair_counts > 1) | ((pair_counts == 1) & is_three_of_a_kind),
+        "Pair": (pair_counts > 0) | is_three_of_a_kind,
+    }
+
+
+# Pick cards_to_draw different cards out of remaining_codes for every iteration, giving an (iterations, cards_to_draw)
+# array. Each row takes the cards with the smallest random keys, which is a uniformly random choice of cards
+def sample_cards(remaining_codes, cards_to_draw, iterations, random_generator):
+    remaining_codes = np.asarray(remaining_codes, dtype=np.int64)
+    if cards_to_draw == 0:
+        return np.empty((iterations, 0), dtype=np.int64)
+    random_keys = random_generator.random((iterations, len(remaining_codes)))
+    chosen_indexes = np.argpartition(random_keys, cards_to_draw, axis=1)[:, :cards_to_draw]
+    return remaining_codes[chosen_indexes]
+
+
+# Play out random showdowns between some hole cards and a number of opponents holding random cards, completing the
+# board with random cards each time. Returns three arrays of length iterations: whether the hole cards won outright,
+# whether they tied for the best hand, and the share of the pot they won (1 for a win, 1/n for an n-way tie)
+def simulate_showdowns(hole_codes, board_codes, remaining_codes, opponents, iterations, random_generator):
+    board_cards_to_draw = 5 - len(board_codes)
+    drawn_cards = sample_cards(remaining_codes, board_cards_to_draw + 2 * opponents, iterations, random_generator)
+    boards = np.hstack([np.broadcast_to(np.asarray(board_codes, dtype=np.int64), (iterations, len(board_codes))),
+                        drawn_cards[:, :board_cards_to_draw]])
+
+    _, own_strengths = evaluate_batch(np.hstack([np.broadcast_to(np.asarray(hole_codes, dtype=np.int64),
+                                                                 (iterations, 2)), boards]))
+    # Every opponent's hand is scored in the same batch, one row per opponent per iteration
+    opponent_holes = drawn_cards[:, board_cards_to_draw:].reshape(iterations * opponents, 2)
+    _, opponent_strengths = evaluate_batch(np.hstack([opponent_holes, np.repeat(boards, opponents, axis=0)]))
+    opponent_strengths = opponent_strengths.reshape(iterations, opponents)
+
+    best_opponent_strengths = opponent_strengths.max(axis=1)
+    wins = own_strengths > best_opponent_strengths
+    ties = own_strengths == best_opponent_strengths
+    players_tied = 1 + (opponent_strengths == best_opponent_strengths[:, None]).sum(axis=1)
+    pot_shares = np.where(ties, 1 / players_tied, wins.astype(np.float64))
+    return wins, ties, pot_shares
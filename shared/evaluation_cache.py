@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+from shared.hand_evaluator import card_mask, evaluate_mask
+
+
+# A bounded least-recently-used cache of hand evaluations. The key is the 52 bit card mask of the hand, which is the
+# same no matter what order the cards are in, so the same set of cards is only ever evaluated once while it is
+# cached. The cache is shared by every table on a server, so a lock is used as the server handles every client in
+# its own thread. Any other hashable key can be used too, as long as the evaluate function understands it.
+class EvaluationCache:
+    def __init__(self, evaluate=evaluate_mask, max_size=100000):
+        # evaluate is the function used to work out the value for a card mask that is not cached yet
+        self.__evaluate = evaluate
+        self.max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Get the value for a card mask, evaluating and caching it if it is not cached already
+    def lookup(self, mask):
+        with self.__lock:
+            value = self.__entries.get(mask)
+            if value is not None:
+                self.__entries.move_to_end(mask)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        # The evaluation is done outside the lock so that other threads are not kept waiting
+        value = self.__evaluate(mask)
+
+        with self.__lock:
+            self.__entries[mask] = value
+            # Evict the least recently used entries if the cache has gone over its size limit
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+        return value
+
+    def evaluate_cards(self, cards):
+        return self.lookup(card_mask(cards))
+
+    # Remove a single entry, e.g. one whose value turned out not to be valid
+    def discard(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.__entries),
+                    "max_size": self.max_size, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# The cache of hand strengths shared by everything that evaluates hands in this process
+hand_strength_cache = EvaluationCache()
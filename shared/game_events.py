@@ -0,0 +1,172 @@
+# An event-sourced way of running a Game. Every change to the game goes through a GameEventLog as a small immutable
+# event, which is applied to the game by apply_event() and appended to the log. Given the events, any past state of the
+# game can be rebuilt: the log keeps a snapshot (Game.to_snapshot()) of every SNAPSHOT_INTERVAL events, so a rebuild
+# starts from the nearest snapshot before the state wanted and only applies the events after it. This is also how an
+# event is undone.
+#
+# The log is the one stream that everything else reads from: its listeners are called with every event applied and the
+# hand history records (see Game.history_recorder) that the game made while applying it. The server's snapshot writer
+# (server/helpers/game_snapshots.py) saves the log's snapshots and events, and its hand history writer
+# (shared/hand_history.py) saves the records.
+#
+# An event is a tuple of (type, arguments, draws):
+#   ("add_player", (name, user_id, chips, profile_picture), draws)    the player gets the next free position
+#   ("remove_player", (user_id, completely_remove), draws)
+#   ("reconnect_player", (user_id,), draws)
+#   ("start_game", (), draws)                         the lobby is full and the first hand can be played
+#   ("start_round", (), draws)
+#   ("action", (seat, action, raise_amount), draws)
+# draws are the random numbers the deck used while the event was applied (see Deck.deal_card()), so that the same cards
+# are dealt when it is applied again, even if the game uses the operating system's random numbers. Every part of an
+# event is a plain value, so the log can be saved as JSON and the tuples built again with tuple().
+#
+# Client sockets are not part of the game's state, so they are never in an event: a rebuilt game has no sockets.
+from bisect import bisect_right
+
+from shared.game_logic import Game, Player
+
+# How many events there are between the snapshots kept by a GameEventLog
+SNAPSHOT_INTERVAL = 50
+
+
+# Wraps the deck's random number generator to keep every number it gives the deck
+class _RecordingRandom:
+    def __init__(self, random_generator):
+        self.random_generator = random_generator
+        self.draws = []
+
+    def randrange(self, n):
+        draw = self.random_generator.randrange(n)
+        self.draws.append(draw)
+        return draw
+
+
+# Gives the deck the numbers that were recorded when the events were first applied
+class _ReplayRandom:
+    def __init__(self, draws):
+        self.__draws = iter(draws)
+
+    def randrange(self, n):
+        return next(self.__draws)
+
+
+# The reducer: apply one event to a game, returning whatever the Game method it calls returns. The deck is given the
+# event's draws, so that it deals the same cards as when the event was first applied
+def apply_event(game, event):
+    event_type, arguments, draws = event
+    if not draws:
+        return _apply_event(game, event_type, arguments)
+
+    random_generator = game.deck.random_generator
+    game.deck.random_generator = _ReplayRandom(draws)
+    try:
+        return _apply_event(game, event_type, arguments)
+    finally:
+        game.deck.random_generator = random_generator
+
+
+def _apply_event(game, event_type, arguments):
+    if event_type == "add_player":
+        name, user_id, chips, profile_picture = arguments
+        return game.add_player(Player(name, user_id, chips, game.take_next_position(), profile_picture), None)
+    if event_type == "remove_player":
+        return game.remove_player(*arguments)
+    if event_type == "reconnect_player":
+        return game.reconnect_player(arguments[0], None)
+    if event_type == "start_game":
+        game.game_started = True
+        return None
+    if event_type == "start_round":
+        return game.start_round()
+    if event_type == "action":
+        seat, action, raise_amount = arguments
+        return game.process_player_action(game.players[seat], action, raise_amount)
+    raise ValueError(f"Unknown game event type: {event_type}")
+
+
+class GameEventLog:
+    # Start a log from a game in any state (a new one, or one restored from a snapshot). From now on every change to
+    # the game has to go through apply(), and the log takes over the game's history recorder
+    def __init__(self, game, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.game = game
+        self.snapshot_interval = snapshot_interval
+        self.events = []
+        self.__random = _RecordingRandom(game.deck.random_generator)
+        game.deck.random_generator = self.__random
+        # The hand history records the game has made while the current event is applied
+        self.__records = []
+        game.history_recorder = self.__records.append
+        self.__listeners = []
+        # The snapshots kept so far and the number of events that had been applied when each one was taken
+        self.__snapshot_versions = [0]
+        self.__snapshots = [game.to_snapshot()]
+
+    # The number of events applied so far. Each one gives a new version of the game's state
+    @property
+    def version(self):
+        return len(self.events)
+
+    # Call listener(event, records) after every event from now on, with the hand history records the game made while
+    # the event was applied. Listeners are called before apply() returns, so they should only hand the event on (e.g.
+    # to a queue) and not do any slow work
+    def add_listener(self, listener):
+        self.__listeners.append(listener)
+
+    # Apply a new event to the game and add it to the log, returning whatever the game returned
+    def apply(self, event_type, *arguments):
+        self.__random.draws = []
+        self.__records.clear()
+        result = _apply_event(self.game, event_type, arguments)
+        event = (event_type, arguments, tuple(self.__random.draws))
+        self.events.append(event)
+        if self.version % self.snapshot_interval == 0:
+            self.__snapshot_versions.append(self.version)
+            self.__snapshots.append(self.game.to_snapshot())
+
+        records = list(self.__records)
+        for listener in self.__listeners:
+            listener(event, records)
+        return result
+
+    # The newest snapshot the log has kept and the version it was taken at. A listener can tell that an event has just
+    # been snapshotted because the version of the snapshot is the version of the log
+    def get_latest_snapshot(self):
+        return self.__snapshot_versions[-1], self.__snapshots[-1]
+
+    # The events after a version, e.g. to bring a copy of the game that is at that version up to date
+    def get_events_since(self, version):
+        return self.events[version:]
+
+    # Rebuild the game as it was after a number of events, starting from the nearest snapshot before it. The game
+    # returned is a new Game that does not affect the log
+    def rebuild(self, version):
+        if not 0 <= version <= self.version:
+            raise ValueError(f"There is no version {version} of the game, the latest is {self.version}")
+
+        index = bisect_right(self.__snapshot_versions, version) - 1
+        game = Game.from_snapshot(self.__snapshots[index], disconnect_players=False)
+        for event in self.events[self.__snapshot_versions[index]:version]:
+            apply_event(game, event)
+        return game
+
+    # Undo the last event. The game is rebuilt as it was before the event and replaces self.game, keeping the players'
+    # sockets. Returns the new game. Listeners only ever see events being applied, so a log that is being saved (see
+    # server/helpers/game_snapshots.py) should not be undone
+    def undo(self):
+        if not self.events:
+            raise ValueError("There are no events to undo")
+
+        game = self.rebuild(self.version - 1)
+        client_sockets = {player.user_id: player.client_socket for player in self.game.players}
+        for player in game.players:
+            player.client_socket = client_sockets.get(player.user_id)
+        game.history_recorder = self.__records.append
+        self.__random.draws = []
+        game.deck.random_generator = self.__random
+
+        self.events.pop()
+        while self.__snapshot_versions[-1] > self.version:
+            self.__snapshot_versions.pop()
+            self.__snapshots.pop()
+        self.game = game
+        return game
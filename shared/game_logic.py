@@ -1,48 +1,154 @@
-from itertools import combinations
-from random import randint
+import logging
+import random
+from array import array
+from secrets import SystemRandom
 from typing import List
 from collections import Counter
 
-class Card:
-    def __init__(self, suit, rank):
-        self.suit = suit
-        self.rank = rank
+import numpy as np
 
-    def __eq__(self, other):
-        if isinstance(other, Card):
-            return self.rank == other.rank and self.suit == other.suit
-        return False
+from shared.evaluation_cache import hand_strength_cache
+from shared.hand_evaluator import HAND_RANKINGS, NUMBER_OF_CARDS, RANK_VALUES, RANKS, SUITS, hand_ranking_name, \
+    significant_ranks
+from shared.log import get_logger
+
+logger = get_logger(__name__)
+
+# The version of the format of Game.to_snapshot(). It changes whenever the format does, so that an old snapshot is
+# never restored wrongly
+SNAPSHOT_VERSION = 3
+
+# The actions that are counted for each player's game statistics, in the order they are kept in Player.action_counts
+ACTION_COUNTERS = ("raised", "all_in", "called", "checked", "folded", "acted")
+RAISED, ALL_IN, CALLED, CHECKED, FOLDED, ACTED = range(len(ACTION_COUNTERS))
+
+# The positions around the table, in the order they are given to players as they join
+TABLE_POSITIONS = ("top_left", "top_middle", "top_right", "bottom_right", "bottom_middle", "bottom_left")
+
+# Cards are flyweights: exactly one immutable Card object exists for each of the 52 cards, and Card(suit, rank)
+# returns that shared object instead of creating a new one. This means cards can be compared by identity and
+# the engine never has to allocate or compare strings. The suit and rank strings are only used for the GUI/network.
+class Card:
+    __slots__ = ("suit", "rank", "code", "rank_value", "rank_bit", "suit_index", "mask", "_name")
+    __cards_by_name = {}
+    __cards_by_code = []
+
+    def __new__(cls, suit, rank):
+        return cls.__cards_by_name[(suit, rank)]
+
+    @classmethod
+    def _create_all_cards(cls):
+        for code in range(NUMBER_OF_CARDS):
+            card = object.__new__(cls)
+            suit, rank = SUITS[code // 13], RANKS[code % 13]
+            for attribute, value in (("suit", suit), ("rank", rank), ("code", code), ("rank_value", code % 13 + 2),
+                                     ("rank_bit", 1 << (code % 13)), ("suit_index", code // 13),
+                                     ("mask", 1 << code), ("_name", f"{rank} {suit}")):
+                object.__setattr__(card, attribute, value)
+            cls.__cards_by_name[(suit, rank)] = card
+            cls.__cards_by_code.append(card)
+
+    # Get the shared Card object for an integer card code
+    @classmethod
+    def from_code(cls, code):
+        return cls.__cards_by_code[code]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cards are immutable")
+
+    # Copying or unpickling a card gives back the shared Card object
+    def __reduce__(self):
+        return Card.from_code, (self.code,)
 
     def __str__(self):
-        return f"{self.rank} {self.suit}"
+        return self._name
+
+    def __repr__(self):
+        return f"Card({self.suit!r}, {self.rank!r})"
 
 
+Card._create_all_cards()
+
+# Every card in the order they are placed in a new deck
+FULL_DECK = tuple(Card.from_code(code) for code in range(NUMBER_OF_CARDS))
+
+
+# The deck is a fixed pool of the 52 shared Card objects. The cards that have not been dealt yet are kept at the
+# front of the pool, and dealing a card is a single step of a Fisher-Yates shuffle: a random undealt card is swapped
+# to the end of the undealt cards and dealt from there. Only the cards that are actually dealt are ever shuffled, every
+# order is equally likely, and resetting the deck just marks every card as undealt again, so nothing is allocated.
+# The random number generator can be swapped out: real tables use the operating system's secure random numbers so
+# that the cards cannot be predicted, while simulations can pass a seeded random.Random which is much faster.
 class Deck:
-    def __init__(self):
-        self.cards = []
-        self.reset_deck()
+    def __init__(self, random_generator=None):
+        self.random_generator = random_generator if random_generator is not None else SystemRandom()
+        self.__cards = list(FULL_DECK)
+        self.__remaining = len(self.__cards)
 
+    # Shuffle all the undealt cards in place with a Fisher-Yates shuffle. This is not needed before dealing, as
+    # dealing already picks a random card, but it can be used to put the whole deck into a random order
     def shuffle(self):
-        for i in range(len(self.cards)):
-            swap_number = randint(0, len(self.cards) - 1)
-            self.cards[swap_number], self.cards[i] = self.cards[i], self.cards[swap_number]
+        cards = self.__cards
+        for i in range(self.__remaining - 1, 0, -1):
+            swap_number = self.random_generator.randrange(i + 1)
+            cards[swap_number], cards[i] = cards[i], cards[swap_number]
 
     def reset_deck(self):
-        self.cards = [Card(suit, rank)
-                      for suit in ["Clubs", "Diamonds", "Spades", "Hearts"] for rank in
-                      ["2", "3", "4", "5", "6", "7", "8", "9", "10", "Jack", "Queen", "King", "Ace"]]
+        # Every card goes back into the deck. The order they are left in does not matter as dealing is random
+        self.__remaining = len(self.__cards)
+
+    # Get the cards that have not been dealt yet
+    def get_remaining_cards(self):
+        return self.__cards[:self.__remaining]
 
     # Debug method
     def print_cards(self):
-        for card in self.cards:
+        for card in self.get_remaining_cards():
             print(card)
 
     def deal_card(self):
-        # This method deals a single card from the top of the deck
-        return self.cards.pop()
+        # This method deals a single random card from the deck
+        self.__remaining -= 1
+        cards = self.__cards
+        swap_number = self.random_generator.randrange(self.__remaining + 1)
+        cards[swap_number], cards[self.__remaining] = cards[self.__remaining], cards[swap_number]
+        return cards[self.__remaining]
+
+    # A snapshot of the deck (see Game.to_snapshot()): the order of the cards as card codes and how many are undealt.
+    # The state of a seeded random.Random is saved too so that a restored simulation deals the same cards, but the
+    # operating system's random numbers have no state to save
+    def to_snapshot(self):
+        snapshot = {"cards": [card.code for card in self.__cards], "remaining": self.__remaining}
+        if isinstance(self.random_generator, random.Random) and not isinstance(self.random_generator, SystemRandom):
+            version, internal_state, gauss_next = self.random_generator.getstate()
+            snapshot["random_state"] = [version, list(internal_state), gauss_next]
+        return snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot, random_generator=None):
+        if random_generator is None and "random_state" in snapshot:
+            version, internal_state, gauss_next = snapshot["random_state"]
+            random_generator = random.Random()
+            random_generator.setstate((version, tuple(internal_state), gauss_next))
+        deck = cls(random_generator)
+        deck.__cards = [Card.from_code(code) for code in snapshot["cards"]]
+        deck.__remaining = snapshot["remaining"]
+        return deck
+
+
+# A player has a fixed set of attributes, so __slots__ is used instead of a dictionary for each player's attributes,
+# which makes every player smaller and their attributes quicker to access
+class Player:
+    __slots__ = ("client_socket", "name", "user_id", "profile_picture", "chips", "current_bet", "hand", "position",
+                 "blinds", "dealer", "folded", "disconnected", "all_in", "busted", "action_counts", "won_round",
+                 "won_game", "finishing_position", "aggressiveness_score", "conservativeness_score")
 
+    # The attributes saved in a snapshot (see Game.to_snapshot()). The hand and action counts are saved separately, and
+    # the socket is not saved at all as connections do not survive a restart
+    SNAPSHOT_ATTRIBUTES = ("name", "user_id", "profile_picture", "chips", "current_bet", "position", "blinds",
+                           "dealer", "folded", "disconnected", "all_in", "busted", "won_round", "won_game",
+                           "finishing_position", "aggressiveness_score", "conservativeness_score")
 
-class Player:
     def __init__(self, name, user_id, chips, position, profile_picture):
         self.client_socket = None
         # Variables required for each player
@@ -59,13 +165,9 @@ class Player:
         self.disconnected = False
         self.all_in = False
         self.busted = False
-        # Variables for game statistics
-        self.number_of_times_raised = 0
-        self.number_of_times_all_in = 0
-        self.number_of_times_called = 0
-        self.number_of_times_checked = 0
-        self.number_of_times_folded = 0
-        self.number_of_times_acted = 0
+        # Variables for game statistics. The number of times the player has made each action is kept in one compact
+        # array of unsigned ints, indexed by RAISED, ALL_IN, CALLED, CHECKED, FOLDED and ACTED
+        self.action_counts = array("I", [0] * len(ACTION_COUNTERS))
         self.won_round = False
         self.won_game = False
         self.finishing_position = 0
@@ -84,6 +186,25 @@ class Player:
     def debug_set_cards(self, cards):
         self.hand.cards = cards
 
+    def to_snapshot(self):
+        snapshot = {attribute: getattr(self, attribute) for attribute in Player.SNAPSHOT_ATTRIBUTES}
+        # The snapshot may be saved later by another thread, so it must not share any lists with the player
+        snapshot["blinds"] = list(self.blinds)
+        snapshot["action_counts"] = self.action_counts.tolist()
+        snapshot["hand"] = [card.code for card in self.hand.cards]
+        return snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        player = cls(snapshot["name"], snapshot["user_id"], snapshot["chips"], snapshot["position"],
+                     snapshot["profile_picture"])
+        for attribute in Player.SNAPSHOT_ATTRIBUTES:
+            setattr(player, attribute, snapshot[attribute])
+        player.blinds = list(snapshot["blinds"])
+        player.action_counts = array("I", snapshot["action_counts"])
+        player.hand.cards = [Card.from_code(code) for code in snapshot["hand"]]
+        return player
+
 
 class Board:
     def __init__(self):
@@ -100,16 +221,16 @@ class Board:
 
 
 class Game:
-    def __init__(self, starting_chips=200, player_limit=6):
+    # random_generator is used to deal the cards, see Deck
+    def __init__(self, starting_chips=200, player_limit=6, random_generator=None):
         self._debugging_enabled = False
         self.players: List[Player] = []
-        self.available_positions = ["top_left", "top_middle", "top_right", "bottom_right", "bottom_middle",
-                                    "bottom_left"]
+        self.available_positions = list(TABLE_POSITIONS)
         self.last_position_index = -1
         self.__pot = Pot()
         self.starting_chips = starting_chips
         self.board = Board()  # The community cards are represented by the board
-        self.deck = Deck()
+        self.deck = Deck(random_generator)
         self.__current_player_turn = -1
         self.game_started = False
         self.__small_blind = 5
@@ -125,40 +246,161 @@ class Game:
         self.first_player_to_act = None
         self.last_player_to_act = None
         self.first_player_acted = False
-        self.hand_rankings = ["High Card", "Pair", "Two Pair", "Three of a Kind",
-                              "Straight", "Flush", "Full House", "Four of a Kind",
-                              "Straight Flush", "Royal Flush"]
+        self.hand_rankings = HAND_RANKINGS
         self.non_active_player = None
         self.game_completed = False
-        self.players_acted = []
+        # Seats (indexes into self.players) are kept in bitsets where bit i is set if self.players[i] is in the set,
+        # so that checking who is still in the hand is a few integer operations instead of a loop over every player.
+        # They are updated with __update_seat() whenever one of a player's flags changes
+        self.__seats = {}
+        self.__all_seats = 0
+        self.__folded_seats = 0
+        self.__all_in_seats = 0
+        # Busted or disconnected players
+        self.__out_seats = 0
+        # The players who have acted in this betting round
+        self.__acted_seats = 0
         self.next_available_finishing_position = self.player_limit + 1
         self.winner_message = None
         self.message = ""
+        # The number of hands that have been dealt in this game
+        self.hands_played = 0
+        # An optional function which is called with a record (a small dictionary) of every deal, action, board card
+        # and showdown, e.g. to write a hand history (see shared/hand_history.py)
+        self.history_recorder = None
 
     def debug_set_community_cards(self, cards):
         self.board.reset_board()
         for card in cards:
             self.board.add_card_to_board(card)
 
-    def __is_betting_round_over(self):
-        active_players = self.__get_players_for_showdown()
-        non_all_in_players = [player for player in active_players if not player.all_in]
+    # Put chips in the pot for the player in a seat without them betting, e.g. to set up a showdown
+    def debug_add_to_pot(self, seat, amount):
+        self.__pot.add_chips(seat, amount)
+
+    # Pass a record to the history recorder, if there is one. Cards are recorded as card codes and players by their
+    # seat (their index in self.players)
+    def __record_history(self, record_type, **fields):
+        if self.history_recorder is not None:
+            self.history_recorder({"type": record_type, **fields})
+
+    def __get_stacks(self):
+        return [player.chips for player in self.players]
+
+    # A snapshot of everything needed to carry on the game exactly where it left off, made of plain lists,
+    # dictionaries, strings and numbers so that it can be saved as JSON. Cards are saved as card codes
+    def to_snapshot(self):
+        return {
+            "snapshot_version": SNAPSHOT_VERSION,
+            "starting_chips": self.starting_chips,
+            "player_limit": self.player_limit,
+            "players": [player.to_snapshot() for player in self.players],
+            "available_positions": list(self.available_positions),
+            "last_position_index": self.last_position_index,
+            "pot": self.__pot.to_snapshot(),
+            "board": [card.code for card in self.board.get_board()],
+            "deck": self.deck.to_snapshot(),
+            "current_player_turn": self.__current_player_turn,
+            "game_started": self.game_started,
+            "dealer_position": self.__dealer_position,
+            "small_blind_position": self.__small_blind_position,
+            "big_blind_position": self.__big_blind_position,
+            "current_highest_bet": self.__current_highest_bet,
+            "current_round": self.current_round,
+            "total_pot": self.total_pot,
+            "first_player_to_act": self.first_player_to_act,
+            "last_player_to_act": self.last_player_to_act,
+            "first_player_acted": self.first_player_acted,
+            "game_completed": self.game_completed,
+            "acted_seats": self.__acted_seats,
+            "next_available_finishing_position": self.next_available_finishing_position,
+            "winner_message": self.winner_message,
+            "message": self.message,
+            "hands_played": self.hands_played,
+        }
 
-        # If all but one player are all-in, and the last non-all-in player has acted, the round is over
-        if len(non_all_in_players) == 1 and non_all_in_players[0] in self.players_acted:
-            return True
+    # Rebuild a game from a snapshot made by to_snapshot(). Nobody is connected to a game restored after a restart, so
+    # by default every player is marked as disconnected and can come back through reconnect_player(). Players who were
+    # still in the hand are not folded, so the hand can carry on once they reconnect. The game never shares any lists
+    # with the snapshot, so the same snapshot can be restored more than once (see shared/game_events.py)
+    @classmethod
+    def from_snapshot(cls, snapshot, random_generator=None, disconnect_players=True):
+        if snapshot.get("snapshot_version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported game snapshot version: {snapshot.get('snapshot_version')}")
+
+        game = cls(snapshot["starting_chips"], snapshot["player_limit"])
+        game.players = [Player.from_snapshot(player_snapshot) for player_snapshot in snapshot["players"]]
+        if disconnect_players:
+            for player in game.players:
+                player.disconnected = True
+        game.available_positions = list(snapshot["available_positions"])
+        game.last_position_index = snapshot["last_position_index"]
+        game.__pot = Pot.from_snapshot(snapshot["pot"])
+        game.debug_set_community_cards([Card.from_code(code) for code in snapshot["board"]])
+        game.deck = Deck.from_snapshot(snapshot["deck"], random_generator)
+        game.__current_player_turn = snapshot["current_player_turn"]
+        game.game_started = snapshot["game_started"]
+        game.__dealer_position = snapshot["dealer_position"]
+        game.__small_blind_position = snapshot["small_blind_position"]
+        game.__big_blind_position = snapshot["big_blind_position"]
+        game.__current_highest_bet = snapshot["current_highest_bet"]
+        game.current_round = snapshot["current_round"]
+        game.total_pot = snapshot["total_pot"]
+        game.first_player_to_act = snapshot["first_player_to_act"]
+        game.last_player_to_act = snapshot["last_player_to_act"]
+        game.first_player_acted = snapshot["first_player_acted"]
+        game.game_completed = snapshot["game_completed"]
+        game.next_available_finishing_position = snapshot["next_available_finishing_position"]
+        game.winner_message = snapshot["winner_message"]
+        game.message = snapshot["message"]
+        game.hands_played = snapshot["hands_played"]
+        game.__rebuild_seats()
+        game.__acted_seats = snapshot["acted_seats"]
+        return game
+
+    # Work out the seat bitsets again from the players' flags. This is only needed when the list of players changes
+    def __rebuild_seats(self):
+        acted_players = [player for player, seat in self.__seats.items() if self.__acted_seats >> seat & 1]
+        self.__seats = {player: seat for seat, player in enumerate(self.players)}
+        self.__all_seats = (1 << len(self.players)) - 1
+        self.__folded_seats = self.__all_in_seats = self.__out_seats = self.__acted_seats = 0
+        for player in self.players:
+            self.__update_seat(player)
+        for player in acted_players:
+            if player in self.__seats:
+                self.__acted_seats |= 1 << self.__seats[player]
+
+    # Update the seat bitsets after the folded, all_in, busted or disconnected flag of a player has changed
+    def __update_seat(self, player):
+        seat_bit = 1 << self.__seats[player]
+        self.__folded_seats = self.__folded_seats | seat_bit if player.folded else self.__folded_seats & ~seat_bit
+        self.__all_in_seats = self.__all_in_seats | seat_bit if player.all_in else self.__all_in_seats & ~seat_bit
+        if player.busted or player.disconnected:
+            self.__out_seats |= seat_bit
+        else:
+            self.__out_seats &= ~seat_bit
 
-        # If all non-all-in players have matching current bets and have acted, the round is over
-        if all(player in self.players_acted for player in non_all_in_players):
-            non_all_in_bets = [player.current_bet for player in non_all_in_players]
-            if len(set(non_all_in_bets)) == 1:
-                return True
+    # The seats of the players who are still in the hand (including players who are all in)
+    def __showdown_seats(self):
+        return self.__all_seats & ~(self.__folded_seats | self.__out_seats)
 
-        # If all active players have acted at least once and their bet amounts match, the round is over
-        if self.first_player_acted and all(player in self.players_acted for player in active_players):
-            all_bets = [player.current_bet for player in active_players]
-            if len(set(all_bets)) == 1:
-                return True
+    # The seats of the players who can still act
+    def __active_seats(self):
+        return self.__showdown_seats() & ~self.__all_in_seats
+
+    def __is_betting_round_over(self):
+        non_all_in_seats = self.__active_seats()
+
+        # A player who is not all in can only be in the acted set if their bet matches the current highest bet: a
+        # call matches it, a raise sets it, and a raise empties the acted set. So once every player who is not all in
+        # has acted, their bets all match and the round is over (this includes the case where all but one player are
+        # all in and the last one has acted)
+        if non_all_in_seats:
+            return non_all_in_seats & ~self.__acted_seats == 0
+
+        # If everyone left is all in, the round is over if they have all acted at least once and their bets match
+        if self.first_player_acted and self.__showdown_seats() & ~self.__acted_seats == 0:
+            return len({player.current_bet for player in self.__get_players_for_showdown()}) == 1
 
         return False
 
@@ -179,116 +421,90 @@ class Game:
             self.last_player_to_act = self.__get_previous_active_player(self.last_player_to_act, True)
             self.__current_player_turn = self.first_player_to_act
 
-        print("-------------- START_NEW_ROUND ----------------")
-        print(f"first_player_to_act: {self.first_player_to_act}")
-        print(f"last_player_to_act: {self.last_player_to_act}")
-        print(f"current_player_turn: {self.__current_player_turn}")
-        print(f"has self.first_player_acted: {self.first_player_acted}")
-        print("------------------------------")
+        logger.debug("-------------- START_NEW_ROUND ----------------")
+        logger.debug("first_player_to_act: %s", self.first_player_to_act)
+        logger.debug("last_player_to_act: %s", self.last_player_to_act)
+        logger.debug("current_player_turn: %s", self.__current_player_turn)
+        logger.debug("has self.first_player_acted: %s", self.first_player_acted)
+        logger.debug("------------------------------")
 
         self.first_player_acted = False
 
     def __handle_player_leaving(self, leaving_player):
         # Check if the leaving player is first or last to act and update accordingly
-        print(f"player {leaving_player} leaving!")
-        print(f"First player to act: {self.first_player_to_act}, Last player to act: {self.last_player_to_act}")
+        logger.debug("player %s leaving!", leaving_player)
+        logger.debug("First player to act: %s, Last player to act: %s", self.first_player_to_act,
+                     self.last_player_to_act)
         if leaving_player == self.players[self.__current_player_turn]:
             if self.players[self.first_player_to_act] == leaving_player:
-                print("First player to act == leaving player")
+                logger.debug("First player to act == leaving player")
                 self.first_player_to_act = self.__get_next_active_player(self.first_player_to_act, False)
             elif self.players[self.last_player_to_act] == leaving_player:
-                print("Last player to act == leaving player")
+                logger.debug("Last player to act == leaving player")
                 self.non_active_player = leaving_player
                 if self.__is_betting_round_over():
                     self.__progress_to_next_betting_round()
                     return
                 self.last_player_to_act = self.__get_previous_active_player(self.last_player_to_act, False)
 
-            print("Updating current player turn")
+            logger.debug("Updating current player turn")
             self.__current_player_turn = self.__get_next_active_player(self.__current_player_turn, False)
 
     def __get_next_active_player(self, current_position, use_current_player):
-        original_player = current_position
-
-        if len(self.__get_players_for_showdown()) == 0:
+        if self.__showdown_seats() == 0:
             # If the server is force terminated, stop it from being in an infinite loop
-            print("ERROR ERROR ERROR: NO PLAYERS AVAILABLE FOR GET_NEXT_ACTIVE_PLAYER")
-            print(f"{[f'{player.name}: {player.all_in}, {player.busted}, {player.folded}' for player in self.players]}")
+            logger.error("ERROR ERROR ERROR: NO PLAYERS AVAILABLE FOR GET_NEXT_ACTIVE_PLAYER")
+            logger.error("Players (all in, busted, folded): %s",
+                         [(player.name, player.all_in, player.busted, player.folded) for player in self.players])
             return 0
 
-        if use_current_player:
-            if self.__is_player_active(current_position):
-                print(f"(get_next_active_player) FINAL: {current_position}")
-                return current_position
-
-        # The loop below should check if all the players are looped through, and should return the original player
-        # in order to avoid an infinite loop below (there needs to be an exit condition when there are no available
-        # players)
-        checked_once = False
-        while True:
-            if checked_once:
-                if current_position == original_player:
-                    print("Returning 999")
-                    return 999
-
-            current_position = (current_position + 1) % len(self.players)
-            print(f"(get_next_active_player): {current_position}")
-            if self.__is_player_active(current_position):
-                return current_position
-            checked_once = True
+        active_seats = self.__active_seats()
+        if use_current_player and active_seats >> current_position & 1:
+            logger.debug("(get_next_active_player) FINAL: %s", current_position)
+            return current_position
 
-    def __get_previous_active_player(self, current_position, use_current_player):
-        original_player = current_position
+        # The first active seat after the current position, going round the table back to the current position.
+        # 999 is returned if there are no active players at all
+        if active_seats == 0:
+            logger.debug("Returning 999")
+            return 999
+        seats_after = active_seats >> (current_position + 1) << (current_position + 1)
+        seats_to_search = seats_after if seats_after else active_seats
+        return (seats_to_search & -seats_to_search).bit_length() - 1
 
-        if len(self.__get_players_for_showdown()) == 0:
+    def __get_previous_active_player(self, current_position, use_current_player):
+        if self.__showdown_seats() == 0:
             # If the server is force terminated, stop it from being in an infinite loop
-            print("ERROR ERROR ERROR: NO PLAYERS AVAILABLE FOR GET_NEXT_ACTIVE_PLAYER")
-            print(f"{[f'{player.name}: {player.all_in}, {player.busted}, {player.folded}' for player in self.players]}")
+            logger.error("ERROR ERROR ERROR: NO PLAYERS AVAILABLE FOR GET_NEXT_ACTIVE_PLAYER")
+            logger.error("Players (all in, busted, folded): %s",
+                         [(player.name, player.all_in, player.busted, player.folded) for player in self.players])
             return 0
 
-        if use_current_player:
-            if self.__is_player_active(current_position):
-                print(f"(get_previous_active_player) FINAL: {current_position}")
-                return current_position
-
-        checked_once = False
-        while True:
-            if checked_once:
-                if current_position == original_player:
-                    print("Returning 999")
-                    return 999
-
-            current_position = (current_position - 1) % len(self.players)
-            print(f"(get_previous_active_player): {current_position}")
-            if self.__is_player_active(current_position):
-                return current_position
-            checked_once = True
-
-    def __is_player_active(self, current_position):
-        return not (self.players[current_position].folded or
-                    self.players[current_position].disconnected or
-                    self.players[current_position].busted or
-                    self.players[current_position].all_in)
-
-    def __is_player_active_showdown(self, current_position):
-        return not (self.players[current_position].folded or
-                    self.players[current_position].disconnected or
-                    self.players[current_position].busted)
+        active_seats = self.__active_seats()
+        if use_current_player and active_seats >> current_position & 1:
+            logger.debug("(get_previous_active_player) FINAL: %s", current_position)
+            return current_position
 
-    def __get_players_for_showdown(self):
-        return [p for index, p in enumerate(self.players) if self.__is_player_active_showdown(index)]
+        # The first active seat before the current position, going round the table the other way
+        if active_seats == 0:
+            logger.debug("Returning 999")
+            return 999
+        seats_before = active_seats & ((1 << current_position) - 1)
+        return (seats_before if seats_before else active_seats).bit_length() - 1
 
-    def __get_active_players(self):
-        return [p for index, p in enumerate(self.players) if self.__is_player_active(index)]
+    def __get_players_for_showdown(self):
+        showdown_seats = self.__showdown_seats()
+        return [player for seat, player in enumerate(self.players) if showdown_seats >> seat & 1]
 
     def __is_only_one_player_active(self):
-        active_players = self.__get_players_for_showdown()
-        print(f"(ONLY_ONE_PLAYER_ACTIVE) active_players: {[player.name for player in active_players]}")
-        return len(active_players) == 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("(ONLY_ONE_PLAYER_ACTIVE) active_players: %s",
+                         [player.name for player in self.__get_players_for_showdown()])
+        return self.__showdown_seats().bit_count() == 1
 
     def __progress_to_next_betting_round(self):
         # Reset the players who have acted this betting round
-        self.players_acted = []
+        self.__acted_seats = 0
         if self.current_round == "preflop":
             self.__flop()
             self.current_round = "flop"
@@ -302,7 +518,7 @@ class Game:
             showdown_data = self.__showdown()
 
             if self.start_round() == "game_completed":
-                print("game completed!")
+                logger.debug("game completed!")
                 return {"success": True, "game_completed": True, "showdown_data": showdown_data}
 
             return {"success": True, "type": "showdown_data", "showdown_data": showdown_data}
@@ -323,117 +539,66 @@ class Game:
 
         return message
 
-    # This method determines the winner from the eligible players by first comparing player's hand rankings
-    # and then comparing their cards individually in case of more complicated situations where required
-    def __determine_winner_from_eligible_players(self, best_hands, eligible_players):
-        # Filter out the best hands only for eligible players
-        eligible_best_hands = {player: hand for player, hand in best_hands.items() if player in eligible_players}
-        print(f"eligible_best_hands: {eligible_best_hands}")
-
-        # Determine the maximum hand ranking for these players
-        max_rank = max(eligible_best_hands.values(), key=lambda x: x[0])[0]
-        print(f"max_rank: {max_rank}")
-
-        # Filter players using the max hand ranking
-        max_rank_players = {player: cards for player, (rank, cards) in eligible_best_hands.items() if rank == max_rank}
-        print(f"max_rank_players: {max_rank_players}")
-
-        # Sort players based on their hand rank and then by card values if ranks are equal
-        sorted_players = sorted(max_rank_players.keys(), key=lambda x: list(sorted(max_rank_players[x], reverse=True)),
-                                reverse=True)
-
-        print(f"sorted_players: {sorted_players}")
-
-        # The first player is the one with the best cards
-        winners = [sorted_players[0]]
-        print(f"winners: {winners}")
-
-        # Check for ties
-        for player in sorted_players[1:]:
-            if max_rank_players[player] == max_rank_players[winners[0]]:
-                winners.append(player)
-            else:
-                break
+    # This method determines the winner(s) from the eligible players. Every hand strength is a single integer
+    # (computed once per showdown), so the winners are simply the eligible players with the highest strength
+    def __determine_winner_from_eligible_players(self, hand_strengths, eligible_players):
+        best_strength = max(hand_strengths[player] for player in eligible_players)
+        winners = [player for player in eligible_players if hand_strengths[player] == best_strength]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("winners: %s with strength %s", [player.name for player in winners], best_strength)
 
         return winners
 
-    # This method finds the best possible player hand and community card combination for each player in a given list
-    def __evaluate_player_hands(self, remaining_players):
-        best_hand_per_player = {}
+    # This method scores the best possible hand for each player in a given list, using the table-driven evaluator
+    # to score all 7 cards at once instead of trying every combination of 5 cards
+    def evaluate_player_hands(self, remaining_players):
+        hand_strengths = {}
 
         for player in remaining_players:
             # Combine the player's deck and the community cards
-            all_seven_cards = player.hand.cards + self.board.get_board()
-            best_rank = -1
-            best_cards = None
-
-            # Iterate through every combination of 5 out of the 7 total cards
-            for combo in combinations(all_seven_cards, 5):
-                test_hand = Hand(list(combo))
-                rank, cards = test_hand.evaluate_strength()
-                rank_index = self.hand_rankings.index(rank)
-
-                # Re-evaluate the strength of the best hand ranking each time if needed
-                if rank_index > best_rank or (rank_index == best_rank and cards > best_cards):
-                    best_rank = rank_index
-                    best_cards = cards
-
-            best_hand_per_player[player] = (best_rank, best_cards)
-            print(f"player: {player.name}, best hand: {best_hand_per_player[player]}")
-
-        return best_hand_per_player
-
-    # Create pots based on any all_ins and return a list of pots
-    def __create_pots(self, remaining_players):
-        pots = []
-        last_all_in_amount = 0
+            hand_strengths[player] = hand_strength_cache.evaluate_cards(player.hand.cards + self.board.get_board())
+            logger.debug("player: %s, best hand: %s", player.name, hand_ranking_name(hand_strengths[player]))
 
-        all_in_players = sorted((player for player in remaining_players if player.all_in), key=lambda p: p.current_bet)
+        return hand_strengths
 
-        for all_in_player in all_in_players:
-            pot_amount = (all_in_player.current_bet - last_all_in_amount) * len(remaining_players)
-            if pot_amount > 0:
-                pots.append((pot_amount, list(remaining_players)))
-
-            last_all_in_amount = all_in_player.current_bet
-            remaining_players.remove(all_in_player)
-
-        main_pot = self.__pot.chips - sum(pot[0] for pot in pots)
-
-        # Add the main pot only if there are players left who haven't gone all-in
-        if remaining_players and main_pot > 0:
-            pots.append((main_pot, remaining_players))
-
-        return pots
+    # Create the main pot and any side pots from the pot's ledger (see Pot.create_side_pots()) and return a list of
+    # pots, each with the players who can win it
+    def create_pots(self, remaining_players):
+        showdown_seats = {self.__seats[player] for player in remaining_players}
+        return [(pot_amount, [self.players[seat] for seat in eligible_seats])
+                for pot_amount, eligible_seats in self.__pot.create_side_pots(showdown_seats)]
 
     def __showdown(self):
         remaining_players = self.__get_players_for_showdown()
         for player in remaining_players:
             player.won_round = False
 
-        # Find the best hand for every single player in a list
-        best_hand_per_player = self.__evaluate_player_hands(remaining_players)
-        pots = self.__create_pots(remaining_players)
+        # Find the strength of the best hand for every single player in a list, once for all of the pots
+        hand_strengths = self.evaluate_player_hands(remaining_players)
+        pots = self.create_pots(remaining_players)
 
         winner_messages = []
+        pot_winners = []
         for pot_amount, eligible_players in pots:
-            winning_players = self.__determine_winner_from_eligible_players(best_hand_per_player, eligible_players)
+            winning_players = self.__determine_winner_from_eligible_players(hand_strengths, eligible_players)
             num_winners = len(winning_players)
+            pot_winners.append([pot_amount, [self.__seats[player] for player in winning_players]])
 
             # Determine winners and distribute the pot
             if num_winners == 1:
                 winner_message = f"{winning_players[0].name} wins {pot_amount} chips with a " \
-                                 f"{self.hand_rankings[best_hand_per_player[winning_players[0]][0]]}!"
+                                 f"{hand_ranking_name(hand_strengths[winning_players[0]])}!"
                 winning_player = winning_players[0]
-                print(f"{winning_player.name} chips: {winning_player.chips}, pot_amount: {pot_amount}")
+                logger.debug("%s chips: %s, pot_amount: %s", winning_player.name, winning_player.chips, pot_amount)
                 winning_player.chips += pot_amount
                 winning_player.won_round = True
-                print(f"set {winning_player.name}.won_round to True")
+                logger.debug("set %s.won_round to True", winning_player.name)
                 # Check if the player has won the game
                 total_chips_of_connected_players = sum([player.chips for player in self.players if not \
                     player.disconnected])
-                print(f"{winning_player.name}: chips: {winning_player.chips}, current_bet: "
-                      f"{winning_player.current_bet}, total_chips_of_connected_players: {total_chips_of_connected_players}")
+                logger.debug("%s: chips: %s, current_bet: %s, total_chips_of_connected_players: %s",
+                             winning_player.name, winning_player.chips, winning_player.current_bet,
+                             total_chips_of_connected_players)
                 if winning_player.chips == total_chips_of_connected_players:
                     winning_player.won_game = True
                     winning_player.finishing_position = 1
@@ -444,7 +609,7 @@ class Game:
                 extra_chips = pot_amount % num_winners
                 for player in winning_players:
                     player.won_round = True
-                    print(f"set {player.name}.won_round to True")
+                    logger.debug("set %s.won_round to True", player.name)
                     player.chips += pot_share
 
                 # Give the extra chip to only one of the winners
@@ -454,8 +619,30 @@ class Game:
 
         self.winner_message = "\n".join(winner_messages)
         self.__pot.reset_chips()
+        self.__record_history("showdown", hands=[[self.__seats[player], [card.code for card in player.hand.cards]]
+                                                 for player in remaining_players],
+                              pots=pot_winners, stacks=self.__get_stacks())
         return self.winner_message
 
+    # Work out the aggressiveness and conservativeness scores of every player at the end of the game: the percentage of
+    # their actions that were raises, and the percentage that were folds or checks. Everyone's action counts are put
+    # into one matrix so that all of the scores are worked out at once. A player who never acted keeps scores of 0
+    def calculate_player_scores(self):
+        if not self.players:
+            return
+        action_counts = np.array([player.action_counts for player in self.players], dtype=np.float64)
+        times_acted = action_counts[:, ACTED]
+        # Players who never acted are divided by 1 instead of 0, but their scores are not used
+        divisors = np.maximum(times_acted, 1)
+        aggressiveness_scores = action_counts[:, RAISED] / divisors * 100
+        conservativeness_scores = (action_counts[:, FOLDED] + action_counts[:, CHECKED]) / divisors * 100
+
+        for player, acted, aggressiveness_score, conservativeness_score in zip(
+                self.players, times_acted.tolist(), aggressiveness_scores.tolist(), conservativeness_scores.tolist()):
+            if acted:
+                player.aggressiveness_score = round(aggressiveness_score, 2)
+                player.conservativeness_score = round(conservativeness_score, 2)
+
     # Public method used to get the initial state of the game when first connecting to the lobby
     def get_initial_state(self):
         state = {
@@ -467,10 +654,9 @@ class Game:
         }
         return state
 
-    def __get_game_state_for_player(self, player):
-        # A part of the purpose of this method is to only send each individual player's cards to the corresponding
-        # player to prevent any possible cheating where a player could potentially find out another player's cards
-        # Below is the state of the game to be sent to a specific player
+    # The part of the game state that every player is sent. It is the same for everyone, so it only needs to be built
+    # (and encoded) once per update
+    def get_public_game_state(self):
         state = {
             'players': [{'name': p.name, 'user_id': p.user_id, 'chips': p.chips, 'current_bet': p.current_bet,
                          "blinds": p.blinds, "dealer": p.dealer, "folded": p.folded, "disconnected": p.disconnected,
@@ -478,10 +664,20 @@ class Game:
             'pot': self.__pot.chips,
             'board': [str(card) for card in self.board.get_board()],
             'current_player_turn': self.__current_player_turn,
-            'hand': [str(card) for card in player.hand.cards],
             'message': self.message
         }
-        print(f"(game_logic.py): returning {state} to {player}")
+        logger.debug("(game_logic.py): returning public state %s", state)
+        return state
+
+    # The part of the game state that only one player is sent. Each player is only sent their own cards, to prevent
+    # any possible cheating where a player could potentially find out another player's cards
+    def get_private_game_state(self, player):
+        return {'hand': [str(card) for card in player.hand.cards]}
+
+    def __get_game_state_for_player(self, player, public_state):
+        # Below is the state of the game to be sent to a specific player
+        state = {**public_state, **self.get_private_game_state(player)}
+        logger.debug("(game_logic.py): returning %s to %s", state, player)
         return state
 
     # Public method used to get the showdown state of the game (including every player's cards)
@@ -496,7 +692,7 @@ class Game:
             'current_player_turn': self.__current_player_turn,
             'winner_message': self.winner_message
         }
-        print(f"(game_logic.py): returning {state}")
+        logger.debug("(game_logic.py): returning %s", state)
         return state
 
     # This is the state of the game to send when the poker game is over (there is one winner)
@@ -509,7 +705,7 @@ class Game:
             'pot': self.__pot.chips,
             'board': [str(card) for card in self.board.get_board()]
         }
-        print(f"(game_logic.py): returning {state}")
+        logger.debug("(game_logic.py): returning %s", state)
         return state
 
     def get_game_state_for_reconnecting_player(self, player):
@@ -524,14 +720,15 @@ class Game:
             'hand': [str(card) for card in player.hand.cards],
             'player_limit': self.player_limit
         }
-        print(f"(game_logic.py): returning {state} to {player}")
+        logger.debug("(game_logic.py): returning %s to %s", state, player)
         return state
 
     def send_game_state(self):
         # Prepare the game state for each player and return it
         game_states = {}
+        public_state = self.get_public_game_state()
         for player in self.players:
-            game_states[player.user_id] = self.__get_game_state_for_player(player)
+            game_states[player.user_id] = self.__get_game_state_for_player(player, public_state)
         return game_states
 
     def get_player_left_state(self):
@@ -549,15 +746,27 @@ class Game:
     def add_player(self, player: Player, client_socket):
         player.client_socket = client_socket
         self.players.append(player)
+        self.__rebuild_seats()
 
     def reconnect_player(self, user_id, client_socket):
         player = next((p for p in self.players if p.user_id == user_id), None)
         player.client_socket = client_socket
         player.disconnected = False
+        self.__update_seat(player)
+        self.__record_history("reconnect", seat=self.__seats[player])
+
+    # Give the next free position at the table to a player joining before the game has started
+    def take_next_position(self):
+        self.last_position_index += 1
+        return self.available_positions.pop(0)
 
     def remove_player(self, user_id, completely_remove):
         if completely_remove:
+            player = next((player for player in self.players if player.user_id == user_id), None)
             self.players = [player for player in self.players if player.user_id != user_id]
+            self.__rebuild_seats()
+            if player:
+                self.__free_position(player)
         else:
             player = next((player for player in self.players if player.user_id == user_id), None)
             if player:
@@ -565,9 +774,25 @@ class Game:
                 # The player will remain folded, so that they do not interrupt a round that is already being played
                 player.disconnected = True
                 player.folded = True
-                print(f"Found player {player.name} and set disconnected to true")
+                self.__update_seat(player)
+                self.__record_history("leave", seat=self.__seats[player])
+                logger.debug("Found player %s and set disconnected to true", player.name)
                 self.__handle_player_leaving(player)
 
+    # When a player leaves before the game has started, everyone after them moves one position to the left so that
+    # there are no gaps around the table, and the last position is free again
+    def __free_position(self, leaving_player):
+        leaving_player_position_index = TABLE_POSITIONS.index(leaving_player.position)
+        logger.debug("Old positions: %s", self.available_positions)
+        for player in self.players:
+            player_position_index = TABLE_POSITIONS.index(player.position)
+            if player_position_index > leaving_player_position_index:
+                player.position = TABLE_POSITIONS[player_position_index - 1]
+                logger.debug("New position for %s: %s", player.name, player.position)
+        self.available_positions.insert(0, TABLE_POSITIONS[self.last_position_index])
+        self.last_position_index -= 1
+        logger.debug("New positions: %s", self.available_positions)
+
     def __deal_cards(self, num_cards, player):
         if not player.disconnected:
             for i in range(num_cards):
@@ -579,7 +804,6 @@ class Game:
         # First it resets all the default attributes needed for a poker round
         self.board.reset_board()
         self.deck.reset_deck()
-        self.deck.shuffle()
         for player in self.players:
             player.current_bet = 0
             player.hand.cards = []
@@ -598,16 +822,27 @@ class Game:
 
             if player.disconnected:
                 player.folded = True
+            self.__update_seat(player)
 
         # If there is only one active player left in a game, the game is completed
-        if len(self.__get_active_players()) == 1:
-            print("start_round: get_active_players() == 1")
+        if self.__active_seats().bit_count() == 1:
+            logger.debug("start_round: get_active_players() == 1")
             # end the game
             self.game_completed = True
+            self.__record_history("game_completed", stacks=self.__get_stacks(),
+                                  finishing_positions=[player.finishing_position for player in self.players])
             return "game_completed"
 
-        # Reset the list of players who have acted in this round
-        self.players_acted = []
+        if self.hands_played == 0:
+            # The table is recorded before the first hand, which is everything a replay needs to set the game up
+            self.__record_history("table", starting_chips=self.starting_chips, player_limit=self.player_limit,
+                                  players=[{"user_id": player.user_id, "name": player.name,
+                                            "position": player.position, "chips": player.chips}
+                                           for player in self.players])
+
+        self.hands_played += 1
+        # Reset the players who have acted in this round
+        self.__acted_seats = 0
 
         self.__current_highest_bet = self.__big_blind
         self.current_round = "preflop"
@@ -649,6 +884,10 @@ class Game:
         self.__handle_posting_blinds()
 
         self.__start_new_round(self.current_round)
+        self.__record_history("deal", hand=self.hands_played, dealer=self.__dealer_position,
+                              small_blind=self.__small_blind_position, big_blind=self.__big_blind_position,
+                              hole_cards=[[card.code for card in player.hand.cards] for player in self.players],
+                              stacks=self.__get_stacks())
 
     # Method to handle shifting the blinds and dealer button at the start of a round
     def __handle_shifting_positions_at_start(self):
@@ -656,28 +895,30 @@ class Game:
         self.__small_blind_position = self.__get_next_active_player(self.__dealer_position, False)
         self.__big_blind_position = self.__get_next_active_player(self.__small_blind_position, False)
         self.__current_player_turn = self.__get_next_active_player(self.__big_blind_position, False)
-        print(f"Current player turn: {self.__current_player_turn}")
+        logger.debug("Current player turn: %s", self.__current_player_turn)
 
     # Method to handle posting the blinds (making every player pay the money they need to pay because of the blinds)
     def __handle_posting_blinds(self):
         if self.players[self.__small_blind_position].chips > self.__small_blind:
             self.players[self.__small_blind_position].chips -= self.__small_blind
             self.players[self.__small_blind_position].current_bet = self.__small_blind
-            self.__pot.add_chips(self.__small_blind)
+            self.__pot.add_chips(self.__small_blind_position, self.__small_blind)
         else:
             self.players[self.__small_blind_position].current_bet = self.players[self.__small_blind_position].chips
             self.players[self.__small_blind_position].chips = 0
             self.players[self.__small_blind_position].all_in = True
-            self.__pot.add_chips(self.players[self.__small_blind_position].current_bet)
+            self.__update_seat(self.players[self.__small_blind_position])
+            self.__pot.add_chips(self.__small_blind_position, self.players[self.__small_blind_position].current_bet)
         if self.players[self.__big_blind_position].chips > self.__big_blind:
             self.players[self.__big_blind_position].chips -= self.__big_blind
             self.players[self.__big_blind_position].current_bet = self.__big_blind
-            self.__pot.add_chips(self.__big_blind)
+            self.__pot.add_chips(self.__big_blind_position, self.__big_blind)
         else:
             self.players[self.__big_blind_position].current_bet = self.players[self.__big_blind_position].chips
             self.players[self.__big_blind_position].chips = 0
             self.players[self.__big_blind_position].all_in = True
-            self.__pot.add_chips(self.players[self.__big_blind_position].current_bet)
+            self.__update_seat(self.players[self.__big_blind_position])
+            self.__pot.add_chips(self.__big_blind_position, self.players[self.__big_blind_position].current_bet)
 
         self.players[self.__small_blind_position].blinds.append("SB")
         self.players[self.__big_blind_position].blinds.append("BB")
@@ -686,26 +927,29 @@ class Game:
     # This method deals the flop
     def __flop(self):
         # A card is discarded by the dealer before dealing the flop, turn, and river (Texas Hold'Em poker tradition)
-        self.deck.deal_card()
+        burnt_card = self.deck.deal_card()
         # Deal 3 cards
         for i in range(3):
             card = self.deck.deal_card()
             self.board.add_card_to_board(card)
+        self.__record_history("board", burn=burnt_card.code, cards=[card.code for card in self.board.get_board()])
 
     # This method deals the turn or the river as they have the same functionality
     def __turn_river(self):
         # A card is discarded by the dealer before dealing the flop, turn, and river
-        self.deck.deal_card()
+        burnt_card = self.deck.deal_card()
 
         card = self.deck.deal_card()
         self.board.add_card_to_board(card)
+        self.__record_history("board", burn=burnt_card.code, cards=[card.code])
 
     # The logic for when a player folds
     def __player_fold(self, player):
         message = f"{player.name} folds"
 
         player.folded = True
-        player.number_of_times_folded += 1
+        self.__update_seat(player)
+        player.action_counts[FOLDED] += 1
         if player == self.players[self.first_player_to_act]:
             self.first_player_to_act = self.__get_next_active_player(self.first_player_to_act, False)
         elif player == self.players[self.last_player_to_act]:
@@ -719,25 +963,26 @@ class Game:
         bet_amount = self.__current_highest_bet - player.current_bet
         if player.chips >= bet_amount:
             player.chips -= bet_amount
-            self.__pot.add_chips(bet_amount)
+            self.__pot.add_chips(self.__seats[player], bet_amount)
             player.current_bet = self.__current_highest_bet
         else:
             # if they player does not have enough chips to call, they go all in and side pots are handled later
             player.current_bet += player.chips
-            self.__pot.add_chips(player.chips)
+            self.__pot.add_chips(self.__seats[player], player.chips)
             player.chips = 0
 
         if player.chips == 0:
             player.all_in = True
-            player.number_of_times_all_in += 1
+            self.__update_seat(player)
+            player.action_counts[ALL_IN] += 1
             self.non_active_player = player
 
         if bet_amount == 0:
-            player.number_of_times_checked += 1
+            player.action_counts[CHECKED] += 1
         else:
-            player.number_of_times_called += 1
+            player.action_counts[CALLED] += 1
 
-        self.players_acted.append(player)
+        self.__acted_seats |= 1 << self.__seats[player]
         if bet_amount == 0:
             message = f"{player.name} checks"
         else:
@@ -756,26 +1001,68 @@ class Game:
             return {"success": False, "error": "You don't have enough chips to raise this amount."}
         else:
             player.chips -= raise_amount
-            self.__pot.add_chips(raise_amount)
+            self.__pot.add_chips(self.__seats[player], raise_amount)
             player.current_bet = total_bet
             self.__current_highest_bet = total_bet
             message = f"{player.name} raises by {raise_amount} chips to a total of {total_bet} chips"
-            print(message)
+            logger.debug("%s", message)
 
             if player.chips == 0:
                 player.all_in = True
-                player.number_of_times_all_in += 1
+                self.__update_seat(player)
+                player.action_counts[ALL_IN] += 1
                 self.non_active_player = player
 
-            player.number_of_times_raised += 1
+            player.action_counts[RAISED] += 1
 
-            # Reset the players acted list as everyone needs to agree on a new amount to bet on
-            self.players_acted = []
-            self.players_acted.append(player)
+            # Reset the players who have acted as everyone needs to agree on a new amount to bet on
+            self.__acted_seats = 1 << self.__seats[player]
             return {"success": True, "message": message}
 
-    # The method used to process any player action, making use of the methods above
+    # Whether anyone who is still in the hand is connected. If nobody is, the hand cannot carry on until someone
+    # reconnects
+    def has_connected_player_in_hand(self):
+        return self.__showdown_seats() != 0
+
+    # Get the player whose turn it is, or None if nobody can act (the game has not started or is over)
+    def get_current_player(self):
+        if not self.game_started or self.game_completed or not 0 <= self.__current_player_turn < len(self.players):
+            return None
+        return self.players[self.__current_player_turn]
+
+    # The seat (index in self.players) of the player whose turn it is
+    def get_current_player_turn(self):
+        return self.__current_player_turn
+
+    # The number of chips a player still has to put in to call the current highest bet
+    def get_amount_to_call(self, player):
+        return self.__current_highest_bet - player.current_bet
+
+    # The number of chips in the pot, including every side pot
+    def get_pot_chips(self):
+        return self.__pot.chips
+
+    # The action taken for the player whose turn it is when they run out of time: they check if they can, and fold
+    # otherwise. Returns the player and the action
+    def get_timeout_action(self):
+        player = self.players[self.__current_player_turn]
+        if player.current_bet == self.__current_highest_bet:
+            return player, "call"
+        return player, "fold"
+
+    # The method used to process any player action, making use of the methods above. The action is recorded before
+    # it is carried out, as it can lead to more records (board cards, a showdown or the next deal)
     def process_player_action(self, player, action, raise_amount):
+        if self.history_recorder is None:
+            return self.__process_player_action(player, action, raise_amount)
+
+        self.__record_history("action", seat=self.__seats.get(player), action=action, amount=raise_amount)
+        response = self.__process_player_action(player, action, raise_amount)
+        if not response["success"]:
+            self.__record_history("rejected", error=response["error"])
+        return response
+
+    def __process_player_action(self, player, action, raise_amount):
         self.non_active_player = None
         self.message = ""
         # Check if it's the player's turn
@@ -791,7 +1078,7 @@ class Game:
             return {"success": False, "error": "This player has folded."}
         if action == 'fold':
             self.message = self.__player_fold(player)
-            print(self.message)
+            logger.debug("%s", self.message)
 
         elif action == 'call':
             action_response = self.__player_call(player)
@@ -807,10 +1094,11 @@ class Game:
             else:
                 self.message = action_response['message']
 
-        player.number_of_times_acted += 1
+        player.action_counts[ACTED] += 1
 
-        print(
-            f"About to check if only one player active in list of active players: {self.__get_players_for_showdown()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("About to check if only one player active in list of active players: %s",
+                         self.__get_players_for_showdown())
         # Check if everyone has folded apart from one player
         if self.__is_only_one_player_active():
             # The remaining active player wins the pot
@@ -818,25 +1106,27 @@ class Game:
             # remaining_player = self.get_active_players()[0]
             remaining_player.chips += self.__pot.chips
             self.message = f"{remaining_player.name} wins the pot ({self.__pot.chips} chips) as everyone else folded!"
+            self.__record_history("uncontested", seat=self.__seats[remaining_player], amount=self.__pot.chips,
+                                  stacks=self.__get_stacks())
             self.__pot.reset_chips()
             if self.start_round() == "game_completed":
-                print("game completed!")
+                logger.debug("game completed!")
                 return {"success": True, "type": "game_completed"}
         elif self.__is_betting_round_over():
             # If the betting round is over, check if there are still remaining players who are not all in
             if [player.all_in for player in self.__get_players_for_showdown()].count(
                     False) > 1 and self.current_round != "river":
-                print(f"{self.current_round} round over!")
+                logger.debug("%s round over!", self.current_round)
                 self.__progress_to_next_betting_round()
             else:
-                print("skipping through Poker rounds")
+                logger.debug("skipping through Poker rounds")
                 self.__skip_through_betting_rounds()
                 return {"success": True, "type": "skip_round", "showdown": True}
         else:
             # If the betting round is not over, go to the next player's turn
             next_player_index = self.__get_next_active_player(self.__current_player_turn, False)
             if next_player_index == 999:
-                print("skipping through Poker rounds")
+                logger.debug("skipping through Poker rounds")
                 self.__skip_through_betting_rounds()
                 return {"success": True, "type": "skip_round", "showdown": True}
             else:
@@ -845,28 +1135,90 @@ class Game:
         return {"success": True, "message": self.message}
 
 
+# The chips in the middle of the table. As well as the total, the pot keeps a ledger of how many chips each seat has
+# put in during the current hand (including players who have since folded), which is all that is needed to split it
+# into side pots at the showdown
 class Pot:
     def __init__(self):
         self.chips = 0
+        # seat -> the chips that seat has put in this hand
+        self.contributions = {}
 
-    def add_chips(self, amount):
+    def add_chips(self, seat, amount):
         self.chips += amount
+        self.contributions[seat] = self.contributions.get(seat, 0) + amount
 
     def reset_chips(self):
         self.chips = 0
+        self.contributions = {}
+
+    # Split the pot into the main pot and any side pots, given the set of seats still in the hand. The pots are layers
+    # of the contributions: a pot ends at the contribution of each player still in the hand, and holds everything put
+    # in between the end of the last pot and there, so it can only be won by the players who put in at least that
+    # much. This takes a single pass over the contributions sorted by size, however many players are all in.
+    # Returns a list of (amount, eligible seats in seat order), starting with the main pot
+    def create_side_pots(self, showdown_seats):
+        contributions = sorted(self.contributions.items(), key=lambda contribution: contribution[1])
+        showdown_contributions = [seat for seat, amount in contributions if seat in showdown_seats]
+        pots = []
+        pot_amount = 0
+        previous_amount = 0
+        showdown_index = 0
+        for index, (seat, amount) in enumerate(contributions):
+            # Every seat from this one onwards put in at least this amount, so each of them adds to this layer
+            pot_amount += (amount - previous_amount) * (len(contributions) - index)
+            previous_amount = amount
+            if seat in showdown_seats:
+                # Players who put in the same amount share a pot, so only the first of them ends it
+                if pot_amount > 0:
+                    pots.append((pot_amount, sorted(showdown_contributions[showdown_index:])))
+                    pot_amount = 0
+                showdown_index += 1
+
+        # Chips put in above the largest contribution of anyone still in the hand (by players who then folded) go to
+        # the last pot. If nobody still in the hand put anything in, which should never happen, every one of them can
+        # win the chips instead of the chips being lost
+        if pot_amount > 0:
+            if pots:
+                pots[-1] = (pots[-1][0] + pot_amount, pots[-1][1])
+            elif showdown_seats:
+                logger.error("Nobody in the showdown put anything in the pot, so all of them can win it")
+                pots.append((pot_amount, sorted(showdown_seats)))
+
+        # Every player in the showdown should have put something in, and every chip in the pot should be in one of the
+        # pots, so any difference is a bug in how the chips were added to the pot
+        missing_seats = showdown_seats - self.contributions.keys()
+        if missing_seats:
+            logger.error("Seats %s are in the showdown but put nothing in the pot", sorted(missing_seats))
+        total_of_pots = sum(amount for amount, _ in pots)
+        if total_of_pots != self.chips:
+            logger.error("The pots hold %s chips in total, but %s chips were put in the pot", total_of_pots,
+                         self.chips)
+        return pots
+
+    def to_snapshot(self):
+        return {"chips": self.chips, "contributions": [[seat, amount] for seat, amount in self.contributions.items()]}
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        pot = cls()
+        pot.chips = snapshot["chips"]
+        pot.contributions = {seat: amount for seat, amount in snapshot["contributions"]}
+        return pot
 
 
 class Hand:
+    __slots__ = ("cards",)
+
     def __init__(self, cards):
         self.cards = cards
 
     # This is a constant as denoted by the name being fully uppercase
-    RANKS = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10,
-             'Jack': 11, 'Queen': 12, 'King': 13, 'Ace': 14}
+    RANKS = RANK_VALUES
 
     def __count_ranks_and_suits(self):
-        ranks = sorted([self.RANKS[card.rank] for card in self.cards])
-        suits = [card.suit for card in self.cards]
+        ranks = sorted([card.rank_value for card in self.cards])
+        suits = [card.suit_index for card in self.cards]
         return ranks, suits
 
     # This method checks if there is a flush in a given deck
@@ -890,70 +1242,18 @@ class Hand:
         straight_flush = royal_flush = False
         for suit, count in suit_counts.items():
             if count >= 5:
-                flush_ranks = sorted([self.RANKS[card.rank] for card in self.cards if card.suit == suit], reverse=True)
+                flush_ranks = sorted([card.rank_value for card in self.cards if card.suit_index == suit], reverse=True)
                 if self.__check_straight(flush_ranks):
                     straight_flush = True
                     if flush_ranks[:5] == [14, 13, 12, 11, 10]:  # Checking for Ace high straight flush (Royal Flush)
                         royal_flush = True
         return straight_flush, royal_flush
 
-    # This method evaluates the strength of a 5 card Poker hand and returns the highest card ranking
-    # Some helper methods can not be used in this method due to the way it returns ranks as well due to this method
-    # being used in the context of determining a winner as part of a showdown
+    # This method evaluates the strength of a Poker hand (5 to 7 cards) and returns the name of the hand ranking
+    # along with the ranks that matter for breaking ties, in order of significance
     def evaluate_strength(self):
-        # Convert cards to rank numbers and sort
-        ranks, suits = self.__count_ranks_and_suits()
-
-        # Check for flush and straight
-        flush, suit_counts = self.__check_flush(suits)
-        straight = self.__check_straight(ranks)
-
-        # Check for four of a kind, three of a kind, pairs
-        rank_counts = {rank: ranks.count(rank) for rank in ranks}
-        max_count = max(rank_counts.values())
-
-        straight_flush, royal_flush = self.__check_straight_flush(suit_counts)
-
-        # Royal Flush
-        if royal_flush:
-            return "Royal Flush", ranks
-        # Straight Flush
-        if straight_flush:
-            return "Straight Flush", ranks if ranks != [14, 5, 4, 3, 2] else [5, 4, 3, 2, 1]
-        # Four of a Kind
-        if max_count == 4:
-            quad_rank = [rank for rank, count in rank_counts.items() if count == 4][0]
-            other_ranks = [rank for rank in ranks if rank != quad_rank]
-            return "Four of a Kind", [quad_rank] * 4 + other_ranks[:1]
-        # Full House
-        if max_count == 3 and len(set(ranks)) == 2:
-            trips_rank = [rank for rank, count in rank_counts.items() if count == 3][0]
-            other_rank = [rank for rank in ranks if rank != trips_rank][0]
-            return "Full House", [trips_rank] * 3 + [other_rank] * 2
-        # Flush
-        if flush:
-            return "Flush", ranks
-        # Straight
-        if straight:
-            # The if statement below adjusts for the special case where the Ace is used as a 1 in the straight
-            return "Straight", ranks if ranks != [14, 5, 4, 3, 2] else [5, 4, 3, 2, 1]
-        # Three of a Kind
-        if max_count == 3:
-            trips_rank = [rank for rank, count in rank_counts.items() if count == 3][0]
-            other_ranks = [rank for rank in ranks if rank != trips_rank]
-            return "Three of a Kind", [trips_rank] * 3 + other_ranks[:2]
-        # Two Pair
-        if list(rank_counts.values()).count(2) == 2:
-            pair_ranks = [rank for rank, count in rank_counts.items() if count == 2]
-            other_ranks = [rank for rank in ranks if rank not in pair_ranks]
-            return "Two Pair", pair_ranks * 2 + other_ranks[:1]
-        # Pair
-        if 2 in rank_counts.values():
-            pair_rank = [rank for rank, count in rank_counts.items() if count == 2][0]
-            other_ranks = [rank for rank in ranks if rank != pair_rank]
-            return "Pair", [pair_rank] * 2 + other_ranks[:3]
-        # High Card
-        return "High Card", ranks
+        score = hand_strength_cache.evaluate_cards(self.cards)
+        return hand_ranking_name(score), significant_ranks(score)
 
     # This method returns a dictionary of all the possible card rankings made with a 7 card deck
     def evaluate_rankings_for_odds_calculation(self):
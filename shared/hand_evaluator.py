@@ -0,0 +1,198 @@
+# A table-driven evaluator which scores a set of 5 to 7 cards in a single pass and returns one integer.
+# Bigger integers are always better hands, so comparing two hands is a plain integer comparison and two hands
+# tie exactly when their scores are equal.
+#
+# Layout of a score (from the most significant bits down):
+#   bits 20+    : the hand category, which is the index of the ranking in HAND_RANKINGS
+#   bits 16..19 : the most significant rank of the hand (e.g. the rank of the pair or the top card of a straight)
+#   bits 0..15  : up to four more ranks (kickers etc.) in order of significance, 4 bits each
+# Ranks are stored as their values (2 to 14), so a zero nibble means "no card".
+
+HAND_RANKINGS = ["High Card", "Pair", "Two Pair", "Three of a Kind", "Straight", "Flush", "Full House",
+                 "Four of a Kind", "Straight Flush", "Royal Flush"]
+
+HIGH_CARD, PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH, \
+    ROYAL_FLUSH = range(len(HAND_RANKINGS))
+
+CATEGORY_SHIFT = 20
+
+# Cards are encoded as integers from 0 to 51: code = suit_index * 13 + rank_index, where the rank index is 0 for a 2
+# and 12 for an Ace. The suit and rank names are only needed when converting to and from strings for the GUI/network
+SUITS = ["Clubs", "Diamonds", "Spades", "Hearts"]
+RANKS = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "Jack", "Queen", "King", "Ace"]
+RANK_VALUES = {rank: rank_index + 2 for rank_index, rank in enumerate(RANKS)}
+SUIT_INDEXES = {suit: suit_index for suit_index, suit in enumerate(SUITS)}
+NUMBER_OF_CARDS = len(SUITS) * len(RANKS)
+
+
+# Get the integer code of a card from its suit and rank names, e.g. card_code("Hearts", "Queen")
+def card_code(suit, rank):
+    return SUIT_INDEXES[suit] * 13 + RANK_VALUES[rank] - 2
+
+
+# Every rank is a single bit in a 13 bit mask, with the 2 as bit 0 and the Ace as bit 12
+_NUMBER_OF_MASKS = 1 << 13
+
+
+def _build_tables():
+    popcount = [0] * _NUMBER_OF_MASKS
+    high_rank = [0] * _NUMBER_OF_MASKS
+    top_five = [0] * _NUMBER_OF_MASKS
+    straight_high = [0] * _NUMBER_OF_MASKS
+
+    # The bit patterns of the ten possible straights, best first. The last one is the "wheel" (Ace to 5)
+    straights = [(0b11111 << low, low + 6) for low in range(8, -1, -1)]
+    straights.append((0b1000000001111, 5))
+
+    for mask in range(1, _NUMBER_OF_MASKS):
+        ranks = [bit + 2 for bit in range(12, -1, -1) if mask & (1 << bit)]
+        popcount[mask] = len(ranks)
+        high_rank[mask] = ranks[0]
+
+        # Pack the (up to) five best ranks into 20 bits, the best rank in the top nibble
+        packed = 0
+        for index, rank in enumerate(ranks[:5]):
+            packed |= rank << (16 - 4 * index)
+        top_five[mask] = packed
+
+        for straight_mask, high in straights:
+            if mask & straight_mask == straight_mask:
+                straight_high[mask] = high
+                break
+
+    return popcount, high_rank, top_five, straight_high
+
+
+# These lookup tables are indexed by a 13 bit rank mask and are only built once when the module is imported
+POPCOUNT, HIGH_RANK, TOP_FIVE, STRAIGHT_HIGH = _build_tables()
+
+
+# The rank bit and suit index of every card code, so that evaluating codes does not need any division
+CODE_RANK_BITS = [1 << (code % 13) for code in range(NUMBER_OF_CARDS)]
+CODE_SUIT_INDEXES = [code // 13 for code in range(NUMBER_OF_CARDS)]
+
+
+# Score a set of 5 to 7 Card objects. Cards carry their own rank bit and suit index, so no lookups are needed
+def evaluate_cards(cards):
+    suit_masks = [0, 0, 0, 0]
+    # seen_once has a bit set for every rank that appears, seen_twice for every rank that appears at least twice...
+    seen_once = seen_twice = seen_three_times = seen_four_times = 0
+    for card in cards:
+        bit = card.rank_bit
+        suit_masks[card.suit_index] |= bit
+        if seen_once & bit:
+            if seen_twice & bit:
+                if seen_three_times & bit:
+                    seen_four_times |= bit
+                else:
+                    seen_three_times |= bit
+            else:
+                seen_twice |= bit
+        else:
+            seen_once |= bit
+
+    return _score_from_masks(suit_masks, seen_once, seen_twice, seen_three_times, seen_four_times)
+
+
+# Score a set of 5 to 7 integer card codes
+def evaluate_codes(codes):
+    suit_masks = [0, 0, 0, 0]
+    seen_once = seen_twice = seen_three_times = seen_four_times = 0
+    for code in codes:
+        bit = CODE_RANK_BITS[code]
+        suit_masks[CODE_SUIT_INDEXES[code]] |= bit
+        if seen_once & bit:
+            if seen_twice & bit:
+                if seen_three_times & bit:
+                    seen_four_times |= bit
+                else:
+                    seen_three_times |= bit
+            else:
+                seen_twice |= bit
+        else:
+            seen_once |= bit
+
+    return _score_from_masks(suit_masks, seen_once, seen_twice, seen_three_times, seen_four_times)
+
+
+# Score a set of 5 to 7 cards given as a 52 bit card mask (bit n set for the card with code n). The rank mask of
+# each suit is just a 13 bit slice of the card mask, and the ranks seen two, three or four times can be found by
+# combining the suit masks, so no loop over the cards is needed
+def evaluate_mask(mask):
+    clubs, diamonds, spades, hearts = mask & 0x1FFF, (mask >> 13) & 0x1FFF, (mask >> 26) & 0x1FFF, mask >> 39
+    seen_once = clubs | diamonds | spades | hearts
+    seen_twice = (clubs & (diamonds | spades | hearts)) | (diamonds & (spades | hearts)) | (spades & hearts)
+    seen_three_times = (clubs & diamonds & (spades | hearts)) | ((clubs | diamonds) & spades & hearts)
+    seen_four_times = clubs & diamonds & spades & hearts
+
+    return _score_from_masks((clubs, diamonds, spades, hearts), seen_once, seen_twice, seen_three_times,
+                             seen_four_times)
+
+
+# Get the 52 bit card mask of some Card objects
+def card_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= card.mask
+    return mask
+
+
+# The evaluation functions rely on there being 7 cards or fewer, because with 7 cards a flush can never be present
+# at the same time as a full house or four of a kind, so a flush can be returned straight away.
+def _score_from_masks(suit_masks, seen_once, seen_twice, seen_three_times, seen_four_times):
+    for suit_mask in suit_masks:
+        if POPCOUNT[suit_mask] >= 5:
+            high = STRAIGHT_HIGH[suit_mask]
+            if high == 14:
+                return (ROYAL_FLUSH << CATEGORY_SHIFT) | (high << 16)
+            if high:
+                return (STRAIGHT_FLUSH << CATEGORY_SHIFT) | (high << 16)
+            return (FLUSH << CATEGORY_SHIFT) | TOP_FIVE[suit_mask]
+
+    if seen_four_times:
+        quads = HIGH_RANK[seen_four_times]
+        kicker = HIGH_RANK[seen_once & ~(1 << (quads - 2))]
+        return (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (quads << 16) | (kicker << 12)
+
+    if seen_three_times:
+        trips = HIGH_RANK[seen_three_times]
+        trips_bit = 1 << (trips - 2)
+        # A second set of trips also counts as the pair of a full house
+        pair_mask = seen_twice & ~trips_bit
+        if pair_mask:
+            return (FULL_HOUSE << CATEGORY_SHIFT) | (trips << 16) | (HIGH_RANK[pair_mask] << 12)
+
+    straight_high = STRAIGHT_HIGH[seen_once]
+    if straight_high:
+        return (STRAIGHT << CATEGORY_SHIFT) | (straight_high << 16)
+
+    if seen_three_times:
+        kickers = TOP_FIVE[seen_once & ~trips_bit] >> 12
+        return (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips << 16) | (kickers << 8)
+
+    if seen_twice:
+        high_pair = HIGH_RANK[seen_twice]
+        remaining_pairs = seen_twice & ~(1 << (high_pair - 2))
+        if remaining_pairs:
+            low_pair = HIGH_RANK[remaining_pairs]
+            kicker = HIGH_RANK[seen_once & ~(1 << (high_pair - 2)) & ~(1 << (low_pair - 2))]
+            return (TWO_PAIR << CATEGORY_SHIFT) | (high_pair << 16) | (low_pair << 12) | (kicker << 8)
+        kickers = TOP_FIVE[seen_once & ~(1 << (high_pair - 2))] >> 8
+        return (PAIR << CATEGORY_SHIFT) | (high_pair << 16) | (kickers << 4)
+
+    return (HIGH_CARD << CATEGORY_SHIFT) | TOP_FIVE[seen_once]
+
+
+# Get the category (index into HAND_RANKINGS) of a score
+def hand_category(score):
+    return score >> CATEGORY_SHIFT
+
+
+# Get the name of the hand ranking of a score, e.g. "Full House"
+def hand_ranking_name(score):
+    return HAND_RANKINGS[score >> CATEGORY_SHIFT]
+
+
+# Get the significant ranks of a score in order of significance, e.g. [13, 9, 4] for kings and nines with a 4 kicker
+def significant_ranks(score):
+    return [rank for rank in ((score >> shift) & 0xF for shift in (16, 12, 8, 4, 0)) if rank]
@@ -0,0 +1,137 @@
+# An append-only hand history: every deal, action, board card and showdown of a game, one compact JSON record per line
+# in a file for each lobby. The records come from Game.history_recorder, are written by a background thread with
+# buffered files (so a game never waits for the disk), and can be streamed back lazily for audits, offline analytics
+# and replays (see benchmarks/replay.py).
+#
+# Every record has a "type" and the time it was recorded. Cards are card codes and players are seat numbers (their
+# index in Game.players). The types of record are:
+#   table           before the first hand: starting_chips, player_limit and the players (user_id, name, position, chips)
+#   deal            a new hand: hand number, dealer, small_blind, big_blind, hole_cards for every seat and stacks
+#                   after the blinds. Together with the board records, this is every card dealt in the hand
+#   action          seat, action and amount, recorded before the action is carried out
+#   rejected        the action before it was not allowed: error
+#   board           burn and the cards added to the board
+#   showdown        hands of the players in the showdown, pots (the amount of each pot and the seats that won it) and
+#                   stacks afterwards
+#   uncontested     everyone else folded: seat, amount and stacks afterwards
+#   leave           a player left the game in progress: seat
+#   reconnect       a player who left came back: seat
+#   game_completed  stacks and finishing_positions
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from shared.log import get_logger
+
+logger = get_logger(__name__)
+
+# How often the buffered files are flushed to disk
+FLUSH_INTERVAL_SECONDS = 1.0
+FILE_BUFFER_SIZE = 64 * 1024
+
+
+def get_hand_history_path(directory, lobby_id):
+    return os.path.join(directory, f"lobby_{lobby_id}.jsonl")
+
+
+# Writes hand history records to a file for each lobby on a background thread. append() only puts the record on a
+# queue, so it is cheap enough to be called from the game's hot path
+class HandHistoryWriter:
+    def __init__(self, directory, flush_interval_seconds=FLUSH_INTERVAL_SECONDS):
+        self.directory = directory
+        self.flush_interval_seconds = flush_interval_seconds
+        os.makedirs(self.directory, exist_ok=True)
+        self.__queue = queue.SimpleQueue()
+        self.__files = {}
+        self.__writer_thread = threading.Thread(target=self.__write_records, daemon=True)
+        self.__writer_thread.start()
+        atexit.register(self.stop)
+
+    # Add a record to the hand history of a lobby. It can be used as a Game.history_recorder with
+    # functools.partial(writer.append, lobby_id)
+    def append(self, lobby_id, record):
+        record["time"] = round(time.time(), 3)
+        self.__queue.put((lobby_id, record))
+
+    # Close the file of a lobby that no longer exists, once every record before this has been written
+    def close_lobby(self, lobby_id):
+        self.__queue.put((lobby_id, None))
+
+    # Write every record on the queue and stop the background thread
+    def stop(self):
+        if self.__writer_thread.is_alive():
+            self.__queue.put(None)
+            self.__writer_thread.join()
+
+    def __write_records(self):
+        last_flush_time = time.monotonic()
+        while True:
+            try:
+                item = self.__queue.get(timeout=self.flush_interval_seconds)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+            if item:
+                lobby_id, record = item
+                try:
+                    self.__write_record(lobby_id, record)
+                except (OSError, TypeError, ValueError) as e:
+                    logger.error("Could not write a hand history record for lobby %s: %s", lobby_id, e)
+
+            if time.monotonic() - last_flush_time >= self.flush_interval_seconds:
+                self.__flush_files()
+                last_flush_time = time.monotonic()
+
+        for file in self.__files.values():
+            file.close()
+        self.__files.clear()
+
+    def __write_record(self, lobby_id, record):
+        if record is None:
+            file = self.__files.pop(lobby_id, None)
+            if file is not None:
+                file.close()
+            return
+
+        file = self.__files.get(lobby_id)
+        if file is None:
+            file = open(get_hand_history_path(self.directory, lobby_id), "a", buffering=FILE_BUFFER_SIZE)
+            self.__files[lobby_id] = file
+        file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def __flush_files(self):
+        for lobby_id, file in self.__files.items():
+            try:
+                file.flush()
+            except OSError as e:
+                logger.error("Could not flush the hand history of lobby %s: %s", lobby_id, e)
+
+
+# Stream the records of a hand history file one at a time, without reading the whole file into memory. A last line
+# that was only partly written (e.g. because the server crashed) is skipped
+def read_records(path):
+    with open(path) as file:
+        for line in file:
+            if not line.endswith("\n"):
+                logger.warning("Skipping a partly written record at the end of %s", path)
+                break
+            yield json.loads(line)
+
+
+# Stream the records of a hand history file grouped into hands: each group is a list of records starting with a
+# "deal" record. Any records before the first deal (such as the "table" record) form a group of their own, and so
+# does a "game_completed" record
+def read_hands(path):
+    hand = []
+    for record in read_records(path):
+        if record["type"] in ("deal", "game_completed", "table") and hand:
+            yield hand
+            hand = []
+        hand.append(record)
+    if hand:
+        yield hand
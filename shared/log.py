@@ -0,0 +1,75 @@
+# The logging layer used by the client, the server and the shared game engine instead of print().
+#
+# Every module gets its own logger with get_logger(__name__) and logs with %-style arguments, e.g.
+#   logger.debug("Dealt %s to %s", card, player.name)
+# The message is only formatted if the level is enabled, so a disabled debug message costs almost nothing even if
+# its arguments are big (like a whole game state), which is why f-strings are not used for log messages.
+#
+# Records are put on a queue and written to the terminal (and optionally a file) by a background thread, so the
+# game and network threads never wait for the terminal. Levels can be set for every module separately with the
+# POKER_LOG_LEVELS environment variable, and the default level with POKER_LOG_LEVEL, e.g.
+#   POKER_LOG_LEVEL=INFO POKER_LOG_LEVELS=shared.game_logic=DEBUG,server=WARNING python server.py
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+DEFAULT_LEVEL = "WARNING"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+_listener = None
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+# Parse levels given as "module=LEVEL,other.module=LEVEL" into a dictionary
+def parse_levels(levels_text):
+    levels = {}
+    for entry in levels_text.split(","):
+        if "=" in entry:
+            name, level = entry.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+# Set up logging for the whole process. This should be called once when a program starts; calling it again replaces
+# the previous configuration. Any argument that is not given is read from the environment variables
+def configure_logging(default_level=None, levels=None, log_file=None):
+    global _listener
+    default_level = default_level or os.environ.get("POKER_LOG_LEVEL", DEFAULT_LEVEL)
+    levels = levels if levels is not None else parse_levels(os.environ.get("POKER_LOG_LEVELS", ""))
+    log_file = log_file or os.environ.get("POKER_LOG_FILE")
+
+    if _listener is not None:
+        _listener.stop()
+
+    output_handlers = [logging.StreamHandler()]
+    if log_file:
+        output_handlers.append(logging.FileHandler(log_file))
+    for handler in output_handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    # Only the queue handler runs in the thread that logs. The listener thread does the slow part of writing out
+    record_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.handlers = [logging.handlers.QueueHandler(record_queue)]
+    root_logger.setLevel(default_level.upper())
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(record_queue, *output_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+# Write out any records still on the queue, e.g. when the program exits
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
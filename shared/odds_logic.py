@@ -0,0 +1,357 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import combinations
+from math import comb, sqrt
+
+import numpy as np
+
+from shared.batch_evaluator import HAND_TYPES, batch_hand_rankings, evaluate_batch, sample_cards, simulate_showdowns
+from shared.evaluation_cache import EvaluationCache
+from shared.game_logic import Card
+from shared.hand_evaluator import NUMBER_OF_CARDS, POPCOUNT, STRAIGHT_HIGH
+from shared.preflop_odds import MAX_OPPONENTS, lookup_preflop_odds
+from shared.log import get_logger
+
+logger = get_logger(__name__)
+
+# If there are at most this many possible ways to complete the board (1,081 on the flop, 46 on the turn), every one of
+# them is evaluated exactly instead of sampling. Only preflop (over 2 million boards) needs to be sampled
+EXACT_ENUMERATION_LIMIT = 5000
+
+# If there are at most this many different hands to evaluate, they are looked up one by one in the evaluation cache
+# instead of being evaluated as a batch
+CACHED_HANDS_LIMIT = 100
+
+# Against a single opponent, every possible opponent hand and board is enumerated if there are at most this many
+# combinations of them (990 on the river and 45,540 on the turn), otherwise the showdowns are sampled
+EXACT_EQUITY_LIMIT = 50000
+
+# Sampled odds are simulated in chunks of this size, each with its own seed derived from the main seed. After every
+# chunk the margin of error of each probability is checked, and sampling stops as soon as they are all within the
+# precision asked for, the time budget runs out, or MAX_ODDS_ITERATIONS have been simulated. The chunks are checked in
+# the same order however many processes there are, so the same seed (without a time budget) always gives the same odds
+ODDS_CHUNK_SIZE = 10000
+MAX_ODDS_ITERATIONS = 2000000
+
+# The default precision is the largest margin of error allowed for a probability, so 0.005 means that every
+# probability should be within 0.5 percentage points of the true value
+DEFAULT_PRECISION = 0.005
+DEFAULT_TIME_BUDGET_MS = 2000
+
+# Margins of error are given as 95% confidence intervals, which is 1.96 standard errors either side of the estimate
+CONFIDENCE_Z_SCORE = 1.96
+
+# The number of worker processes used to simulate odds, one for each CPU core
+ODDS_WORKERS = os.cpu_count() or 1
+
+# The process pool is only created the first time it is needed, and the single background thread is used to run
+# simulations for the GUI without blocking it
+_process_pool = None
+_background_thread = ThreadPoolExecutor(max_workers=1)
+
+
+# I have chosen to get these odds using a Monte Carlo situation due to its good balance between accuracy and
+# computational efficiency, which can be very useful for poker which is a real-time game.
+# Additionally, the option to change the accuracy of the odds is powerful: sampling carries on until every probability
+# is within the precision asked for (or the time budget in milliseconds runs out), so no time is wasted once the odds
+# have converged.
+# After the flop there are few enough possible boards left that the odds are worked out exactly instead, and before
+# the flop they are read from the precomputed preflop table, so sampling is only needed if that table is missing.
+# Giving a seed makes the result reproducible, and use_process_pool spreads the sampling across every CPU core.
+# Sampling also stops early once cancel_event (a threading.Event) is set, e.g. because the odds are no longer needed.
+# Returns the probability of each hand type and the margin of error (95% confidence) of each probability.
+def monte_carlo_hand_odds(hand_cards, community_cards, precision=DEFAULT_PRECISION,
+                          time_budget_ms=DEFAULT_TIME_BUDGET_MS, seed=None, use_process_pool=False, cancel_event=None):
+    logger.debug("Hand cards: %s", hand_cards)
+    logger.debug("Community cards: %s", community_cards)
+
+    if len(hand_cards) != 2:
+        return False
+
+    modified_hand_cards = [Card(hand_cards[0][0], hand_cards[0][1]), Card(hand_cards[1][0], hand_cards[1][1])]
+
+    modified_community_cards = []
+    for i in range(len(community_cards)):
+        modified_community_cards.append(Card(community_cards[i][0], community_cards[i][1]))
+
+    logger.debug("New hand cards: %s", modified_hand_cards)
+    logger.debug("New community cards: %s", modified_community_cards)
+
+    hand_odds = {
+        "Royal Flush": 0,
+        "Straight Flush": 0,
+        "Four of a Kind": 0,
+        "Full House": 0,
+        "Flush": 0,
+        "Straight": 0,
+        "Three of a Kind": 0,
+        "Two Pair": 0,
+        "Pair": 0
+    }
+
+    # Before the flop the odds only depend on the starting hand, so they are looked up in the precomputed table
+    if not modified_community_cards:
+        preflop_odds = lookup_preflop_odds(modified_hand_cards[0].code, modified_hand_cards[1].code)
+        if preflop_odds is not None:
+            logger.debug("Hand odds (precomputed): %s", preflop_odds[0])
+            return preflop_odds[0], {hand_type: _binomial_margin(probability, preflop_odds[2])
+                                     for hand_type, probability in preflop_odds[0].items()}
+
+    # The cards left in the deck are every card apart from the known cards
+    known_codes = [card.code for card in modified_hand_cards + modified_community_cards]
+    remaining_codes = [code for code in range(NUMBER_OF_CARDS) if code not in known_codes]
+
+    # Enumerate every possible set of remaining community cards if there are few enough of them (so the odds are
+    # exact and have no margin of error), otherwise simulate the remaining community card draws until they converge
+    remaining_cards_to_draw = 5 - len(modified_community_cards)
+    number_of_boards = comb(len(remaining_codes), remaining_cards_to_draw)
+    if number_of_boards <= EXACT_ENUMERATION_LIMIT:
+        simulated_community = np.array(list(combinations(remaining_codes, remaining_cards_to_draw)),
+                                       dtype=np.int64).reshape(number_of_boards, remaining_cards_to_draw)
+        hand_type_counters = _count_hand_types(known_codes, simulated_community)
+        for hand_type in hand_odds:
+            hand_odds[hand_type] = hand_type_counters[hand_type] / number_of_boards
+        margins = {hand_type: 0.0 for hand_type in hand_odds}
+    else:
+        hand_odds, margins = _sample_until_converged(_simulate_chunk, (known_codes, remaining_codes,
+                                                                       remaining_cards_to_draw), precision,
+                                                     time_budget_ms, seed, use_process_pool, cancel_event)
+
+    logger.debug("Hand odds: %s (margins of error: %s)", hand_odds, margins)
+    return hand_odds, margins
+
+
+# Work out the chance of winning, tying or losing a showdown against a number of opponents who are holding random
+# cards, along with the equity (the average share of the pot won, where an n-way tie wins 1/n of the pot).
+# Preflop this is read from the precomputed table, heads up on the turn and river every possibility is enumerated,
+# and otherwise the showdowns are simulated until they converge (or are cancelled) in the same way as
+# monte_carlo_hand_odds().
+# Returns the equity results and the margin of error (95% confidence) of each of them.
+def hand_equity(hand_cards, community_cards, opponents, precision=DEFAULT_PRECISION,
+                time_budget_ms=DEFAULT_TIME_BUDGET_MS, seed=None, use_process_pool=False, cancel_event=None):
+    if len(hand_cards) != 2:
+        return False
+
+    modified_hand_cards = [Card(suit, rank) for suit, rank in hand_cards]
+    modified_community_cards = [Card(suit, rank) for suit, rank in community_cards]
+
+    # If there are no opponents left (everybody else has folded) the pot is already won
+    if opponents < 1:
+        return {"win": 1.0, "tie": 0.0, "lose": 0.0, "equity": 1.0}, {"win": 0.0, "tie": 0.0, "lose": 0.0,
+                                                                       "equity": 0.0}
+
+    if not modified_community_cards and opponents <= MAX_OPPONENTS:
+        preflop_odds = lookup_preflop_odds(modified_hand_cards[0].code, modified_hand_cards[1].code)
+        if preflop_odds is not None:
+            win, tie, equity = preflop_odds[1][opponents - 1]
+            # A pot share is between 0 and 1, so its variance is at most equity * (1 - equity) like a probability
+            results = {"win": win, "tie": tie, "lose": max(0.0, 1 - win - tie), "equity": equity}
+            return results, {result: _binomial_margin(value, preflop_odds[2]) for result, value in results.items()}
+
+    hole_codes = [card.code for card in modified_hand_cards]
+    board_codes = [card.code for card in modified_community_cards]
+    remaining_codes = [code for code in range(NUMBER_OF_CARDS) if code not in hole_codes + board_codes]
+    cards_to_draw = 5 - len(board_codes)
+
+    if opponents == 1 and comb(len(remaining_codes), cards_to_draw + 2) * comb(cards_to_draw + 2, 2) <= \
+            EXACT_EQUITY_LIMIT:
+        wins, ties, pot_shares = _enumerate_heads_up_showdowns(hole_codes, board_codes, remaining_codes)
+        results = {"win": float(wins.mean()), "tie": float(ties.mean()), "lose": float(1 - (wins | ties).mean()),
+                   "equity": float(pot_shares.mean())}
+        margins = {result: 0.0 for result in results}
+    else:
+        results, margins = _sample_until_converged(_simulate_equity_chunk, (hole_codes, board_codes, remaining_codes,
+                                                                            opponents), precision, time_budget_ms,
+                                                   seed, use_process_pool, cancel_event)
+
+    logger.debug("Equity against %s opponents: %s (margins of error: %s)", opponents, results, margins)
+    return results, margins
+
+
+# Play out every possible showdown against one opponent: every way to complete the board combined with every
+# opponent hand that does not use any of those board cards
+def _enumerate_heads_up_showdowns(hole_codes, board_codes, remaining_codes):
+    cards_to_draw = 5 - len(board_codes)
+    board_completions = np.array(list(combinations(remaining_codes, cards_to_draw)),
+                                 dtype=np.int64).reshape(-1, cards_to_draw)
+    opponent_holes = np.array(list(combinations(remaining_codes, 2)), dtype=np.int64)
+
+    # Pair up every board completion with every opponent hand, skipping pairs which share a card
+    completion_masks = np.bitwise_or.reduce(np.left_shift(np.int64(1), board_completions), axis=1)
+    hole_masks = np.left_shift(np.int64(1), opponent_holes[:, 0]) | np.left_shift(np.int64(1), opponent_holes[:, 1])
+    completion_indexes, hole_indexes = np.nonzero((completion_masks[:, None] & hole_masks[None, :]) == 0)
+
+    boards = np.hstack([np.broadcast_to(np.array(board_codes, dtype=np.int64), (len(completion_indexes),
+                                                                                 len(board_codes))),
+                        board_completions[completion_indexes]])
+    _, own_strengths = evaluate_batch(np.hstack([np.broadcast_to(np.array(hole_codes, dtype=np.int64),
+                                                                 (len(boards), 2)), boards]))
+    _, opponent_strengths = evaluate_batch(np.hstack([opponent_holes[hole_indexes], boards]))
+
+    wins = own_strengths > opponent_strengths
+    ties = own_strengths == opponent_strengths
+    return wins, ties, wins + ties / 2
+
+
+# Start working out the odds in the background (using every CPU core) and return a Future straight away. The GUI can
+# check future.done() without blocking, and future.result() gives the same result as monte_carlo_hand_odds().
+# Odds that are no longer needed should be cancelled with future.cancel(), which only works if they have not started
+# yet, and by setting cancel_event, which stops them while they are being sampled. Otherwise they hold up every
+# calculation submitted after them, as they all run one at a time
+def submit_hand_odds(hand_cards, community_cards, precision=DEFAULT_PRECISION, time_budget_ms=DEFAULT_TIME_BUDGET_MS,
+                     seed=None, cancel_event=None):
+    return _background_thread.submit(monte_carlo_hand_odds, hand_cards, community_cards, precision, time_budget_ms,
+                                     seed, True, cancel_event)
+
+
+# Start working out both the hand odds and the equity against a number of opponents in the background, returning a
+# Future whose result is ((hand odds, margins), (equity, margins)), or (False, False) if there are no hole cards yet.
+# The time budget is shared between the two calculations, and they can be cancelled in the same way as
+# submit_hand_odds()
+def submit_odds_and_equity(hand_cards, community_cards, opponents, precision=DEFAULT_PRECISION,
+                           time_budget_ms=DEFAULT_TIME_BUDGET_MS, seed=None, cancel_event=None):
+    return _background_thread.submit(_odds_and_equity, hand_cards, community_cards, opponents, precision,
+                                     time_budget_ms, seed, cancel_event)
+
+
+def _odds_and_equity(hand_cards, community_cards, opponents, precision, time_budget_ms, seed, cancel_event):
+    return (monte_carlo_hand_odds(hand_cards, community_cards, precision, time_budget_ms / 2, seed, True,
+                                  cancel_event),
+            hand_equity(hand_cards, community_cards, opponents, precision, time_budget_ms / 2, seed, True,
+                        cancel_event))
+
+
+# Get the margin of error (95% confidence) of a probability estimated from a number of samples
+def _binomial_margin(probability, samples):
+    return CONFIDENCE_Z_SCORE * sqrt(probability * (1 - probability) / samples)
+
+
+# Keep simulating chunks with simulate_chunk(*chunk_arguments, chunk_size, seed) until every result has converged,
+# the time budget has run out, cancel_event has been set or MAX_ODDS_ITERATIONS have been simulated. Each chunk returns a dictionary of
+# {result: (sum, sum of squares)} so that both the mean and the standard error of every result can be worked out.
+# Returns the mean of each result and its margin of error
+def _sample_until_converged(simulate_chunk, chunk_arguments, precision, time_budget_ms, seed, use_process_pool,
+                            cancel_event=None):
+    start_time = time.perf_counter()
+    seed_sequence = np.random.SeedSequence(seed)
+    # With the process pool a whole round of chunks is simulated at once, one for each worker process
+    chunks_per_round = ODDS_WORKERS if use_process_pool else 1
+
+    totals = {}
+    samples = 0
+    while True:
+        chunk_seeds = seed_sequence.spawn(chunks_per_round)
+        round_arguments = [[argument] * chunks_per_round for argument in chunk_arguments]
+        round_arguments += [[ODDS_CHUNK_SIZE] * chunks_per_round, chunk_seeds]
+        if chunks_per_round > 1:
+            round_results = _get_process_pool().map(simulate_chunk, *round_arguments)
+        else:
+            round_results = map(simulate_chunk, *round_arguments)
+
+        # The chunks are added one at a time in order, so the result does not depend on the number of processes
+        for chunk_results in round_results:
+            for result, (total, total_of_squares) in chunk_results.items():
+                previous_total, previous_total_of_squares = totals.get(result, (0, 0))
+                totals[result] = (previous_total + total, previous_total_of_squares + total_of_squares)
+            samples += ODDS_CHUNK_SIZE
+
+            means, margins = _means_and_margins(totals, samples)
+            if max(margins.values()) <= precision or samples >= MAX_ODDS_ITERATIONS:
+                logger.debug("Odds converged after %s iterations", samples)
+                return means, margins
+
+        if (time.perf_counter() - start_time) * 1000 >= time_budget_ms:
+            logger.debug("Ran out of time after %s iterations", samples)
+            return means, margins
+        if cancel_event is not None and cancel_event.is_set():
+            logger.debug("Cancelled after %s iterations", samples)
+            return means, margins
+
+
+def _means_and_margins(totals, samples):
+    means = {}
+    margins = {}
+    for result, (total, total_of_squares) in totals.items():
+        mean = total / samples
+        # Results that have not been seen yet (e.g. a royal flush) would otherwise look like they have no error at
+        # all, so the variance is never taken to be less than that of a result seen once
+        variance = max(total_of_squares / samples - mean * mean, 1 / samples)
+        means[result] = mean
+        margins[result] = CONFIDENCE_Z_SCORE * sqrt(variance / samples)
+    return means, margins
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=ODDS_WORKERS)
+    return _process_pool
+
+
+# Simulate one chunk of iterations and count how many times each hand type was made. This is a module level function
+# so that it can be sent to the worker processes. Each hand type is either made or not, so the sum of squares of a
+# hand type is the same as its count
+def _simulate_chunk(known_codes, remaining_codes, cards_to_draw, iterations, seed):
+    random_generator = np.random.default_rng(seed)
+    simulated_community = sample_cards(remaining_codes, cards_to_draw, iterations, random_generator)
+    return {hand_type: (count, count) for hand_type, count in
+            _count_hand_types(known_codes, simulated_community).items()}
+
+
+# Simulate one chunk of showdowns against a number of opponents holding random cards
+def _simulate_equity_chunk(hole_codes, board_codes, remaining_codes, opponents, iterations, seed):
+    wins, ties, pot_shares = simulate_showdowns(hole_codes, board_codes, remaining_codes, opponents, iterations,
+                                                np.random.default_rng(seed))
+    number_of_wins, number_of_ties = int(wins.sum()), int(ties.sum())
+    number_of_losses = iterations - number_of_wins - number_of_ties
+    return {"win": (number_of_wins, number_of_wins), "tie": (number_of_ties, number_of_ties),
+            "lose": (number_of_losses, number_of_losses),
+            "equity": (float(pot_shares.sum()), float((pot_shares * pot_shares).sum()))}
+
+
+# Count how many times each hand type can be made when the known cards are combined with each row of community cards
+def _count_hand_types(known_codes, simulated_community):
+    number_of_hands = len(simulated_community)
+    simulated_hands = np.hstack([np.broadcast_to(np.array(known_codes, dtype=np.int64),
+                                                 (number_of_hands, len(known_codes))), simulated_community])
+
+    # If there are only a few different hands (e.g. only 46 different river cards are left on the turn), or a lot
+    # of the sampled hands are repeats, each different hand is only looked up once in the evaluation cache
+    hand_masks = np.bitwise_or.reduce(np.left_shift(np.int64(1), simulated_hands), axis=1)
+    unique_masks, repeats = np.unique(hand_masks, return_counts=True)
+    if len(unique_masks) <= CACHED_HANDS_LIMIT or len(unique_masks) * 4 <= number_of_hands:
+        hand_type_counters = {hand_type: 0 for hand_type in HAND_TYPES}
+        for mask, count in zip(unique_masks.tolist(), repeats.tolist()):
+            for hand_type, found in zip(HAND_TYPES, hand_rankings_cache.lookup(mask)):
+                if found:
+                    hand_type_counters[hand_type] += count
+        return hand_type_counters
+
+    hand_results = batch_hand_rankings(simulated_hands)
+    return {hand_type: int(hand_results[hand_type].sum()) for hand_type in HAND_TYPES}
+
+
+# Work out which hand rankings can be made from a 52 bit card mask, in the order of HAND_TYPES. This gives the same
+# results as Hand.evaluate_rankings_for_odds_calculation() but works straight from the mask so that it can be cached
+def _hand_rankings_from_mask(mask):
+    suit_masks = (mask & 0x1FFF, (mask >> 13) & 0x1FFF, (mask >> 26) & 0x1FFF, mask >> 39)
+    clubs, diamonds, spades, hearts = suit_masks
+    seen_once = clubs | diamonds | spades | hearts
+    seen_twice = (clubs & (diamonds | spades | hearts)) | (diamonds & (spades | hearts)) | (spades & hearts)
+    seen_three_times = (clubs & diamonds & (spades | hearts)) | ((clubs | diamonds) & spades & hearts)
+    seen_four_times = clubs & diamonds & spades & hearts
+
+    flush_mask = next((suit_mask for suit_mask in suit_masks if POPCOUNT[suit_mask] >= 5), 0)
+    is_four_of_a_kind = seen_four_times != 0
+    is_three_of_a_kind = is_four_of_a_kind or seen_three_times != seen_four_times
+    pair_counts = POPCOUNT[seen_twice & ~seen_three_times]
+
+    return (STRAIGHT_HIGH[flush_mask] == 14, STRAIGHT_HIGH[flush_mask] > 0, is_four_of_a_kind,
+            is_three_of_a_kind and pair_counts > 0, flush_mask != 0, STRAIGHT_HIGH[seen_once] > 0,
+            is_three_of_a_kind, pair_counts > 1 or (pair_counts == 1 and is_three_of_a_kind),
+            pair_counts > 0 or is_three_of_a_kind)
+
+
+hand_rankings_cache = EvaluationCache(_hand_rankings_from_mask, max_size=20000)
+
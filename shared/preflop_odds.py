@@ -0,0 +1,124 @@
+# Precomputed odds for all 169 different starting hands, so that odds before the flop never need to be simulated.
+# Preflop, only the ranks of the hole cards and whether they are suited matter, so every starting hand belongs to one
+# of 169 classes laid out as a 13x13 grid: pairs on the diagonal, suited hands above it and offsuit hands below it.
+#
+# The table is generated once by running this file (python -m shared.preflop_odds [samples]) and is stored as a
+# small binary file which is memory-mapped the first time it is needed. It can be shared by the client and the server.
+#
+# File layout (little endian): a header of (magic, version, number of hand types, max opponents, samples simulated
+# per class), followed by one
+# record per class of float32 values: the probability of each hand type in HAND_TYPES, then the (win, tie, equity)
+# against 1 to MAX_OPPONENTS opponents holding random cards, where equity is the average share of the pot won.
+import mmap
+import os
+import struct
+import sys
+import threading
+
+import numpy as np
+
+from shared.batch_evaluator import HAND_TYPES, batch_hand_rankings, sample_cards, simulate_showdowns
+from shared.hand_evaluator import NUMBER_OF_CARDS
+from shared.log import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+PREFLOP_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_odds.bin")
+NUMBER_OF_CLASSES = 169
+MAX_OPPONENTS = 5
+
+_MAGIC = b"PFOD"
+_VERSION = 3
+_HEADER = struct.Struct("<4sHHHI")
+_RECORD = struct.Struct(f"<{len(HAND_TYPES) + 3 * MAX_OPPONENTS}f")
+
+_table = None
+_table_loaded = False
+_table_lock = threading.Lock()
+
+
+# Get the index (0 to 168) of the starting hand class of two hole cards given as card codes
+def starting_hand_class(first_code, second_code):
+    high_rank, low_rank = max(first_code % 13, second_code % 13), min(first_code % 13, second_code % 13)
+    if first_code // 13 == second_code // 13:
+        # Suited hands are above the diagonal
+        return low_rank * 13 + high_rank
+    # Pairs are on the diagonal and offsuit hands are below it
+    return high_rank * 13 + low_rank
+
+
+# Get a pair of card codes which belongs to a starting hand class
+def _example_hole_cards(class_index):
+    row, column = divmod(class_index, 13)
+    if row < column:
+        # Suited: both cards are clubs
+        return [row, column]
+    # Pairs and offsuit hands: a club and a diamond
+    return [row, 13 + column]
+
+
+# Simulate the odds of one starting hand class
+def _simulate_class(class_index, samples, random_generator):
+    hole_codes = _example_hole_cards(class_index)
+    remaining_codes = [code for code in range(NUMBER_OF_CARDS) if code not in hole_codes]
+
+    boards = sample_cards(remaining_codes, 5, samples, random_generator)
+    hand_results = batch_hand_rankings(np.hstack([np.broadcast_to(np.array(hole_codes), (samples, 2)), boards]))
+    record = [float(hand_results[hand_type].mean()) for hand_type in HAND_TYPES]
+
+    for opponents in range(1, MAX_OPPONENTS + 1):
+        wins, ties, pot_shares = simulate_showdowns(hole_codes, [], remaining_codes, opponents, samples,
+                                                    random_generator)
+        record += [float(wins.mean()), float(ties.mean()), float(pot_shares.mean())]
+    return record
+
+
+# Simulate every starting hand class and write the table to a file
+def generate_preflop_table(path=PREFLOP_TABLE_PATH, samples=50000, seed=0):
+    random_generator = np.random.default_rng(seed)
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(HAND_TYPES), MAX_OPPONENTS, samples))
+        for class_index in range(NUMBER_OF_CLASSES):
+            file.write(_RECORD.pack(*_simulate_class(class_index, samples, random_generator)))
+            logger.info("Simulated starting hand class %s/%s", class_index + 1, NUMBER_OF_CLASSES)
+
+
+# Memory-map the table the first time it is needed. If the file is missing or not valid, None is returned and the
+# caller should simulate the odds instead
+def _get_table():
+    global _table, _table_loaded
+    with _table_lock:
+        if not _table_loaded:
+            _table_loaded = True
+            try:
+                with open(PREFLOP_TABLE_PATH, "rb") as file:
+                    table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                header = _HEADER.unpack_from(table, 0)
+                expected_size = _HEADER.size + NUMBER_OF_CLASSES * _RECORD.size
+                if header[:4] == (_MAGIC, _VERSION, len(HAND_TYPES), MAX_OPPONENTS) and len(table) == expected_size:
+                    _table = table
+                else:
+                    logger.warning("Preflop odds table %s is not valid, odds will be simulated", PREFLOP_TABLE_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("Could not load the preflop odds table: %s", e)
+        return _table
+
+
+# Look up the precomputed odds of two hole cards. Returns the probability of each hand type, a list of
+# (win, tie, equity) values where index n is against n + 1 opponents, and the number of samples the odds were
+# simulated from (so that their margin of error can be worked out). Returns None if the table is unavailable
+def lookup_preflop_odds(first_code, second_code):
+    table = _get_table()
+    if table is None:
+        return None
+
+    record = _RECORD.unpack_from(table, _HEADER.size + starting_hand_class(first_code, second_code) * _RECORD.size)
+    hand_odds = dict(zip(HAND_TYPES, record[:len(HAND_TYPES)]))
+    equities = [record[index:index + 3] for index in range(len(HAND_TYPES), len(record), 3)]
+    samples = _HEADER.unpack_from(table, 0)[4]
+    return hand_odds, equities, samples
+
+
+if __name__ == "__main__":
+    configure_logging(default_level="INFO")
+    generate_preflop_table(samples=int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,57 @@
+# Patches between two versions of a game state, so that the server only has to send what has changed since the last
+# state a client received instead of the whole state after every action. Used by the server to make patches and by
+# the client to apply them.
+#
+# A patch is a dictionary of:
+#   "changed": the top level fields (pot, board, current_player_turn, hand, message, ...) that have a new value
+#   "removed": the top level fields that are no longer in the state
+#   "players": the changes to the list of players. If the same players are in the same seats, this maps the index of
+#              each player who changed (as a string, because JSON keys are strings) to the fields of theirs that
+#              changed. Otherwise it is the whole new list of players
+# Any part that would be empty is left out, so a state that has not changed at all gives the patch {}.
+
+
+# Work out the patch that turns old_state into new_state
+def diff_state(old_state, new_state):
+    patch = {}
+    changed = {key: value for key, value in new_state.items()
+               if key != "players" and (key not in old_state or old_state[key] != value)}
+    if changed:
+        patch["changed"] = changed
+    removed = [key for key in old_state if key not in new_state]
+    if removed:
+        patch["removed"] = removed
+
+    old_players = old_state.get("players", [])
+    new_players = new_state.get("players", [])
+    if [player.get("user_id") for player in old_players] == [player.get("user_id") for player in new_players]:
+        player_changes = {}
+        for index, (old_player, new_player) in enumerate(zip(old_players, new_players)):
+            fields = {key: value for key, value in new_player.items()
+                      if key not in old_player or old_player[key] != value}
+            if fields:
+                player_changes[str(index)] = fields
+        if player_changes:
+            patch["players"] = player_changes
+    else:
+        # Someone joined or left, so the seats do not line up any more
+        patch["players"] = new_players
+
+    return patch
+
+
+# Apply a patch made by diff_state() to a state, returning the new state. The state passed in is not modified
+def apply_state_patch(state, patch):
+    new_state = {key: value for key, value in state.items() if key not in patch.get("removed", [])}
+    new_state.update(patch.get("changed", {}))
+
+    player_changes = patch.get("players")
+    if isinstance(player_changes, list):
+        new_state["players"] = player_changes
+    elif player_changes:
+        players = list(state["players"])
+        for index, fields in player_changes.items():
+            players[int(index)] = {**players[int(index)], **fields}
+        new_state["players"] = players
+
+    return new_state